@@ -7,7 +7,9 @@ from datetime import datetime, timedelta
 from flask import Flask, jsonify, request
 import redis
 import requests
-from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Tuple
 import warnings
 warnings.filterwarnings("ignore")
@@ -18,7 +20,7 @@ try:
     from tensorflow.keras.models import Sequential, load_model
     from tensorflow.keras.layers import LSTM, Dense, Dropout
     from tensorflow.keras.optimizers import Adam
-    from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+    from tensorflow.keras.callbacks import EarlyStopping
     TENSORFLOW_AVAILABLE = True
 except ImportError:
     TENSORFLOW_AVAILABLE = False
@@ -38,6 +40,8 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from sklearn.preprocessing import MinMaxScaler
 import joblib
+from registry import ModelRegistry
+from workload import PROFILES, metric_frame, time_grid
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -47,6 +51,15 @@ logger = logging.getLogger(__name__)
 PROMETHEUS_URL = os.getenv('PROMETHEUS_URL', 'http://prometheus.monitoring:9090')
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis.database')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+PROMETHEUS_TIMEOUT = float(os.getenv('PROMETHEUS_TIMEOUT', '10'))
+MODEL_STORAGE_PATH = os.getenv('MODEL_STORAGE_PATH', '/tmp/models')
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', '30'))
+
+# Pooled HTTP session and worker pool shared by all Prometheus queries
+prometheus_session = requests.Session()
+prometheus_session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+prometheus_session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+prometheus_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='prometheus')
 
 # Model Configuration
 MODEL_CONFIG = {
@@ -96,6 +109,7 @@ class AdvancedMLPredictor:
         self.scalers = {}
         self.performance_history = {}
         self.ab_test_config = self._load_ab_test_config()
+        self.registry = ModelRegistry(MODEL_STORAGE_PATH)
         
     def _init_redis(self):
         """Initialize Redis connection"""
@@ -136,34 +150,36 @@ class AdvancedMLPredictor:
                 'response_time': f'flask_http_request_duration_seconds_sum{{service="{service}"}} / flask_http_request_duration_seconds_count{{service="{service}"}}'
             }
             
-            all_data = []
-            for metric_name, query in queries.items():
+            params = {
+                'start': start_time.isoformat() + 'Z',
+                'end': end_time.isoformat() + 'Z',
+                'step': '30s'
+            }
+            
+            def fetch(item):
+                metric_name, query = item
                 try:
-                    params = {
-                        'query': query,
-                        'start': start_time.isoformat() + 'Z',
-                        'end': end_time.isoformat() + 'Z',
-                        'step': '30s'
-                    }
-                    response = requests.get(f"{PROMETHEUS_URL}/api/v1/query_range", params=params, timeout=10)
+                    response = prometheus_session.get(f"{PROMETHEUS_URL}/api/v1/query_range",
+                                                      params={**params, 'query': query}, timeout=PROMETHEUS_TIMEOUT)
                     if response.status_code == 200:
                         data = response.json()
                         if data['data']['result']:
-                            for timestamp, value in data['data']['result'][0]['values']:
-                                all_data.append({
-                                    'timestamp': datetime.fromtimestamp(timestamp),
-                                    metric_name: float(value)
-                                })
+                            return metric_name, self._average_series(data['data']['result'])
                 except Exception as e:
                     logger.warning(f"Failed to fetch {metric_name}: {e}")
+                return metric_name, None
+            
+            # All metric queries run concurrently over pooled connections
+            all_series = {name: series for name, series in prometheus_executor.map(fetch, queries.items())
+                          if series is not None}
             
-            if not all_data:
+            if not all_series:
                 return self._generate_synthetic_advanced_data(service, hours_back)
             
-            # Convert to DataFrame and aggregate by timestamp
-            df = pd.DataFrame(all_data)
-            df = df.groupby('timestamp').mean().reset_index()
-            df = df.sort_values('timestamp')
+            # Align metrics on timestamp
+            df = pd.DataFrame(all_series).sort_index()
+            df.index = pd.to_datetime(df.index, unit='s')
+            df = df.rename_axis('timestamp').reset_index()
             
             # Fill missing values
             for col in ['cpu', 'memory', 'requests', 'response_time']:
@@ -176,45 +192,18 @@ class AdvancedMLPredictor:
             logger.error(f"Failed to get Prometheus data: {e}")
             return self._generate_synthetic_advanced_data(service, hours_back)
     
+    def _average_series(self, result: List[Dict]) -> pd.Series:
+        """Vectorized parse of every pod series in a result, averaged per timestamp"""
+        raw = np.concatenate([np.asarray(series['values']) for series in result])
+        values = pd.Series(raw[:, 1].astype(np.float64), index=raw[:, 0].astype(np.float64))
+        return values.groupby(level=0).mean()
+    
     def _generate_synthetic_advanced_data(self, service: str, hours_back: int) -> pd.DataFrame:
         """Generate realistic synthetic data with patterns"""
         logger.info(f"Generating synthetic data for {service}")
         
-        now = datetime.utcnow()
-        timestamps = [now - timedelta(seconds=i*30) for i in range(hours_back * 120)]
-        timestamps.reverse()
-        
-        data = []
-        for i, timestamp in enumerate(timestamps):
-            hour = timestamp.hour
-            day_of_week = timestamp.weekday()
-            
-            # Realistic patterns
-            base_cpu = 20 + 15 * np.sin(hour * np.pi / 12)  # Daily cycle
-            weekend_factor = 0.7 if day_of_week >= 5 else 1.0  # Weekend reduction
-            noise = np.random.normal(0, 5)
-            
-            # Traffic spikes during business hours
-            if 9 <= hour <= 17 and day_of_week < 5:
-                spike_probability = 0.1
-                spike = 30 if np.random.random() < spike_probability else 0
-            else:
-                spike = 0
-            
-            cpu = max(5, min(95, base_cpu * weekend_factor + noise + spike))
-            memory = cpu * 1.2 + np.random.normal(0, 3)  # Memory correlated with CPU
-            requests = max(0, cpu / 2 + np.random.normal(0, 2))  # Requests drive CPU
-            response_time = max(50, 200 - cpu + np.random.normal(0, 10))  # Higher CPU = faster response
-            
-            data.append({
-                'timestamp': timestamp,
-                'cpu': cpu,
-                'memory': memory,
-                'requests': requests,
-                'response_time': response_time
-            })
-        
-        df = pd.DataFrame(data)
+        # Daily cycle, weekend reduction and business-hour spikes, vectorized
+        df = metric_frame(time_grid(hours_back), PROFILES['advanced'])
         return self._add_advanced_features(df)
     
     def _add_advanced_features(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -331,19 +320,13 @@ class AdvancedMLPredictor:
                 restore_best_weights=True
             )
             
-            model_checkpoint = ModelCheckpoint(
-                f'/tmp/{service}_lstm_model.h5',
-                monitor='val_loss',
-                save_best_only=True
-            )
-            
             # Train model
             history = model.fit(
                 X, y,
                 epochs=MODEL_CONFIG['lstm']['epochs'],
                 batch_size=MODEL_CONFIG['lstm']['batch_size'],
                 validation_split=MODEL_CONFIG['lstm']['validation_split'],
-                callbacks=[early_stopping, model_checkpoint],
+                callbacks=[early_stopping],
                 verbose=0
             )
             
@@ -372,6 +355,8 @@ class AdvancedMLPredictor:
                 'training_history': history.history
             }
             
+            self._persist_model(f'{service}_lstm')
+            
             logger.info(f"LSTM model trained for {service} - MSE: {mse:.4f}, Training time: {training_time:.2f}s")
             return model
             
@@ -430,6 +415,8 @@ class AdvancedMLPredictor:
                 'last_training': datetime.utcnow()
             }
             
+            self._persist_model(f'{service}_prophet')
+            
             logger.info(f"Prophet model trained for {service} - MSE: {mse:.4f}")
             return model
             
@@ -507,10 +494,78 @@ class AdvancedMLPredictor:
                     ),
                     'last_training': datetime.utcnow()
                 }
+                self._persist_model(f'{service}_{model_name}')
             
         except Exception as e:
             logger.error(f"Failed to train traditional models: {e}")
     
+    def _persist_model(self, model_key: str):
+        """Store a trained model with its scaler, features and metrics in the registry"""
+        model_info = self.models[model_key]
+        model = model_info['model']
+        metadata = {
+            'performance': asdict(model_info['performance']),
+            'last_training': model_info['last_training'].isoformat()
+        }
+        artifacts = {k: v for k, v in model_info.items()
+                     if k in ('scaler', 'sequence_length', 'feature_columns')}
+        files = None
+        
+        if model_key.endswith('_lstm'):
+            files = {'model.h5': model.save}
+        elif model_key.endswith('_prophet'):
+            from prophet.serialize import model_to_json
+            
+            def write_prophet(path):
+                with open(path, 'w') as f:
+                    f.write(model_to_json(model))
+            files = {'model.json': write_prophet}
+        else:
+            artifacts['model'] = model
+        
+        model_info['version'] = self.registry.save(model_key, artifacts, metadata, files=files)
+    
+    def load_model(self, model_key: str, version: Optional[str] = None) -> bool:
+        """Swap in a registry version if it is newer than the one currently serving"""
+        current = self.models.get(model_key, {}).get('version')
+        if current and version and current >= version:
+            return False
+        
+        loaded = self.registry.load(model_key, version)
+        if loaded is None:
+            return False
+        version, artifacts, metadata, version_dir = loaded
+        if current and current >= version:
+            return False
+        
+        if model_key.endswith('_lstm'):
+            if not TENSORFLOW_AVAILABLE:
+                return False
+            model = load_model(os.path.join(version_dir, 'model.h5'))
+        elif model_key.endswith('_prophet'):
+            if not PROPHET_AVAILABLE:
+                return False
+            from prophet.serialize import model_from_json
+            with open(os.path.join(version_dir, 'model.json')) as f:
+                model = model_from_json(f.read())
+        else:
+            model = artifacts.pop('model')
+        
+        self.models[model_key] = {
+            **artifacts,
+            'model': model,
+            'performance': ModelPerformance(**metadata['performance']),
+            'last_training': datetime.fromisoformat(metadata['last_training']),
+            'version': version
+        }
+        logger.info(f"Loaded {model_key} version {version} from registry")
+        return True
+    
+    def load_models(self):
+        """Warm start every model that has a promoted version in the registry"""
+        loaded = [model_key for model_key in self.registry.names() if self.load_model(model_key)]
+        logger.info(f"Warm-started {len(loaded)} models from {MODEL_STORAGE_PATH}")
+    
     def predict_with_ensemble(self, service: str, minutes_ahead: int = 5) -> PredictionResult:
         """Make prediction using ensemble of models with A/B testing"""
         try:
@@ -700,6 +755,10 @@ class AdvancedMLPredictor:
 # Initialize the advanced ML predictor
 ml_predictor = AdvancedMLPredictor()
 
+# Warm start from the registry and hot-swap versions trained by other pods
+ml_predictor.load_models()
+ml_predictor.registry.start_watcher(ml_predictor.load_model, interval=MODEL_REGISTRY_POLL_SECONDS)
+
 app = Flask(__name__)
 
 @app.route('/health')
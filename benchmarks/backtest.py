@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Backtest Runner for the CPU predictors
+Rolling-origin evaluation of forecast skill, latency and memory, written to a JSON report
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import pickle
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.ensemble import RandomForestRegressor
+
+# The predictor modules are imported as-is so the backtest scores exactly what is served
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'predictor-service'))
+
+from features import (ServiceSeries, FEATURE_COLUMNS, ROLLING_WINDOW, SAMPLE_INTERVAL_SECONDS,
+                      DEFAULT_CAPACITY, build_time_series_frame, add_lag_features)
+from online import RecursiveLeastSquares
+from prom_http import PrometheusClient, merge_series
+from workload import PROFILES, synthetic_series
+
+DEFAULT_HORIZONS = [1, 5, 10, 15]
+CPU_QUERY_TEMPLATE = 'rate(container_cpu_usage_seconds_total{{pod=~"{pods}.*"}}[1m]) * 100'
+
+
+class Forecaster:
+    """Interface every backtested model implements"""
+
+    name = 'forecaster'
+    refit = True  # False: fitted once, then only updated with new samples
+
+    def fit(self, timestamps, values):
+        pass
+
+    def update(self, timestamps, values, new_samples):
+        pass
+
+    def forecast(self, timestamps, values, minutes):
+        raise NotImplementedError
+
+    def model_object(self):
+        return None
+
+
+class NaiveForecaster(Forecaster):
+    """Persistence baseline: every horizon repeats the last observation"""
+
+    name = 'naive'
+
+    def forecast(self, timestamps, values, minutes):
+        return np.full(len(minutes), values[-1])
+
+
+class FeatureForecaster(Forecaster):
+    """Regressor on the predictor's FEATURE_COLUMNS, forecasting like predict_cpu_utilization"""
+
+    def __init__(self, name, factory, refit=True):
+        self.name = name
+        self.factory = factory
+        self.refit = refit
+        self.model = None
+
+    def fit(self, timestamps, values):
+        df = add_lag_features(build_time_series_frame(timestamps, values))
+        self.model = self.factory()
+        self.model.fit(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+                       df['cpu_utilization'].to_numpy(dtype=np.float64))
+
+    def update(self, timestamps, values, new_samples):
+        # Mirrors PredictiveScaler.update_online_model
+        if not hasattr(self.model, 'partial_fit') or new_samples <= 0:
+            return
+        tail = new_samples + ROLLING_WINDOW - 1
+        df = add_lag_features(build_time_series_frame(timestamps[-tail:], values[-tail:]))
+        df['time_index'] += len(timestamps) - min(tail, len(timestamps))
+        self.model.partial_fit(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+                               df['cpu_utilization'].to_numpy(dtype=np.float64))
+
+    def forecast(self, timestamps, values, minutes):
+        series = ServiceSeries(capacity=len(values))
+        series.append(timestamps, values)
+        X = series.horizon_features(pd.Timestamp(timestamps[-1], unit='s'), minutes)
+        return np.clip(self.model.predict(X), 0, 100)
+
+    def model_object(self):
+        return self.model
+
+
+def default_forecasters():
+    return [
+        NaiveForecaster(),
+        FeatureForecaster('linear_regression', LinearRegression),
+        FeatureForecaster('online_rls', RecursiveLeastSquares, refit=False),
+        FeatureForecaster('random_forest', lambda: RandomForestRegressor(n_estimators=50, random_state=42))
+    ]
+
+
+def load_series(path):
+    """Read a recorded series: CSV (timestamp,cpu), .npz (timestamps, values) or a Prometheus JSON export"""
+    if path.endswith('.npz'):
+        data = np.load(path)
+        return data['timestamps'].astype(np.float64), data['values'].astype(np.float64)
+
+    if path.endswith('.json'):
+        with open(path) as f:
+            payload = json.load(f)
+        result = payload['data']['result'] if 'data' in payload else payload
+        return merge_series(result)
+
+    with open(path) as f:
+        rows = [row for row in csv.reader(f) if row]
+    if rows and not rows[0][0].replace('.', '', 1).isdigit():
+        rows = rows[1:]  # header
+    data = np.array(rows, dtype=np.float64)
+    return data[:, 0], data[:, 1]
+
+
+def record_series(prometheus_url, service, hours):
+    """Fetch a service's CPU series from Prometheus (or the stub) with the predictor's query"""
+    client = PrometheusClient(prometheus_url)
+    end_time = datetime.utcnow()
+    result = client.query_range(CPU_QUERY_TEMPLATE.format(pods=service),
+                                end_time - timedelta(hours=hours), end_time)
+    return merge_series(result)
+
+
+def _summary_ms(samples):
+    if not samples:
+        return None
+    samples = np.asarray(samples) * 1000
+    return {
+        'mean': round(float(samples.mean()), 3),
+        'p50': round(float(np.percentile(samples, 50)), 3),
+        'p95': round(float(np.percentile(samples, 95)), 3),
+        'count': len(samples)
+    }
+
+
+def _peak_fit_memory_kb(forecaster, timestamps, values):
+    tracemalloc.start()
+    try:
+        forecaster.fit(timestamps, values)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def backtest(timestamps, values, forecasters, horizons=None, train_window=DEFAULT_CAPACITY,
+             origin_step=10, refit_every=60):
+    """Rolling-origin evaluation.
+
+    At each origin a model sees only the last `train_window` samples before
+    it (the predictor's buffer), is refitted every `refit_every` samples (the
+    retrain cadence) and forecasts every horizon, which is then scored
+    against the samples that actually followed.
+    """
+    horizons = sorted(horizons or DEFAULT_HORIZONS)
+    steps = np.array(horizons) * 60 // SAMPLE_INTERVAL_SECONDS
+    origins = range(train_window, len(values) - int(steps.max()) + 1, origin_step)
+    if not len(origins):
+        raise ValueError(f"Series too short: need more than {train_window + steps.max()} samples")
+
+    report = {}
+    for forecaster in forecasters:
+        errors = np.full((len(origins), len(horizons)), np.nan)
+        actuals = np.full_like(errors, np.nan)
+        fit_times, forecast_times = [], []
+        last_fit, last_origin = None, None
+
+        for i, origin in enumerate(origins):
+            window_ts = timestamps[origin - train_window:origin]
+            window_values = values[origin - train_window:origin]
+
+            if last_fit is None or (forecaster.refit and origin - last_fit >= refit_every):
+                started = time.perf_counter()
+                forecaster.fit(window_ts, window_values)
+                fit_times.append(time.perf_counter() - started)
+                last_fit = origin
+            elif last_origin is not None:
+                forecaster.update(window_ts, window_values, origin - last_origin)
+            last_origin = origin
+
+            started = time.perf_counter()
+            predicted = forecaster.forecast(window_ts, window_values, np.array(horizons))
+            forecast_times.append(time.perf_counter() - started)
+
+            actual = values[origin - 1 + steps]
+            errors[i] = predicted - actual
+            actuals[i] = actual
+
+        per_horizon = {}
+        for j, minutes in enumerate(horizons):
+            abs_errors = np.abs(errors[:, j])
+            nonzero = np.abs(actuals[:, j]) > 1e-6
+            per_horizon[str(minutes)] = {
+                'mae': round(float(abs_errors.mean()), 4),
+                'rmse': round(float(np.sqrt((errors[:, j] ** 2).mean())), 4),
+                'mape': round(float((abs_errors[nonzero] / np.abs(actuals[nonzero, j])).mean() * 100), 3),
+                'samples': int(len(abs_errors))
+            }
+
+        model = forecaster.model_object()
+        report[forecaster.name] = {
+            'horizons': per_horizon,
+            'training_ms': _summary_ms(fit_times),
+            'inference_ms': _summary_ms(forecast_times),
+            'peak_fit_memory_kb': _peak_fit_memory_kb(forecaster, timestamps[:train_window],
+                                                      values[:train_window]),
+            'model_size_bytes': len(pickle.dumps(model)) if model is not None else 0
+        }
+
+    # Skill relative to persistence: > 0 means the model beats repeating the last value
+    if 'naive' in report:
+        for name, result in report.items():
+            for minutes, scores in result['horizons'].items():
+                naive_mae = report['naive']['horizons'][minutes]['mae']
+                scores['skill_vs_naive'] = round(1 - scores['mae'] / naive_mae, 4) if naive_mae else None
+
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the CPU predictors')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--input', help='Recorded series (.csv timestamp,cpu / .npz / Prometheus .json)')
+    source.add_argument('--prometheus', help='Record the series from this Prometheus URL')
+    parser.add_argument('--service', default='user-service', help='Service to record from Prometheus')
+    parser.add_argument('--hours', type=float, default=48, help='Hours of data to record or synthesize')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the synthetic series')
+    parser.add_argument('--profile', default='predictor', choices=sorted(PROFILES), help='Synthetic workload profile')
+    parser.add_argument('--horizons', default=','.join(map(str, DEFAULT_HORIZONS)), help='Minutes ahead to score')
+    parser.add_argument('--train-window', type=int, default=DEFAULT_CAPACITY, help='Samples visible to a model')
+    parser.add_argument('--origin-step', type=int, default=10, help='Samples between forecast origins')
+    parser.add_argument('--refit-every', type=int, default=60, help='Samples between refits')
+    parser.add_argument('--models', default='', help='Comma separated subset of models to run')
+    parser.add_argument('--output', default='backtest-report.json', help='Report path')
+
+    args = parser.parse_args()
+
+    if args.input:
+        timestamps, values = load_series(args.input)
+        source_name = args.input
+    elif args.prometheus:
+        timestamps, values = record_series(args.prometheus, args.service, args.hours)
+        source_name = f"{args.prometheus} ({args.service})"
+    else:
+        timestamps, values = synthetic_series(args.hours, PROFILES[args.profile], seed=args.seed,
+                                              interval=SAMPLE_INTERVAL_SECONDS)
+        source_name = f"synthetic {args.profile} (seed {args.seed})"
+
+    forecasters = default_forecasters()
+    if args.models:
+        selected = set(args.models.split(','))
+        forecasters = [f for f in forecasters if f.name in selected]
+
+    horizons = [int(h) for h in args.horizons.split(',')]
+    results = backtest(timestamps, values, forecasters, horizons,
+                       args.train_window, args.origin_step, args.refit_every)
+
+    report = {
+        'generated_at': datetime.utcnow().isoformat(),
+        'series': {'source': source_name, 'samples': int(len(values)),
+                   'interval_seconds': SAMPLE_INTERVAL_SECONDS},
+        'config': {'horizons': horizons, 'train_window': args.train_window,
+                   'origin_step': args.origin_step, 'refit_every': args.refit_every},
+        'models': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'model':<20}" + ''.join(f"{f'MAE@{h}m':>12}" for h in horizons) + f"{'fit ms':>10}{'predict ms':>12}")
+    for name, result in results.items():
+        maes = ''.join(f"{result['horizons'][str(h)]['mae']:>12.3f}" for h in horizons)
+        fit_ms = result['training_ms']['mean'] if result['training_ms'] else 0.0
+        print(f"{name:<20}{maes}{fit_ms:>10.2f}{result['inference_ms']['mean']:>12.3f}")
+    print(f"Report written to {args.output}")
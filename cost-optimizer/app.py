@@ -1,13 +1,27 @@
 import os
 import json
+import time
+import queue
 import logging
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 import redis
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import numpy as np
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from usage import UsageTable
+from simulate import simulate_grid, pareto_frontier
+from solver import solve_allocation
+from history import CostHistory, cluster_totals, downsample, service_summaries
+from fallback import FallbackProvider, USAGE_FIELDS
+from resilience import AdaptiveTimeout, CircuitBreaker, Upstream
+from stream import DecisionStream
+from scaler import DecisionScaler, run_in_one_worker, serve as serve_external_scaler
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -16,8 +30,43 @@ logger = logging.getLogger(__name__)
 # Configuration
 PROMETHEUS_URL = os.getenv('PROMETHEUS_URL', 'http://prometheus.monitoring:9090')
 PREDICTOR_URL = os.getenv('PREDICTOR_URL', 'http://predictor-service')
+# Extra replicas hedged requests may go to, comma separated (default: the URLs above)
+PROMETHEUS_URLS = os.getenv('PROMETHEUS_URLS', PROMETHEUS_URL).split(',')
+PREDICTOR_URLS = os.getenv('PREDICTOR_URLS', PREDICTOR_URL).split(',')
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis.database')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+DEFAULT_SERVICES = os.getenv('ANALYZE_SERVICES', 'user-service,catalog-service,order-service').split(',')
+EXCLUDED_SERVICES = set(os.getenv('EXCLUDED_SERVICES', 'predictor-service,cost-optimizer,advanced-ml-service').split(','))
+DISCOVERY_QUERY = os.getenv('DISCOVERY_QUERY', 'kube_deployment_status_replicas{namespace="default"}')
+USAGE_CACHE_SECONDS = float(os.getenv('USAGE_CACHE_SECONDS', '15'))
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '16'))
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv('ANALYSIS_DEADLINE_SECONDS', '8'))
+SIMULATE_MAX_REPLICAS = int(os.getenv('SIMULATE_MAX_REPLICAS', '20'))
+# Cores that 100% pod CPU stands for; usage queries and predictions are percent of one core
+CPU_REQUEST_CORES = float(os.getenv('CPU_REQUEST_CORES', '1'))
+COST_HISTORY_DIR = os.getenv('COST_HISTORY_DIR', '/tmp/cost-history')
+COST_HISTORY_CAPACITY = int(os.getenv('COST_HISTORY_CAPACITY', '200000'))
+COST_HISTORY_FLUSH_SECONDS = float(os.getenv('COST_HISTORY_FLUSH_SECONDS', '30'))
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv('UPSTREAM_TIMEOUT_SECONDS', '10'))
+UPSTREAM_MIN_TIMEOUT_SECONDS = float(os.getenv('UPSTREAM_MIN_TIMEOUT_SECONDS', '0.5'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+HEDGE_TARGETS = set(filter(None, os.getenv('HEDGE_TARGETS', '').split(',')))  # e.g. predictor,prometheus
+HEDGE_QUANTILE = float(os.getenv('HEDGE_QUANTILE', '0.95'))
+DECISION_STREAM_ENABLED = os.getenv('DECISION_STREAM_ENABLED', 'true').lower() == 'true'
+DECISION_TICK_SECONDS = float(os.getenv('DECISION_TICK_SECONDS', '30'))
+DECISION_CHANNEL = os.getenv('DECISION_CHANNEL', 'cost-optimizer:decisions')
+SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+EXTERNAL_SCALER_ENABLED = os.getenv('EXTERNAL_SCALER_ENABLED', 'true').lower() == 'true'
+EXTERNAL_SCALER_PORT = int(os.getenv('EXTERNAL_SCALER_PORT', '6000'))
+EXTERNAL_SCALER_MAX_AGE_SECONDS = float(os.getenv('EXTERNAL_SCALER_MAX_AGE_SECONDS', '120'))
+EXTERNAL_SCALER_LOCK = os.getenv('EXTERNAL_SCALER_LOCK', '/tmp/cost-optimizer-external-scaler.lock')
+FALLBACK_MODE = os.getenv('FALLBACK_MODE', 'last_known_good')  # 'synthetic' for demos without a cluster
+FALLBACK_MAX_AGE_SECONDS = float(os.getenv('FALLBACK_MAX_AGE_SECONDS', '900'))
+SLO_HEADROOM = float(os.getenv('SLO_HEADROOM', '0.2'))
+CLUSTER_BUDGET_PER_HOUR = float(os.getenv('CLUSTER_BUDGET_PER_HOUR', '0')) or None  # 0: no budget
+CLUSTER_CPU_CAPACITY = float(os.getenv('CLUSTER_CPU_CAPACITY', '0')) or None  # cores, 0: unlimited
+SIMULATE_SCENARIOS = [float(s) for s in os.getenv('SIMULATE_SCENARIOS', '0.8,1.0,1.25,1.5').split(',')]
 
 # Cost configuration (USD per hour)
 COST_CONFIG = {
@@ -37,6 +86,63 @@ RESOURCE_TIERS = {
     'xlarge': {'cpu': 2.0, 'memory': 2048, 'cost_multiplier': 3.5},
 }
 
+# Batched usage queries: one instant vector per metric covers every deployment.
+# Deployment pods are named <deployment>-<replicaset hash>-<pod hash>.
+POD_TO_SERVICE = '"service", "$1", "pod", "(.+)-[a-z0-9]+-[a-z0-9]+"'
+USAGE_CPU_QUERY = os.getenv(
+    'USAGE_CPU_QUERY',
+    f'sum by (service) (label_replace(rate(container_cpu_usage_seconds_total{{container!="", pod!=""}}[5m]), {POD_TO_SERVICE})) * 100'
+)
+USAGE_MEMORY_QUERY = os.getenv(
+    'USAGE_MEMORY_QUERY',
+    f'sum by (service) (label_replace(container_memory_usage_bytes{{container!="", pod!=""}}, {POD_TO_SERVICE})) / 1024 / 1024'
+)
+
+# Prometheus metrics for the optimizer itself
+registry = CollectorRegistry()
+upstream_requests = Counter('cost_optimizer_upstream_requests_total', 'HTTP calls to Prometheus and the predictor',
+                            ['target'], registry=registry)
+upstream_calls_per_evaluation = Histogram('cost_optimizer_upstream_calls_per_evaluation',
+                                          'Upstream calls needed to evaluate one service in one request',
+                                          ['target'], buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16), registry=registry)
+upstream_request_seconds = Histogram('cost_optimizer_upstream_request_seconds', 'Upstream call latency by outcome',
+                                     ['target', 'outcome'], registry=registry)
+circuit_state = Gauge('cost_optimizer_circuit_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)',
+                      ['target'], registry=registry)
+circuit_transitions = Counter('cost_optimizer_circuit_transitions_total', 'Circuit breaker state changes',
+                              ['target', 'state'], registry=registry)
+upstream_timeout = Gauge('cost_optimizer_upstream_timeout_seconds', 'Current adaptive timeout per upstream',
+                         ['target'], registry=registry)
+hedged_requests = Counter('cost_optimizer_hedged_requests_total', 'Hedged requests by which copy answered first',
+                          ['target', 'winner'], registry=registry)
+external_scaler_requests = Counter('cost_optimizer_external_scaler_requests_total',
+                                   'KEDA external scaler calls by method and outcome',
+                                   ['method', 'outcome'], registry=registry)
+
+CIRCUIT_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+def observe_circuit_change(target: str, state: str):
+    logger.warning(f"Circuit for {target} is now {state}")
+    circuit_state.labels(target=target).set(CIRCUIT_STATE_VALUES[state])
+    circuit_transitions.labels(target=target, state=state).inc()
+
+def observe_upstream_request(target: str, seconds: float, outcome: str):
+    upstream_request_seconds.labels(target=target, outcome=outcome).observe(seconds)
+
+def observe_hedge(target: str, winner: str):
+    hedged_requests.labels(target=target, winner=winner).inc()
+
+def observe_external_scaler(method: str, outcome: str):
+    external_scaler_requests.labels(method=method, outcome=outcome).inc()
+
+def create_upstream(target: str, base_urls: List[str]) -> Upstream:
+    breaker = CircuitBreaker(target, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS, on_change=observe_circuit_change)
+    timeout = AdaptiveTimeout(UPSTREAM_MIN_TIMEOUT_SECONDS, UPSTREAM_TIMEOUT_SECONDS)
+    circuit_state.labels(target=target).set(0)
+    upstream_timeout.labels(target=target).set_function(lambda: timeout.current)
+    return Upstream(target, base_urls, breaker, timeout, hedge=target in HEDGE_TARGETS, hedge_quantile=HEDGE_QUANTILE,
+                    observer=observe_upstream_request, on_hedge=observe_hedge)
+
 @dataclass
 class CostMetrics:
     service: str
@@ -58,10 +164,66 @@ class ScalingDecision:
     confidence: float
     reasoning: str
 
+class EvaluationContext:
+    """Per-request inputs for one service, each fetched at most once and shared by every computation"""
+    
+    def __init__(self, optimizer: 'CostOptimizer', service: str):
+        self.optimizer = optimizer
+        self.service = service
+        self.upstream_calls = {'prometheus': 0, 'predictor': 0}
+        self._usage = None
+        self._prediction = None
+        self._cost_metrics = None
+    
+    def record_call(self, target: str):
+        self.upstream_calls[target] += 1
+    
+    @property
+    def usage(self) -> Dict:
+        if self._usage is None:
+            self._usage = self.optimizer.get_current_resource_usage(self.service, self)
+        return self._usage
+    
+    @property
+    def prediction(self) -> Dict:
+        if self._prediction is None:
+            self._prediction = self.optimizer.get_prediction_data(self.service, self)
+        return self._prediction
+    
+    @property
+    def cost_metrics(self) -> 'CostMetrics':
+        if self._cost_metrics is None:
+            self._cost_metrics = self.optimizer.calculate_cost_metrics(self.service, self)
+        return self._cost_metrics
+    
+    def data_sources(self) -> Dict:
+        """Where this evaluation's inputs came from and how old they are"""
+        return {
+            name: {'source': data.get('source'), 'age_seconds': data.get('age_seconds')}
+            for name, data in (('usage', self._usage), ('prediction', self._prediction)) if data is not None
+        }
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        for target, calls in self.upstream_calls.items():
+            upstream_calls_per_evaluation.labels(target=target).observe(calls)
+
 class CostOptimizer:
     def __init__(self):
         self.redis_client = self._init_redis()
-        self.cost_history = {}
+        self.upstreams = {
+            'prometheus': create_upstream('prometheus', PROMETHEUS_URLS),
+            'predictor': create_upstream('predictor', PREDICTOR_URLS)
+        }
+        self.cost_history = CostHistory(COST_HISTORY_DIR, capacity=COST_HISTORY_CAPACITY,
+                                        flush_interval=COST_HISTORY_FLUSH_SECONDS)
+        self._usage_table = UsageTable.empty()
+        self._usage_lock = threading.Lock()
+        self._usage_refreshed = False
+        self.fallback = FallbackProvider(FALLBACK_MODE, FALLBACK_MAX_AGE_SECONDS,
+                                         os.path.join(COST_HISTORY_DIR, 'last-known-good.json'))
         
     def _init_redis(self):
         """Initialize Redis connection"""
@@ -74,97 +236,90 @@ class CostOptimizer:
             logger.warning(f"Redis connection failed: {e}, using localhost fallback")
             return redis.Redis(host='localhost', port=6379, decode_responses=True)
     
-    def get_current_resource_usage(self, service: str) -> Dict:
-        """Get current resource usage from Prometheus"""
-        try:
-            # CPU usage query
-            cpu_query = f'rate(container_cpu_usage_seconds_total{{pod=~"{service}.*"}}[5m]) * 100'
-            cpu_response = requests.get(f"{PROMETHEUS_URL}/api/v1/query", 
-                                      params={'query': cpu_query}, timeout=10)
-            
-            # Memory usage query
-            memory_query = f'container_memory_usage_bytes{{pod=~"{service}.*"}} / 1024 / 1024'
-            memory_response = requests.get(f"{PROMETHEUS_URL}/api/v1/query", 
-                                         params={'query': memory_query}, timeout=10)
-            
-            # Replica count query
-            replica_query = f'kube_deployment_status_replicas{{deployment="{service}"}}'
-            replica_response = requests.get(f"{PROMETHEUS_URL}/api/v1/query", 
-                                          params={'query': replica_query}, timeout=10)
-            
-            # Parse responses
-            cpu_usage = 0
-            memory_usage = 0
-            replica_count = 2  # Default fallback
-            
-            if cpu_response.status_code == 200:
-                cpu_data = cpu_response.json()
-                if cpu_data['data']['result']:
-                    cpu_usage = float(cpu_data['data']['result'][0]['value'][1])
-            
-            if memory_response.status_code == 200:
-                memory_data = memory_response.json()
-                if memory_data['data']['result']:
-                    memory_usage = float(memory_data['data']['result'][0]['value'][1])
-            
-            if replica_response.status_code == 200:
-                replica_data = replica_response.json()
-                if replica_data['data']['result']:
-                    replica_count = int(replica_data['data']['result'][0]['value'][1])
-            
-            # Fallback to realistic values if no data
-            if cpu_usage == 0:
-                cpu_usage = np.random.uniform(10, 40)
-            if memory_usage == 0:
-                memory_usage = np.random.uniform(100, 300)
-                
-            return {
-                'cpu_usage_percent': cpu_usage,
-                'memory_usage_mb': memory_usage,
-                'replica_count': replica_count,
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            
-        except Exception as e:
-            logger.error(f"Failed to get resource usage for {service}: {e}")
-            # Return synthetic data for demo
-            return {
-                'cpu_usage_percent': np.random.uniform(15, 45),
-                'memory_usage_mb': np.random.uniform(120, 280),
-                'replica_count': 2,
-                'timestamp': datetime.utcnow().isoformat()
-            }
+    def _upstream_get(self, target: str, path: str, context: Optional[EvaluationContext] = None,
+                      params: Optional[Dict] = None):
+        """GET against an upstream service, counted per target and per evaluation"""
+        upstream_requests.labels(target=target).inc()
+        if context is not None:
+            context.record_call(target)
+        return self.upstreams[target].get(path, params=params)
+    
+    def _query_vector(self, query: str) -> List[Dict]:
+        response = self._upstream_get('prometheus', '/api/v1/query', params={'query': query})
+        response.raise_for_status()
+        return response.json()['data']['result']
+    
+    def get_usage_table(self) -> UsageTable:
+        """Usage of every deployment, refreshed at most every USAGE_CACHE_SECONDS"""
+        table = self._usage_table
+        if table.age() < USAGE_CACHE_SECONDS:
+            return table
+        
+        with self._usage_lock:
+            # Another request may have refreshed the table while we waited
+            if self._usage_table.age() < USAGE_CACHE_SECONDS:
+                return self._usage_table
+            try:
+                self._usage_table = UsageTable.from_results(
+                    self._query_vector(USAGE_CPU_QUERY),
+                    self._query_vector(USAGE_MEMORY_QUERY),
+                    self._query_vector(DISCOVERY_QUERY)
+                )
+                self._usage_refreshed = True
+            except Exception as e:
+                self._usage_refreshed = False
+                logger.error(f"Failed to refresh usage table, keeping {len(self._usage_table)} services: {e}")
+            return self._usage_table
     
-    def get_prediction_data(self, service: str) -> Dict:
+    def get_current_resource_usage(self, service: str, context: Optional[EvaluationContext] = None) -> Dict:
+        """Get current resource usage from the shared usage table"""
+        table = self.get_usage_table()
+        observed = table.get(service)
+        if table.age() > FALLBACK_MAX_AGE_SECONDS:
+            # Refreshes have been failing for too long for the table to count as current
+            observed = None
+        
+        if observed is not None and None not in (observed[field] for field in USAGE_FIELDS):
+            source = 'prometheus' if self._usage_refreshed else 'last_known_good'
+            usage = dict(observed, source=source, age_seconds=round(table.age(), 1))
+            self.fallback.remember('usage', service, {field: observed[field] for field in USAGE_FIELDS})
+        else:
+            logger.warning(f"Incomplete usage data for {service}, using {self.fallback.mode} fallback")
+            usage = self.fallback.usage(service, observed)
+        
+        usage['timestamp'] = datetime.utcnow().isoformat()
+        return usage
+    
+    def discover_services(self) -> List[str]:
+        """Scalable deployments from kube-state-metrics, taken from the usage table"""
+        discovered = set(self.get_usage_table().deployments())
+        return sorted(discovered - EXCLUDED_SERVICES) or list(DEFAULT_SERVICES)
+    
+    def get_prediction_data(self, service: str, context: Optional[EvaluationContext] = None) -> Dict:
         """Get prediction data from predictor service"""
         try:
-            response = requests.get(f"{PREDICTOR_URL}/predict/{service}", timeout=10)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.warning(f"Failed to get prediction for {service}")
-                return self._fallback_prediction(service)
+            response = self._upstream_get('predictor', f"/predict/{service}", context)
+            prediction = response.json() if response.status_code == 200 else {}
+            if 'predicted_cpu' in prediction:
+                self.fallback.remember('prediction', service, prediction)
+                return dict(prediction, source='predictor', age_seconds=0.0)
+            logger.warning(f"Failed to get prediction for {service}")
+            return self._fallback_prediction(service, context)
         except Exception as e:
             logger.error(f"Failed to contact predictor service: {e}")
-            return self._fallback_prediction(service)
+            return self._fallback_prediction(service, context)
     
-    def _fallback_prediction(self, service: str) -> Dict:
+    def _fallback_prediction(self, service: str, context: Optional[EvaluationContext] = None) -> Dict:
         """Fallback prediction when predictor service is unavailable"""
-        current = self.get_current_resource_usage(service)
-        predicted_cpu = current['cpu_usage_percent'] * np.random.uniform(0.8, 1.3)
-        
-        return {
-            'service': service,
-            'predicted_cpu': predicted_cpu,
-            'confidence': 0.6,
-            'current_cpu': current['cpu_usage_percent'],
-            'recommended_replicas': max(1, min(10, int(predicted_cpu / 40)))
-        }
+        # Reuses the usage already fetched for this request
+        current = context.usage if context is not None else self.get_current_resource_usage(service)
+        return self.fallback.prediction(service, current)
     
-    def calculate_cost_metrics(self, service: str) -> CostMetrics:
+    def calculate_cost_metrics(self, service: str, context: Optional[EvaluationContext] = None) -> CostMetrics:
         """Calculate comprehensive cost metrics for a service"""
-        current_usage = self.get_current_resource_usage(service)
-        prediction = self.get_prediction_data(service)
+        context = context or EvaluationContext(self, service)
+        current_usage = context.usage
+        prediction = context.prediction
         
         # Determine resource tier based on usage
         current_tier = self._determine_resource_tier(current_usage['cpu_usage_percent'])
@@ -192,6 +347,9 @@ class CostOptimizer:
             current_cost, predicted_cost, efficiency_score
         )
         
+        self.cost_history.append(service, current_tier, predicted_tier, current_usage['replica_count'],
+                                 predicted_replicas, current_cost, predicted_cost)
+        
         return CostMetrics(
             service=service,
             current_replicas=current_usage['replica_count'],
@@ -274,11 +432,13 @@ class CostOptimizer:
             else:
                 return f"REVIEW: ${cost_per_day:.2f}/day increase - verify if performance gain justifies cost"
     
-    def make_scaling_decision(self, service: str) -> ScalingDecision:
+    def make_scaling_decision(self, service: str, context: Optional[EvaluationContext] = None) -> ScalingDecision:
         """Make intelligent scaling decision considering cost and performance"""
-        cost_metrics = self.calculate_cost_metrics(service)
-        prediction = self.get_prediction_data(service)
-        current_usage = self.get_current_resource_usage(service)
+        # Cost metrics, prediction and usage all come from the same single fetch
+        context = context or EvaluationContext(self, service)
+        cost_metrics = context.cost_metrics
+        prediction = context.prediction
+        current_usage = context.usage
         
         # Business rules for scaling decisions
         current_replicas = cost_metrics.current_replicas
@@ -332,6 +492,9 @@ class CostOptimizer:
 # Initialize cost optimizer
 cost_optimizer = CostOptimizer()
 
+# Per-service evaluations for /cost-analysis/all run concurrently on this pool
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix='cost-analysis')
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -341,7 +504,8 @@ def health():
 def get_cost_metrics(service):
     """Get cost metrics for a specific service"""
     try:
-        metrics = cost_optimizer.calculate_cost_metrics(service)
+        with EvaluationContext(cost_optimizer, service) as context:
+            metrics = context.cost_metrics
         return jsonify({
             'service': metrics.service,
             'current_replicas': metrics.current_replicas,
@@ -353,6 +517,7 @@ def get_cost_metrics(service):
             'cost_savings_per_month': round(metrics.cost_savings_per_hour * 24 * 30, 2),
             'efficiency_score': round(metrics.efficiency_score, 1),
             'recommendation': metrics.recommendation,
+            'data_sources': context.data_sources(),
             'timestamp': datetime.utcnow().isoformat()
         })
     except Exception as e:
@@ -362,8 +527,22 @@ def get_cost_metrics(service):
 @app.route('/scaling-decision/<service>')
 def get_scaling_decision(service):
     """Get intelligent scaling decision for a service"""
+    cached = cached_decision(service)
+    if cached is not None:
+        decision = cached['scaling_decision']
+        return jsonify(dict(
+            decision,
+            service=service,
+            cost_impact_per_day=round(decision['cost_impact_per_hour'] * 24, 2),
+            data_sources=cached['data_sources'],
+            evaluated_at=cached['evaluated_at'],
+            cached=True,
+            timestamp=datetime.utcnow().isoformat()
+        ))
+    
     try:
-        decision = cost_optimizer.make_scaling_decision(service)
+        with EvaluationContext(cost_optimizer, service) as context:
+            decision = cost_optimizer.make_scaling_decision(service, context)
         return jsonify({
             'service': decision.service,
             'current_replicas': decision.current_replicas,
@@ -373,56 +552,323 @@ def get_scaling_decision(service):
             'performance_impact': decision.performance_impact,
             'confidence': round(decision.confidence, 3),
             'reasoning': decision.reasoning,
+            'data_sources': context.data_sources(),
             'timestamp': datetime.utcnow().isoformat()
         })
     except Exception as e:
         logger.error(f"Failed to make scaling decision for {service}: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/cost-analysis/all')
-def get_all_cost_analysis():
-    """Get comprehensive cost analysis for all services"""
-    services = ['user-service', 'catalog-service', 'order-service']
-    analysis = {}
-    total_current_cost = 0
-    total_predicted_cost = 0
+def analyze_service(service: str) -> Dict:
+    """Cost metrics and scaling decision for one service, sharing one evaluation context"""
+    with EvaluationContext(cost_optimizer, service) as context:
+        metrics = context.cost_metrics
+        decision = cost_optimizer.make_scaling_decision(service, context)
     
-    for service in services:
+    return {
+        'cost_metrics': {
+            'current_cost_per_hour': round(metrics.current_cost_per_hour, 4),
+            'predicted_cost_per_hour': round(metrics.predicted_cost_per_hour, 4),
+            'savings_per_hour': round(metrics.cost_savings_per_hour, 4),
+            'efficiency_score': round(metrics.efficiency_score, 1)
+        },
+        'scaling_decision': {
+            'current_replicas': decision.current_replicas,
+            'recommended_replicas': decision.recommended_replicas,
+            'cost_impact_per_hour': round(decision.cost_impact, 4),
+            'performance_impact': decision.performance_impact,
+            'confidence': round(decision.confidence, 3),
+            'reasoning': decision.reasoning
+        },
+        'data_sources': context.data_sources(),
+        'evaluated_at': datetime.utcnow().isoformat()
+    }
+
+def evaluate_concurrently(fn, services: List[str], deadline: float):
+    """Run fn(service) for every service on the analysis pool; returns (results, errors, timed out)"""
+    # Fan out and wait once for the whole batch; stragglers are reported, not awaited
+    futures = {analysis_executor.submit(fn, service): service for service in services}
+    done, pending = wait(futures, timeout=deadline)
+    
+    results, errors = {}, {}
+    for future in done:
+        service = futures[future]
         try:
-            metrics = cost_optimizer.calculate_cost_metrics(service)
-            decision = cost_optimizer.make_scaling_decision(service)
-            
-            analysis[service] = {
-                'cost_metrics': {
-                    'current_cost_per_hour': round(metrics.current_cost_per_hour, 4),
-                    'predicted_cost_per_hour': round(metrics.predicted_cost_per_hour, 4),
-                    'savings_per_hour': round(metrics.cost_savings_per_hour, 4),
-                    'efficiency_score': round(metrics.efficiency_score, 1)
-                },
-                'scaling_decision': {
-                    'current_replicas': decision.current_replicas,
-                    'recommended_replicas': decision.recommended_replicas,
-                    'performance_impact': decision.performance_impact,
-                    'reasoning': decision.reasoning
-                }
-            }
-            
-            total_current_cost += metrics.current_cost_per_hour
-            total_predicted_cost += metrics.predicted_cost_per_hour
-            
+            results[service] = future.result()
         except Exception as e:
             logger.error(f"Failed to analyze {service}: {e}")
-            analysis[service] = {'error': str(e)}
+            errors[service] = str(e)
+    
+    for future in pending:
+        future.cancel()
+    return results, errors, [futures[future] for future in pending]
+
+def requested_services() -> List[str]:
+    requested = request.args.get('services')
+    return requested.split(',') if requested else cost_optimizer.discover_services()
+
+def requested_deadline() -> float:
+    return min(request.args.get('deadline', ANALYSIS_DEADLINE_SECONDS, type=float), ANALYSIS_DEADLINE_SECONDS)
+
+def analysis_response(results: Dict[str, Dict], errors: Dict[str, str], timed_out: List[str], deadline: float,
+                      cached: bool = False):
+    analysis = dict(results)
+    analysis.update({service: {'error': error} for service, error in errors.items()})
+    analysis.update({service: {'error': f'analysis did not finish within {deadline}s'} for service in timed_out})
+    
+    total_current_cost = sum(r['cost_metrics']['current_cost_per_hour'] for r in results.values())
+    total_predicted_cost = sum(r['cost_metrics']['predicted_cost_per_hour'] for r in results.values())
     
     return jsonify({
-        'services': analysis,
+        'services': dict(sorted(analysis.items())),
         'summary': {
+            'services_analyzed': len(results) + len(errors),
+            'services_timed_out': len(timed_out),
             'total_current_cost_per_hour': round(total_current_cost, 4),
             'total_predicted_cost_per_hour': round(total_predicted_cost, 4),
             'total_savings_per_hour': round(total_current_cost - total_predicted_cost, 4),
             'total_savings_per_day': round((total_current_cost - total_predicted_cost) * 24, 2),
             'total_savings_per_month': round((total_current_cost - total_predicted_cost) * 24 * 30, 2)
         },
+        'partial': bool(timed_out),
+        'cached': cached,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@app.route('/cost-analysis/all')
+def get_all_cost_analysis():
+    """Get comprehensive cost analysis for all services"""
+    if decisions_fresh() and 'services' not in request.args:
+        return analysis_response(decision_stream.snapshot()['state'], {}, [], ANALYSIS_DEADLINE_SECONDS, cached=True)
+    
+    deadline = requested_deadline()
+    results, errors, timed_out = evaluate_concurrently(analyze_service, requested_services(), deadline)
+    return analysis_response(results, errors, timed_out, deadline)
+
+def evaluate_decisions() -> Dict[str, Dict]:
+    """One decision tick: analyze every discovered service, keeping the last result of any that failed"""
+    results, errors, timed_out = evaluate_concurrently(analyze_service, cost_optimizer.discover_services(),
+                                                       ANALYSIS_DEADLINE_SECONDS)
+    for service in list(errors) + timed_out:
+        previous = decision_stream.get(service)
+        if previous is not None:
+            results[service] = dict(previous, stale=True)
+    return results
+
+def decisions_fresh() -> bool:
+    """Whether reads can be served from the decision stream instead of recomputing"""
+    return (DECISION_STREAM_ENABLED and request.args.get('fresh', 'false').lower() != 'true'
+            and decision_stream.age() < 2 * DECISION_TICK_SECONDS)
+
+def cached_decision(service: str) -> Optional[Dict]:
+    return decision_stream.get(service) if decisions_fresh() else None
+
+@app.route('/scaling-decisions')
+def get_scaling_decisions():
+    """Latest tick's decisions for every service, without recomputation"""
+    snapshot = decision_stream.snapshot()
+    return jsonify({
+        'version': snapshot['version'],
+        'updated_at': snapshot['updated_at'],
+        'tick_seconds': DECISION_TICK_SECONDS,
+        'leader': decision_stream.is_leader,
+        'decisions': {service: dict(entry['scaling_decision'], evaluated_at=entry['evaluated_at'])
+                      for service, entry in sorted(snapshot['state'].items())}
+    })
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\nid: {data.get('version', '')}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/scaling-decisions/stream')
+def stream_scaling_decisions():
+    """Server-Sent Events: a snapshot on connect, then a delta whenever a recommendation changes"""
+    subscriber = decision_stream.subscribe()
+    
+    def events():
+        try:
+            yield sse_event('snapshot', decision_stream.snapshot())
+            while True:
+                if subscriber.lagged:
+                    # Deltas were dropped for this slow client; start it over from the full state
+                    subscriber.drain()
+                    subscriber.lagged = False
+                    yield sse_event('snapshot', decision_stream.snapshot())
+                try:
+                    yield sse_event('delta', subscriber.queue.get(timeout=SSE_KEEPALIVE_SECONDS))
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            decision_stream.unsubscribe(subscriber)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def predicted_demand(service: str) -> Dict:
+    """Predicted CPU (cores) and memory (MB) of a whole service, from its usage and prediction"""
+    with EvaluationContext(cost_optimizer, service) as context:
+        usage = context.usage
+        prediction = context.prediction
+    
+    replicas = usage['replica_count']
+    return {
+        'current_replicas': replicas,
+        'current_tier': cost_optimizer._determine_resource_tier(usage['cpu_usage_percent']),
+        # Straight from the forecast, so an idle service still gets the demand the predictor expects
+        'cpu_cores': prediction['predicted_cpu'] * replicas * CPU_REQUEST_CORES / 100,
+        'memory_mb': usage.get('memory_total_mb') or usage['memory_usage_mb'] * replicas
+    }
+
+def simulation_grid(demands: Dict[str, Dict], scenarios: np.ndarray, max_replicas: int) -> Dict:
+    """Every (replicas, tier) configuration of every service in one broadcast pass"""
+    services = sorted(demands)
+    replicas = np.arange(1, max_replicas + 1)
+    tier_names = np.array(list(RESOURCE_TIERS), dtype=object)
+    grid = simulate_grid(
+        np.array([demands[s]['cpu_cores'] for s in services]),
+        np.array([demands[s]['memory_mb'] for s in services]),
+        scenarios, replicas, RESOURCE_TIERS, COST_CONFIG
+    )
+    config_replicas = np.repeat(replicas, len(tier_names))
+    config_tiers = np.tile(tier_names, len(replicas))
+    return {
+        'services': services,
+        'cost': grid['cost'].ravel(),
+        'headroom': grid['headroom'].reshape(len(services), -1),
+        'cores': config_replicas * np.array([RESOURCE_TIERS[t]['cpu'] for t in config_tiers]),
+        'replicas': config_replicas,
+        'tiers': config_tiers,
+        'tier_names': tier_names
+    }
+
+def requested_scenarios() -> Tuple[np.ndarray, int]:
+    scenarios = np.array([float(s) for s in request.args.get('scenarios', '').split(',') if s] or SIMULATE_SCENARIOS)
+    max_replicas = min(request.args.get('max_replicas', SIMULATE_MAX_REPLICAS, type=int), 100)
+    return scenarios, max_replicas
+
+@app.route('/cost-simulate')
+def cost_simulate():
+    """What-if grid of replicas x resource tiers x load scenarios, reduced to each service's Pareto frontier"""
+    try:
+        scenarios, max_replicas = requested_scenarios()
+        min_headroom = request.args.get('min_headroom', 0.0, type=float)
+        target_headroom = request.args.get('target_headroom', 0.2, type=float)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid parameter: {e}'}), 400
+    
+    demands, errors, timed_out = evaluate_concurrently(predicted_demand, requested_services(), requested_deadline())
+    if not demands:
+        return jsonify({'status': 'error', 'message': 'No service demand available',
+                        'errors': errors, 'timed_out': timed_out}), 503
+    
+    grid = simulation_grid(demands, scenarios, max_replicas)
+    services, cost, headroom = grid['services'], grid['cost'], grid['headroom']
+    config_replicas, config_tiers, tier_names = grid['replicas'], grid['tiers'], grid['tier_names']
+    frontier = pareto_frontier(cost, headroom, min_headroom)
+    
+    results = {}
+    for i, service in enumerate(services):
+        demand = demands[service]
+        points = np.flatnonzero(frontier[i])
+        points = points[np.argsort(cost[points])]
+        options = [
+            {
+                'replicas': int(config_replicas[p]),
+                'tier': config_tiers[p],
+                'cost_per_hour': round(float(cost[p]), 4),
+                'headroom': round(float(headroom[i, p]), 4)
+            }
+            for p in points
+        ]
+        current = np.flatnonzero((config_replicas == demand['current_replicas'])
+                                 & (config_tiers == demand['current_tier']))
+        results[service] = {
+            'predicted_cpu_cores': round(demand['cpu_cores'], 4),
+            'memory_mb': round(demand['memory_mb'], 1),
+            'current': {
+                'replicas': demand['current_replicas'],
+                'tier': demand['current_tier'],
+                'cost_per_hour': round(float(cost[current[0]]), 4) if len(current) else None,
+                'headroom': round(float(headroom[i, current[0]]), 4) if len(current) else None
+            },
+            'recommended': next((o for o in options if o['headroom'] >= target_headroom), None),
+            'pareto_frontier': options
+        }
+    
+    return jsonify({
+        'services': results,
+        'grid': {
+            'replicas': [1, max_replicas],
+            'tiers': list(tier_names),
+            'scenarios': scenarios.tolist(),
+            'configurations_evaluated': int(headroom.size * len(scenarios))
+        },
+        'errors': errors,
+        'timed_out': timed_out,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@app.route('/cost-optimize')
+def cost_optimize():
+    """Cost-minimal configuration of all services together, under a cluster budget and CPU capacity"""
+    try:
+        scenarios, max_replicas = requested_scenarios()
+        slo_headroom = request.args.get('slo_headroom', SLO_HEADROOM, type=float)
+        budget = request.args.get('budget', CLUSTER_BUDGET_PER_HOUR, type=float)
+        cpu_capacity = request.args.get('cpu_capacity', CLUSTER_CPU_CAPACITY, type=float)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid parameter: {e}'}), 400
+    
+    demands, errors, timed_out = evaluate_concurrently(predicted_demand, requested_services(), requested_deadline())
+    if not demands:
+        return jsonify({'status': 'error', 'message': 'No service demand available',
+                        'errors': errors, 'timed_out': timed_out}), 503
+    
+    started = time.perf_counter()
+    grid = simulation_grid(demands, scenarios, max_replicas)
+    services, cost, headroom, cores = grid['services'], grid['cost'], grid['headroom'], grid['cores']
+    solution = solve_allocation(cost, cores, headroom, np.full(len(services), slo_headroom),
+                                cpu_capacity=cpu_capacity, budget=budget)
+    solve_ms = (time.perf_counter() - started) * 1000
+    
+    allocation = {}
+    current_cost = 0.0
+    for i, service in enumerate(services):
+        option = solution['choice'][i]
+        demand = demands[service]
+        service_current_cost = cost_optimizer._calculate_hourly_cost(demand['current_replicas'], demand['current_tier'], {})
+        current_cost += service_current_cost
+        allocation[service] = {
+            'current_replicas': demand['current_replicas'],
+            'current_tier': demand['current_tier'],
+            'recommended_replicas': int(grid['replicas'][option]),
+            'recommended_tier': grid['tiers'][option],
+            'cost_per_hour': round(float(cost[option]), 4),
+            'cost_change_per_hour': round(float(cost[option]) - service_current_cost, 4),
+            'cpu_cores': round(float(cores[option]), 3),
+            'headroom': round(float(headroom[i, option]), 4),
+            'slo_met': bool(solution['slo_met'][i])
+        }
+    
+    total_cost = solution['total_cost']
+    return jsonify({
+        'status': solution['status'],
+        'allocation': allocation,
+        'summary': {
+            'services': len(services),
+            'slo_violations': int((~solution['slo_met']).sum()),
+            'total_cost_per_hour': round(total_cost, 4),
+            'current_cost_per_hour': round(current_cost, 4),
+            'total_savings_per_hour': round(current_cost - total_cost, 4),
+            'lower_bound_per_hour': round(solution['lower_bound'], 4),
+            'optimality_gap': round(max(0.0, total_cost - solution['lower_bound']) / total_cost, 6) if total_cost else 0.0,
+            'total_cpu_cores': round(solution['total_cores'], 3),
+            'cpu_capacity': cpu_capacity,
+            'budget_per_hour': budget,
+            'slo_headroom': slo_headroom,
+            'solve_ms': round(solve_ms, 2)
+        },
+        'errors': errors,
+        'timed_out': timed_out,
         'timestamp': datetime.utcnow().isoformat()
     })
 
@@ -435,8 +881,120 @@ def get_cost_tiers():
         'description': 'Resource tiers and cost configuration for the platform'
     })
 
+def history_window():
+    hours = min(request.args.get('hours', 24, type=float), 24 * 31)
+    step = max(request.args.get('step', 300, type=float), 30)
+    end = time.time()
+    return end - hours * 3600, end, step
+
+@app.route('/cost-history/<service>')
+def get_cost_history(service):
+    """Downsampled cost history of one service"""
+    start, end, step = history_window()
+    records = cost_optimizer.cost_history.records(start, end, service)
+    if not len(records):
+        return jsonify({'status': 'error', 'message': f'No cost history for {service}'}), 404
+    
+    return jsonify({
+        'service': service,
+        'step_seconds': step,
+        'summary': service_summaries(records)[service],
+        'series': downsample(records, step),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@app.route('/cost-history')
+def get_cost_history_summary():
+    """Cluster cost over time plus a per-service summary, straight from the history"""
+    start, end, step = history_window()
+    records = cost_optimizer.cost_history.records(start, end)
+    totals = cluster_totals(records, step)
+    
+    return jsonify({
+        'step_seconds': step,
+        'records': int(len(records)),
+        'cluster': totals,
+        'services': service_summaries(records),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@app.route('/dependencies')
+def get_dependencies():
+    """Circuit breaker state and adaptive timeout of each upstream"""
+    return jsonify({
+        'dependencies': {target: upstream.status() for target, upstream in cost_optimizer.upstreams.items()},
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics endpoint"""
+    return generate_latest(registry)
+
+# Decisions are computed on a fixed tick and pushed; reads are served from this state
+decision_stream = DecisionStream(evaluate_decisions, DECISION_TICK_SECONDS, cost_optimizer.redis_client,
+                                 channel=DECISION_CHANNEL)
+if DECISION_STREAM_ENABLED:
+    decision_stream.start()
+
+class DecisionCollector:
+    """Per-service decision gauges, read from the decision stream at scrape time so scrapes never evaluate"""
+    
+    GAUGES = (
+        ('recommended_replicas', 'Recommended replica count', 'scaling_decision', 'recommended_replicas'),
+        ('current_replicas', 'Replica count at the last evaluation', 'scaling_decision', 'current_replicas'),
+        ('cost_impact_per_hour', 'Hourly cost change of applying the recommendation (USD)',
+         'scaling_decision', 'cost_impact_per_hour'),
+        ('decision_confidence', 'Confidence of the scaling decision', 'scaling_decision', 'confidence'),
+        ('efficiency_score', 'Resource efficiency score (0-100)', 'cost_metrics', 'efficiency_score'),
+        ('current_cost_per_hour', 'Current hourly cost (USD)', 'cost_metrics', 'current_cost_per_hour'),
+        ('savings_per_hour', 'Hourly savings of the predicted allocation (USD)', 'cost_metrics', 'savings_per_hour'),
+    )
+    
+    def __init__(self, stream: DecisionStream):
+        self.stream = stream
+    
+    def collect(self):
+        snapshot = self.stream.snapshot()
+        for name, documentation, section, field in self.GAUGES:
+            family = GaugeMetricFamily(f'cost_optimizer_{name}', documentation, labels=['service'])
+            for service, entry in sorted(snapshot['state'].items()):
+                value = entry.get(section, {}).get(field)
+                if value is not None:
+                    family.add_metric([service], float(value))
+            yield family
+        
+        stale = GaugeMetricFamily('cost_optimizer_decision_stale',
+                                  'Whether the last tick failed for the service and its previous decision is kept',
+                                  labels=['service'])
+        for service, entry in sorted(snapshot['state'].items()):
+            stale.add_metric([service], 1.0 if entry.get('stale') else 0.0)
+        yield stale
+        yield GaugeMetricFamily('cost_optimizer_decision_age_seconds', 'Seconds since the decision state was updated',
+                                value=self.stream.age() if snapshot['updated_at'] else float('nan'))
+        yield GaugeMetricFamily('cost_optimizer_decision_version', 'Decision state version, bumped on every change',
+                                value=snapshot['version'])
+
+registry.register(DecisionCollector(decision_stream))
+
+def start_external_scaler():
+    """Serve the cached decisions to KEDA over gRPC from one worker of the pod.
+    
+    Called from the gunicorn post_worker_init hook (gunicorn.conf.py) and
+    when run directly; workers that do not get the lock stand by.
+    """
+    if not EXTERNAL_SCALER_ENABLED:
+        return
+    if not DECISION_STREAM_ENABLED:
+        logger.warning("KEDA external scaler needs the decision stream, set DECISION_STREAM_ENABLED=true")
+        return
+    scaler = DecisionScaler(decision_stream, EXTERNAL_SCALER_MAX_AGE_SECONDS, SSE_KEEPALIVE_SECONDS,
+                            observer=observe_external_scaler)
+    run_in_one_worker(lambda: serve_external_scaler(scaler, EXTERNAL_SCALER_PORT), EXTERNAL_SCALER_LOCK)
+
 if __name__ == '__main__':
     logger.info("Starting Cost Optimizer Service")
     logger.info(f"Prometheus URL: {PROMETHEUS_URL}")
     logger.info(f"Predictor URL: {PREDICTOR_URL}")
+    start_external_scaler()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
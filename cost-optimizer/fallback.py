@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+import numpy as np
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ('cpu_usage_percent', 'memory_usage_mb', 'replica_count')
+
+
+class FallbackProvider:
+    """Deterministic stand-ins for usage and predictions while Prometheus or the predictor is down.
+
+    In 'last_known_good' mode missing values come from the last real
+    observation of the service if it is younger than `max_age`, otherwise
+    from fixed conservative defaults; either way repeated calls agree, so
+    decisions stay stable and cacheable through an outage. 'synthetic'
+    mode is for demos without a cluster: plausible values seeded by the
+    service name. Every value carries its source and age.
+
+    Observations are snapshotted to `path` so a restart during an outage
+    still has them.
+    """
+
+    def __init__(self, mode: str = 'last_known_good', max_age: float = 900, path: Optional[str] = None,
+                 defaults: Optional[Dict] = None, save_interval: float = 30):
+        if mode not in ('last_known_good', 'synthetic'):
+            raise ValueError(f"Unknown fallback mode {mode}")
+        self.mode = mode
+        self.max_age = max_age
+        self.path = path
+        self.defaults = defaults or {'cpu_usage_percent': 50.0, 'memory_usage_mb': 256.0, 'replica_count': 2}
+        self.save_interval = save_interval
+        self._known = {'usage': {}, 'prediction': {}}
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            self._known.update({kind: snapshot.get(kind, {}) for kind in self._known})
+            logger.info(f"Loaded last-known-good values for {len(self._known['usage'])} services")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable fallback snapshot {self.path}: {e}")
+
+    def _save(self):
+        now = time.time()
+        if not self.path or now - self._last_save < self.save_interval:
+            return
+        self._last_save = now
+        try:
+            with self._lock:
+                snapshot = json.dumps(self._known)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save fallback snapshot: {e}")
+
+    def remember(self, kind: str, service: str, values: Dict):
+        """Record a real observation ('usage' or 'prediction') of a service"""
+        with self._lock:
+            self._known[kind][service] = {'values': values, 'observed_at': time.time()}
+        self._save()
+
+    def _last_known(self, kind: str, service: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._known[kind].get(service)
+        if entry is None or time.time() - entry['observed_at'] > self.max_age:
+            return None
+        return entry
+
+    def _synthetic_rng(self, service: str) -> np.random.Generator:
+        return np.random.default_rng(zlib.crc32(service.encode()))
+
+    def usage(self, service: str, observed: Optional[Dict] = None) -> Dict:
+        """Usage with the fields missing (None) from `observed` filled in"""
+        observed = {field: value for field, value in (observed or {}).items() if value is not None}
+        missing = [field for field in USAGE_FIELDS if field not in observed]
+        if not missing:
+            return dict(observed, source='prometheus', age_seconds=0.0)
+
+        if self.mode == 'synthetic':
+            rng = self._synthetic_rng(service)
+            filled = {'cpu_usage_percent': rng.uniform(15, 45), 'memory_usage_mb': rng.uniform(120, 280),
+                      'replica_count': 2}
+            source, age = 'synthetic', None
+        else:
+            entry = self._last_known('usage', service)
+            if entry is not None:
+                filled = entry['values']
+                source, age = 'last_known_good', round(time.time() - entry['observed_at'], 1)
+            else:
+                filled, source, age = self.defaults, 'default', None
+
+        usage = dict(observed)
+        usage.update({field: filled[field] for field in missing})
+        return dict(usage, source=source if len(missing) == len(USAGE_FIELDS) else f"partial:{source}",
+                    age_seconds=age, missing_fields=missing)
+
+    def prediction(self, service: str, usage: Dict) -> Dict:
+        """Prediction to use when the predictor cannot be reached"""
+        if self.mode == 'synthetic':
+            predicted_cpu = usage['cpu_usage_percent'] * self._synthetic_rng(service).uniform(0.8, 1.3)
+            return {
+                'service': service,
+                'predicted_cpu': predicted_cpu,
+                'confidence': 0.6,
+                'current_cpu': usage['cpu_usage_percent'],
+                'recommended_replicas': max(1, min(10, int(predicted_cpu / 40))),
+                'source': 'synthetic',
+                'age_seconds': None
+            }
+
+        entry = self._last_known('prediction', service)
+        if entry is not None:
+            age = time.time() - entry['observed_at']
+            prediction = dict(entry['values'])
+            # Trust in an old forecast fades as it approaches max_age
+            prediction['confidence'] = prediction.get('confidence', 0.5) * (1 - 0.5 * age / self.max_age)
+            return dict(prediction, source='last_known_good', age_seconds=round(age, 1))
+
+        # Persistence forecast: expect the current load and hold the current replica count
+        return {
+            'service': service,
+            'predicted_cpu': usage['cpu_usage_percent'],
+            'confidence': 0.3,
+            'current_cpu': usage['cpu_usage_percent'],
+            'recommended_replicas': usage['replica_count'],
+            'source': 'persistence',
+            'age_seconds': None
+        }
@@ -0,0 +1,7 @@
+# Gunicorn hooks for cost-optimizer; bind, workers and threads are set on the command line
+
+
+def post_worker_init(worker):
+    # Runs in every worker after app.py is imported; only one worker per pod ends up serving gRPC
+    import app
+    app.start_external_scaler()
@@ -0,0 +1,226 @@
+import os
+import time
+import fcntl
+import atexit
+import logging
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# One fixed-size record per evaluation, little-endian so the log is portable
+HISTORY_DTYPE = np.dtype([
+    ('ts', '<f8'),
+    ('service', 'S63'),
+    ('tier', 'S7'),
+    ('predicted_tier', 'S7'),
+    ('replicas', '<i4'),
+    ('predicted_replicas', '<i4'),
+    ('cost', '<f8'),
+    ('predicted_cost', '<f8')
+])
+
+
+class CostHistory:
+    """Columnar ring buffer of cost evaluations, flushed to an append-only log.
+
+    Appends only touch memory; every `flush_interval` seconds the records
+    not yet written are appended to `<directory>/cost-history.bin` under an
+    advisory lock, and records other gunicorn workers appended since the
+    last flush are read back, so every worker's buffer sees every
+    evaluation. The log rotates to `.1` past `max_file_records`; on start
+    the buffer is refilled from both files.
+    """
+
+    def __init__(self, directory: str, capacity: int = 200000, flush_interval: float = 30,
+                 max_file_records: int = 1000000):
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_file_records = max_file_records
+        self.path = os.path.join(directory, 'cost-history.bin')
+        self._records = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self._head = 0
+        self._count = 0
+        self._pending = []
+        self._offset = 0
+        self._inode = None
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.enabled = True
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+        except OSError as e:
+            logger.warning(f"Cost history kept in memory only, cannot use {directory}: {e}")
+            self.enabled = False
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return self._count
+
+    def _insert(self, records: np.ndarray):
+        """Copy records into the ring, overwriting the oldest ones; caller holds the lock"""
+        records = records[-self.capacity:]
+        idx = (self._head + np.arange(len(records))) % self.capacity
+        self._records[idx] = records
+        self._head = (self._head + len(records)) % self.capacity
+        self._count = min(self._count + len(records), self.capacity)
+
+    def _read_from(self, path: str, offset: int) -> np.ndarray:
+        """Whole records of a log file from byte `offset` on"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=HISTORY_DTYPE)
+        count = (size - offset) // HISTORY_DTYPE.itemsize
+        if count <= 0:
+            return np.empty(0, dtype=HISTORY_DTYPE)
+        return np.fromfile(path, dtype=HISTORY_DTYPE, count=count, offset=offset)
+
+    def _load(self):
+        rotated = self._read_from(f"{self.path}.1", 0)
+        current = self._read_from(self.path, 0)
+        with self._lock:
+            self._insert(np.concatenate([rotated, current]))
+        if os.path.exists(self.path):
+            self._inode = os.stat(self.path).st_ino
+            self._offset = len(current) * HISTORY_DTYPE.itemsize
+        logger.info(f"Loaded {self._count} cost history records from {self.path}")
+
+    def append(self, service: str, tier: str, predicted_tier: str, replicas: int, predicted_replicas: int,
+               cost: float, predicted_cost: float, ts: Optional[float] = None):
+        record = (time.time() if ts is None else ts, service.encode()[:63], tier.encode(), predicted_tier.encode(),
+                  replicas, predicted_replicas, cost, predicted_cost)
+        with self._lock:
+            self._insert(np.array([record], dtype=HISTORY_DTYPE))
+            self._pending.append(record)
+
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Append pending records to the log and pick up records written by other workers"""
+        if not self.enabled or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            self._last_flush = time.time()
+
+            with open(self.path, 'ab') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    stat = os.fstat(f.fileno())
+                    others = np.empty(0, dtype=HISTORY_DTYPE)
+                    if stat.st_ino != self._inode:
+                        # Rotated by another worker: finish the old file, everything in the new one is unseen
+                        rotated = f"{self.path}.1"
+                        if self._inode is not None and os.path.exists(rotated) and os.stat(rotated).st_ino == self._inode:
+                            others = self._read_from(rotated, self._offset)
+                        self._inode, self._offset = stat.st_ino, 0
+
+                    others = np.concatenate([others, self._read_from(self.path, self._offset)])
+                    if pending:
+                        f.write(np.array(pending, dtype=HISTORY_DTYPE).tobytes())
+                        f.flush()
+                    self._offset = os.fstat(f.fileno()).st_size
+
+                    if self._offset >= self.max_file_records * HISTORY_DTYPE.itemsize:
+                        os.replace(self.path, f"{self.path}.1")
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+            if len(others):
+                with self._lock:
+                    self._insert(others)
+        except OSError as e:
+            logger.error(f"Failed to flush cost history: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def records(self, start: float, end: Optional[float] = None, service: Optional[str] = None) -> np.ndarray:
+        """Buffered records in [start, end], oldest first"""
+        with self._lock:
+            idx = (self._head - self._count + np.arange(self._count)) % self.capacity
+            records = self._records[idx]
+        mask = records['ts'] >= start
+        if end is not None:
+            mask &= records['ts'] <= end
+        if service is not None:
+            mask &= records['service'] == service.encode()
+        records = records[mask]
+        # Records read back from other workers can arrive out of order
+        return records[np.argsort(records['ts'], kind='stable')]
+
+
+def downsample(records: np.ndarray, step: float) -> Dict[str, List]:
+    """Per-bucket means of one service's records"""
+    if not len(records):
+        return {'timestamps': [], 'cost': [], 'predicted_cost': [], 'replicas': [], 'predicted_replicas': []}
+    buckets = np.floor(records['ts'] / step) * step
+    bucket_ts, inverse = np.unique(buckets, return_inverse=True)
+    counts = np.bincount(inverse)
+
+    def mean(column):
+        return np.round(np.bincount(inverse, weights=records[column]) / counts, 4).tolist()
+
+    return {
+        'timestamps': bucket_ts.tolist(),
+        'cost': mean('cost'),
+        'predicted_cost': mean('predicted_cost'),
+        'replicas': mean('replicas'),
+        'predicted_replicas': mean('predicted_replicas')
+    }
+
+
+def cluster_totals(records: np.ndarray, step: float) -> Dict[str, List]:
+    """Per-bucket cluster cost: each service's mean within the bucket, summed over services"""
+    if not len(records):
+        return {'timestamps': [], 'cost': [], 'predicted_cost': [], 'services': []}
+    buckets = np.floor(records['ts'] / step) * step
+    bucket_ts, bucket_idx = np.unique(buckets, return_inverse=True)
+    _, service_idx = np.unique(records['service'], return_inverse=True)
+
+    # Mean per (bucket, service) first, so frequently evaluated services do not count twice
+    pairs, pair_idx = np.unique(bucket_idx * (service_idx.max() + 1) + service_idx, return_inverse=True)
+    pair_counts = np.bincount(pair_idx)
+    pair_bucket = pairs // (service_idx.max() + 1)
+
+    def total(column):
+        pair_means = np.bincount(pair_idx, weights=records[column]) / pair_counts
+        return np.round(np.bincount(pair_bucket, weights=pair_means, minlength=len(bucket_ts)), 4).tolist()
+
+    return {
+        'timestamps': bucket_ts.tolist(),
+        'cost': total('cost'),
+        'predicted_cost': total('predicted_cost'),
+        'services': np.bincount(pair_bucket, minlength=len(bucket_ts)).tolist()
+    }
+
+
+def service_summaries(records: np.ndarray) -> Dict[str, Dict]:
+    """Mean hourly cost and potential savings of every service over the records"""
+    if not len(records):
+        return {}
+    services, inverse = np.unique(records['service'], return_inverse=True)
+    counts = np.bincount(inverse)
+    cost = np.bincount(inverse, weights=records['cost']) / counts
+    predicted = np.bincount(inverse, weights=records['predicted_cost']) / counts
+    last = np.zeros(len(services), dtype=np.int64)
+    np.maximum.at(last, inverse, np.arange(len(records)))
+
+    return {
+        service.decode(): {
+            'evaluations': int(counts[i]),
+            'avg_cost_per_hour': round(float(cost[i]), 4),
+            'avg_predicted_cost_per_hour': round(float(predicted[i]), 4),
+            'avg_potential_savings_per_hour': round(float(cost[i] - predicted[i]), 4),
+            'last_replicas': int(records['replicas'][last[i]]),
+            'last_tier': records['tier'][last[i]].decode(),
+            'last_evaluated': float(records['ts'][last[i]])
+        }
+        for i, service in enumerate(services)
+    }
@@ -0,0 +1,200 @@
+import time
+import threading
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe.
+
+    After `failure_threshold` failures in a row the breaker opens and calls
+    fail fast for `reset_timeout` seconds; then one probe is let through
+    and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30,
+                 on_change: Optional[Callable[[str, str], None]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state != self.state:
+            self.state = state
+            if self.on_change is not None:
+                self.on_change(self.name, state)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN)
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+
+class AdaptiveTimeout:
+    """Timeout of `multiplier` times the recent p99 latency, clamped to [minimum, maximum].
+
+    Until `warmup` latencies have been observed the timeout stays at
+    `maximum`, the old fixed value.
+    """
+
+    def __init__(self, minimum: float = 0.5, maximum: float = 10, multiplier: float = 3.0,
+                 window: int = 200, warmup: int = 20):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.warmup = warmup
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.current = maximum
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+            if len(self._latencies) >= self.warmup and len(self._latencies) % 10 == 0:
+                p99 = float(np.percentile(self._latencies, 99))
+                self.current = min(self.maximum, max(self.minimum, p99 * self.multiplier))
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Observed latency quantile, None until warmed up"""
+        with self._lock:
+            if len(self._latencies) < self.warmup:
+                return None
+            return float(np.percentile(self._latencies, q * 100))
+
+
+class Upstream:
+    """One HTTP dependency behind a pooled session, a circuit breaker and an adaptive timeout.
+
+    With `hedge` set, a request still unanswered after the observed
+    `hedge_quantile` latency is sent again to the next base URL (or the
+    same service VIP, which will usually pick another pod) and the first
+    good response wins. 5xx responses and transport errors count as
+    failures; 4xx answers mean the dependency is up.
+    """
+
+    def __init__(self, name: str, base_urls: List[str], breaker: CircuitBreaker, timeout: AdaptiveTimeout,
+                 hedge: bool = False, hedge_quantile: float = 0.95, pool_size: int = 32,
+                 observer: Optional[Callable[[str, float, str], None]] = None,
+                 on_hedge: Optional[Callable[[str, str], None]] = None):
+        self.name = name
+        self.base_urls = [url.rstrip('/') for url in base_urls]
+        self.breaker = breaker
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.observer = observer
+        self.on_hedge = on_hedge
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.base_urls), pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._hedge_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix=f'{name}-hedge')
+
+    def _observe(self, seconds: float, outcome: str):
+        if self.observer is not None:
+            self.observer(self.name, seconds, outcome)
+
+    def _fetch(self, base_url: str, path: str, params: Optional[Dict], timeout: float) -> requests.Response:
+        response = self.session.get(f"{base_url}{path}", params=params, timeout=timeout)
+        if response.status_code >= 500:
+            raise requests.HTTPError(f"{self.name} returned {response.status_code}", response=response)
+        return response
+
+    def _hedged_fetch(self, path: str, params: Optional[Dict], timeout: float) -> requests.Response:
+        deadline = time.monotonic() + timeout
+        primary = self._hedge_executor.submit(self._fetch, self.base_urls[0], path, params, timeout)
+        hedge_delay = self.timeout.quantile(self.hedge_quantile)
+        if hedge_delay is None or hedge_delay >= timeout:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done and primary.exception() is None:
+            return primary.result()
+
+        backup = self._hedge_executor.submit(self._fetch, self.base_urls[1 % len(self.base_urls)], path, params,
+                                             max(deadline - time.monotonic(), 0.001))
+        pending, error = {primary, backup}, None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if self.on_hedge is not None:
+                        self.on_hedge(self.name, 'backup' if future is backup else 'primary')
+                    return future.result()
+                error = future.exception()
+        if self.on_hedge is not None:
+            self.on_hedge(self.name, 'none')
+        raise error or requests.Timeout(f"{self.name} did not answer within {timeout:.2f}s")
+
+    def get(self, path: str, params: Optional[Dict] = None) -> requests.Response:
+        if not self.breaker.allow():
+            self._observe(0.0, 'rejected')
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+        timeout = self.timeout.current
+        started = time.perf_counter()
+        try:
+            if self.hedge:
+                response = self._hedged_fetch(path, params, timeout)
+            else:
+                response = self._fetch(self.base_urls[0], path, params, timeout)
+        except Exception:
+            self.breaker.record_failure()
+            self._observe(time.perf_counter() - started, 'error')
+            raise
+
+        elapsed = time.perf_counter() - started
+        self.breaker.record_success()
+        self.timeout.observe(elapsed)
+        self._observe(elapsed, 'success')
+        return response
+
+    def status(self) -> Dict:
+        return {
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'timeout_seconds': round(self.timeout.current, 3),
+            'p95_seconds': self.timeout.quantile(0.95),
+            'hedging': self.hedge,
+            'base_urls': self.base_urls
+        }
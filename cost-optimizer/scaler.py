@@ -0,0 +1,151 @@
+import time
+import fcntl
+import queue
+import logging
+import threading
+from concurrent import futures
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# gRPC and the stubs generated from externalscaler.proto are optional; without them only the HTTP API is served
+try:
+    import grpc
+    import externalscaler_pb2 as pb2
+    import externalscaler_pb2_grpc as pb2_grpc
+    GRPC_AVAILABLE = True
+except ImportError:
+    GRPC_AVAILABLE = False
+
+
+class DecisionScaler:
+    """KEDA external scaler answering from the decision stream's cached state.
+
+    A ScaledObject names its service in the trigger metadata (`service`,
+    default: the ScaledObject name). The metric is the recommended replica
+    count against a target of 1, so the HPA KEDA manages sizes the
+    deployment to exactly the recommendation. Every call is a lookup in
+    the current state; no polling rate triggers an evaluation. Unknown
+    services and decisions older than `max_age` are errors, which makes
+    KEDA apply the ScaledObject's fallback.
+    """
+
+    def __init__(self, stream, max_age: float = 120, keepalive: float = 15,
+                 observer: Optional[Callable[[str, str], None]] = None):
+        self.stream = stream
+        self.max_age = max_age
+        self.keepalive = keepalive
+        self.observer = observer
+
+    def _observe(self, method: str, outcome: str):
+        if self.observer is not None:
+            self.observer(method, outcome)
+
+    @staticmethod
+    def _service(ref) -> str:
+        return ref.scalerMetadata.get('service') or ref.name
+
+    @staticmethod
+    def _metric_name(service: str) -> str:
+        return f"{service}-recommended-replicas"
+
+    def _decision(self, method: str, ref, context) -> Dict:
+        service = self._service(ref)
+        entry = self.stream.get(service)
+        if entry is None:
+            self._observe(method, 'not_found')
+            context.abort(grpc.StatusCode.NOT_FOUND, f"No scaling decision for {service}")
+        if self.stream.age() > self.max_age:
+            self._observe(method, 'stale')
+            context.abort(grpc.StatusCode.UNAVAILABLE,
+                          f"Scaling decisions are {self.stream.age():.0f}s old (limit {self.max_age:.0f}s)")
+        self._observe(method, 'ok')
+        return entry['scaling_decision']
+
+    def IsActive(self, request, context):
+        decision = self._decision('IsActive', request, context)
+        return pb2.IsActiveResponse(result=decision['recommended_replicas'] > 0)
+
+    def StreamIsActive(self, request, context):
+        """Push the active flag on connect and whenever the service's recommendation changes"""
+        service = self._service(request)
+        subscriber = self.stream.subscribe()
+        self._observe('StreamIsActive', 'ok')
+        try:
+            active = None
+            while context.is_active():
+                entry = self.stream.get(service)
+                if entry is not None and (entry['scaling_decision']['recommended_replicas'] > 0) != active:
+                    active = entry['scaling_decision']['recommended_replicas'] > 0
+                    yield pb2.IsActiveResponse(result=active)
+                # Any delta (or the keepalive) is a cue to re-check; only a flip is sent
+                try:
+                    subscriber.queue.get(timeout=self.keepalive)
+                except queue.Empty:
+                    pass
+                if subscriber.lagged:
+                    subscriber.lagged = False
+                    subscriber.drain()
+        finally:
+            self.stream.unsubscribe(subscriber)
+
+    def GetMetricSpec(self, request, context):
+        service = self._service(request)
+        self._observe('GetMetricSpec', 'ok')
+        return pb2.GetMetricSpecResponse(metricSpecs=[
+            pb2.MetricSpec(metricName=self._metric_name(service), targetSize=1, targetSizeFloat=1.0)
+        ])
+
+    def GetMetrics(self, request, context):
+        decision = self._decision('GetMetrics', request.scaledObjectRef, context)
+        replicas = decision['recommended_replicas']
+        metric_name = request.metricName or self._metric_name(self._service(request.scaledObjectRef))
+        return pb2.GetMetricsResponse(metricValues=[
+            pb2.MetricValue(metricName=metric_name, metricValue=int(replicas), metricValueFloat=float(replicas))
+        ])
+
+
+def serve(scaler: DecisionScaler, port: int, workers: int = 16):
+    """Start the external scaler gRPC server; returns it, or None without gRPC"""
+    if not GRPC_AVAILABLE:
+        logger.warning("grpcio or the externalscaler stubs are missing, KEDA external scaler disabled")
+        return None
+    # No SO_REUSEPORT: a second listener in the pod is a bug, not extra capacity
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='external-scaler'),
+                         options=[('grpc.so_reuseport', 0)])
+    pb2_grpc.add_ExternalScalerServicer_to_server(scaler, server)
+    try:
+        server.add_insecure_port(f"[::]:{port}")
+    except RuntimeError as e:
+        logger.error(f"KEDA external scaler cannot listen on port {port}: {e}")
+        return None
+    server.start()
+    logger.info(f"KEDA external scaler listening on port {port}")
+    return server
+
+
+# Lock files and servers of run_in_one_worker; dropping them would release the lock and stop the server
+_held = []
+
+
+def run_in_one_worker(start: Callable[[], object], lock_path: str, retry: float = 5) -> threading.Thread:
+    """Call `start` in only one process of the pod, the one holding an exclusive lock on `lock_path`.
+
+    Every gunicorn worker calls this; the others keep retrying in the
+    background, so when the holder exits the kernel drops its lock and
+    another worker takes over within `retry` seconds.
+    """
+    def acquire():
+        lock_file = open(lock_path, 'w')
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(retry)
+        # Keep the locked file and whatever start() returned (the gRPC server) alive with the process
+        _held.append((lock_file, start()))
+
+    thread = threading.Thread(target=acquire, name='single-worker-lock', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,67 @@
+import numpy as np
+from typing import Dict, Tuple
+
+
+def tier_arrays(tiers: Dict[str, Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(names, cpu cores, memory MB, cost multiplier) of every resource tier"""
+    names = np.array(list(tiers), dtype=object)
+    cpu = np.array([tiers[name]['cpu'] for name in names], dtype=np.float64)
+    memory = np.array([tiers[name]['memory'] for name in names], dtype=np.float64)
+    multiplier = np.array([tiers[name]['cost_multiplier'] for name in names], dtype=np.float64)
+    return names, cpu, memory, multiplier
+
+
+def replica_hourly_costs(tiers: Dict[str, Dict], cost_config: Dict[str, float]) -> np.ndarray:
+    """Hourly cost of one replica of each tier, the same formula as CostOptimizer._calculate_hourly_cost"""
+    _, cpu, memory, multiplier = tier_arrays(tiers)
+    compute = (cpu * cost_config['cpu_cost_per_core_hour']
+               + memory / 1024 * cost_config['memory_cost_per_gb_hour']) * multiplier
+    storage = 0.5 * cost_config['storage_cost_per_gb_hour']
+    network = 0.1 * cost_config['network_cost_per_gb']
+    return compute + storage + network
+
+
+def simulate_grid(cpu_demand: np.ndarray, memory_demand: np.ndarray, scenarios: np.ndarray,
+                  replicas: np.ndarray, tiers: Dict[str, Dict], cost_config: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """Cost and worst-case headroom of every (replicas, tier) configuration for every service.
+
+    `cpu_demand` (cores) and `memory_demand` (MB) hold one entry per service;
+    `scenarios` are load multipliers applied to the CPU demand. Headroom is
+    the spare fraction of the tighter of CPU and memory capacity in the
+    worst scenario, negative when the configuration is overloaded.
+    Shapes: cost (R, T), headroom (S, R, T).
+    """
+    _, tier_cpu, tier_memory, _ = tier_arrays(tiers)
+    replicas = replicas.astype(np.float64)
+
+    cost = replicas[:, None] * replica_hourly_costs(tiers, cost_config)[None, :]
+    cpu_capacity = replicas[:, None] * tier_cpu[None, :]
+    memory_capacity = replicas[:, None] * tier_memory[None, :]
+
+    # (S, K, R, T) collapsed to the worst scenario straight away
+    peak_cpu = (cpu_demand[:, None] * scenarios[None, :]).max(axis=1)
+    cpu_headroom = 1 - peak_cpu[:, None, None] / cpu_capacity[None, :, :]
+    memory_headroom = 1 - memory_demand[:, None, None] / memory_capacity[None, :, :]
+
+    return {'cost': cost, 'headroom': np.minimum(cpu_headroom, memory_headroom)}
+
+
+def pareto_frontier(cost: np.ndarray, headroom: np.ndarray, min_headroom: float = 0.0) -> np.ndarray:
+    """Mask of the configurations no other configuration beats on both cost and headroom.
+
+    `cost` has one entry per configuration and is shared by all services;
+    `headroom` is (services, configurations). Configurations below
+    `min_headroom` are never on the frontier.
+    """
+    services, configs = headroom.shape
+    # Cheapest first, ties broken by the larger headroom
+    order = np.lexsort((-headroom, np.broadcast_to(cost, headroom.shape)), axis=-1)
+    ranked = np.take_along_axis(headroom, order, axis=1)
+
+    best_before = np.maximum.accumulate(ranked, axis=1)
+    best_before = np.concatenate([np.full((services, 1), -np.inf), best_before[:, :-1]], axis=1)
+    on_frontier = (ranked > best_before) & (ranked >= min_headroom)
+
+    mask = np.zeros((services, configs), dtype=bool)
+    np.put_along_axis(mask, order, on_frontier, axis=1)
+    return mask
@@ -0,0 +1,123 @@
+import heapq
+import numpy as np
+from typing import Dict, List, Optional
+
+
+def _lower_hull(cost: np.ndarray, cores: np.ndarray, options: np.ndarray) -> List[int]:
+    """Options on the lower convex hull of (cores, cost), from cheapest to smallest"""
+    # Cheapest first; each further option must save cores to be worth its extra cost
+    options = options[np.lexsort((cores[options], cost[options]))]
+    frontier = options[cores[options] < np.minimum.accumulate(np.r_[np.inf, cores[options]])[:-1]]
+
+    hull = []
+    for option in frontier:
+        while len(hull) >= 2:
+            a, b = hull[-2], hull[-1]
+            # Drop b if going a -> option saves cores at a rate no worse than a -> b
+            if (cost[b] - cost[a]) * (cores[a] - cores[option]) >= (cost[option] - cost[a]) * (cores[a] - cores[b]):
+                hull.pop()
+            else:
+                break
+        hull.append(int(option))
+    return hull
+
+
+def solve_allocation(cost: np.ndarray, cores: np.ndarray, headroom: np.ndarray, slo_headroom: np.ndarray,
+                     cpu_capacity: Optional[float] = None, budget: Optional[float] = None) -> Dict:
+    """Cost-minimal choice of one configuration per service under cluster-wide limits.
+
+    A multiple-choice knapsack: `cost` and `cores` have one entry per
+    configuration, `headroom` is (services, configurations) and a service's
+    configuration must keep its headroom at or above `slo_headroom`.
+    Solved with the greedy on each service's convex hull of (cores, cost),
+    whose fractional last step gives an LP lower bound on the optimum, so
+    the reported gap bounds how far the allocation can be from optimal.
+
+    If the SLO-feasible allocation is over `budget`, services are moved
+    to cheaper, non-overloaded configurations that lose the least headroom
+    per dollar until the budget holds; those services have slo_met False.
+    """
+    services = headroom.shape[0]
+    choice = np.empty(services, dtype=np.int64)
+    slo_met = np.ones(services, dtype=bool)
+    hulls = []
+
+    for i in range(services):
+        feasible = np.flatnonzero(headroom[i] >= slo_headroom[i])
+        if not len(feasible):
+            # The SLO is out of reach on this grid: give the service the most headroom available
+            best = np.flatnonzero(headroom[i] == headroom[i].max())
+            choice[i] = best[np.argmin(cost[best])]
+            slo_met[i] = False
+            hulls.append([int(choice[i])])
+            continue
+        hulls.append(_lower_hull(cost, cores, feasible))
+        choice[i] = hulls[i][0]
+
+    total_cost = float(cost[choice].sum())
+    total_cores = float(cores[choice].sum())
+    lower_bound = total_cost
+    status = 'optimal'
+
+    if cpu_capacity is not None and total_cores > cpu_capacity:
+        # Trade cost for cores at the cheapest marginal rate across all services
+        position = np.zeros(services, dtype=np.int64)
+        moves = []
+        for i, hull in enumerate(hulls):
+            if len(hull) > 1:
+                heapq.heappush(moves, ((cost[hull[1]] - cost[hull[0]]) / (cores[hull[0]] - cores[hull[1]]), i))
+
+        while total_cores > cpu_capacity and moves:
+            _, i = heapq.heappop(moves)
+            hull, step = hulls[i], position[i]
+            extra_cost = float(cost[hull[step + 1]] - cost[hull[step]])
+            saved_cores = float(cores[hull[step]] - cores[hull[step + 1]])
+
+            excess = total_cores - cpu_capacity
+            lower_bound = total_cost + extra_cost * min(1.0, excess / saved_cores)
+
+            position[i] = step + 1
+            choice[i] = hull[step + 1]
+            total_cost += extra_cost
+            total_cores -= saved_cores
+            if step + 2 < len(hull):
+                heapq.heappush(moves, ((cost[hull[step + 2]] - cost[hull[step + 1]])
+                                       / (cores[hull[step + 1]] - cores[hull[step + 2]]), i))
+
+        status = 'optimal' if lower_bound >= total_cost - 1e-9 else 'feasible'
+        if total_cores > cpu_capacity:
+            status = 'capacity_exceeded'
+
+    if budget is not None and total_cost > budget:
+        # Degrade headroom where it buys the most savings, never beyond an overload or the core budget
+        def cheapest_step(i):
+            current = choice[i]
+            candidates = np.flatnonzero((cost < cost[current]) & (headroom[i] >= 0) & (cores <= cores[current]))
+            if not len(candidates):
+                return None
+            best = candidates[np.argmax(headroom[i, candidates] - 1e-9 * cost[candidates])]
+            lost = max(float(headroom[i, current] - headroom[i, best]), 0.0)
+            return lost / float(cost[current] - cost[best]), i, int(best)
+
+        moves = [move for move in (cheapest_step(i) for i in range(services)) if move is not None]
+        heapq.heapify(moves)
+        while total_cost > budget and moves:
+            _, i, option = heapq.heappop(moves)
+            total_cost -= float(cost[choice[i]] - cost[option])
+            total_cores -= float(cores[choice[i]] - cores[option])
+            choice[i] = option
+            slo_met[i] = bool(headroom[i, option] >= slo_headroom[i])
+            move = cheapest_step(i)
+            if move is not None:
+                heapq.heappush(moves, move)
+
+        status = 'within_budget_degraded' if total_cost <= budget else 'over_budget'
+
+    return {
+        'choice': choice,
+        'slo_met': slo_met,
+        'status': status,
+        'total_cost': total_cost,
+        'total_cores': total_cores,
+        'lower_bound': lower_bound
+    }
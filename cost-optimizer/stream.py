@@ -0,0 +1,242 @@
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change makes a decision worth pushing; cost figures drift every tick
+SIGNATURE_FIELDS = ('current_replicas', 'recommended_replicas', 'performance_impact', 'reasoning')
+
+# Only renew or release the leader key if this process still owns it
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def decision_signature(entry: Dict) -> Tuple:
+    decision = entry.get('scaling_decision', {})
+    return tuple(decision.get(field) for field in SIGNATURE_FIELDS)
+
+
+class Subscriber:
+    """Bounded delta queue of one stream client; a client that falls behind is resynced with a snapshot"""
+
+    def __init__(self, size: int):
+        self.queue = queue.Queue(maxsize=size)
+        self.lagged = False
+
+    def offer(self, delta: Dict):
+        try:
+            self.queue.put_nowait(delta)
+        except queue.Full:
+            self.lagged = True
+
+    def drain(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class DecisionStream:
+    """Scaling decisions computed on a fixed tick, published as deltas.
+
+    Readers get the cached state, so read load no longer drives compute.
+    With Redis, one process holds a leader key and evaluates; it stores
+    the full state under `snapshot_key` and publishes each delta on
+    `channel`. The other processes (gunicorn workers, replicas) never
+    evaluate while a leader holds the key: they read the snapshot every
+    tick (every `follow_retry` seconds until the first one arrives) and
+    diff it for their own subscribers. Versions come from a shared
+    counter and travel with the snapshot, so they only grow whichever
+    process a client reconnects to. Without Redis every process
+    evaluates locally.
+    """
+
+    def __init__(self, evaluate: Callable[[], Dict[str, Dict]], interval: float = 30, redis_client=None,
+                 channel: str = 'cost-optimizer:decisions', snapshot_key: str = 'cost-optimizer:decisions:snapshot',
+                 leader_key: str = 'cost-optimizer:decisions:leader',
+                 version_key: str = 'cost-optimizer:decisions:version', queue_size: int = 256,
+                 follow_retry: float = 1.0):
+        self.evaluate = evaluate
+        self.interval = interval
+        self.redis = redis_client
+        self.channel = channel
+        self.snapshot_key = snapshot_key
+        self.leader_key = leader_key
+        self.version_key = version_key
+        self.queue_size = queue_size
+        self.follow_retry = follow_retry
+        self.identity = f"{socket.gethostname()}-{id(self)}"
+        self.version = 0
+        self.updated_at = 0.0
+        self.is_leader = False
+        self.redis_retry_interval = 60
+        self._redis_down_until = 0.0
+        self._state = {}
+        self._signatures = {}
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if redis_client is not None:
+            self._renew = redis_client.register_script(RENEW_SCRIPT)
+            self._release = redis_client.register_script(RELEASE_SCRIPT)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='decision-stream', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader and self._redis_available():
+            try:
+                self._release(keys=[self.leader_key], args=[self.identity])
+            except Exception as e:
+                logger.warning(f"Failed to release decision leadership: {e}")
+        self.is_leader = False
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Decision tick failed: {e}")
+            # A follower still waiting for its first snapshot checks again soon
+            interval = self.interval if self.is_leader or self.updated_at else min(self.interval, self.follow_retry)
+            self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, action: str, error: Exception):
+        # Back off so an unreachable Redis does not stretch every tick by its connect timeout
+        self._redis_down_until = time.monotonic() + self.redis_retry_interval
+        logger.warning(f"Redis unavailable to {action}, evaluating locally for {self.redis_retry_interval}s: {error}")
+
+    def _acquire_leadership(self) -> bool:
+        if not self._redis_available():
+            return True
+        try:
+            ttl = max(1, int(self.interval * 3))
+            if self.is_leader and self._renew(keys=[self.leader_key], args=[self.identity, ttl]):
+                return True
+            return bool(self.redis.set(self.leader_key, self.identity, nx=True, ex=ttl))
+        except Exception as e:
+            self._redis_failed('elect a decision leader', e)
+            return True
+
+    def _read_snapshot(self) -> Optional[Dict]:
+        try:
+            payload = self.redis.get(self.snapshot_key)
+            return json.loads(payload) if payload else None
+        except Exception as e:
+            self._redis_failed('read the decision snapshot', e)
+            return None
+
+    def _publish(self, state: Dict[str, Dict], delta: Optional[Dict]):
+        if not self._redis_available():
+            return
+        try:
+            self.redis.set(self.snapshot_key, json.dumps({'version': self.version, 'updated_at': self.updated_at,
+                                                          'state': state}), ex=max(1, int(self.interval * 3)))
+            if delta is not None:
+                self.redis.publish(self.channel, json.dumps(delta))
+        except Exception as e:
+            self._redis_failed('publish decisions', e)
+
+    def _next_version(self) -> int:
+        if self._redis_available():
+            try:
+                return max(int(self.redis.incr(self.version_key)), self.version + 1)
+            except Exception as e:
+                self._redis_failed('number decision versions', e)
+        return self.version + 1
+
+    def tick(self):
+        """Refresh the state once: evaluate as leader, otherwise follow the leader's snapshot"""
+        self.is_leader = self._acquire_leadership()
+        if self.is_leader:
+            state = self.evaluate()
+            delta = self.apply(state)
+            self._publish(state, delta)
+            return
+
+        snapshot = self._read_snapshot()
+        # Without a snapshot yet, keep serving the current state until the leader writes one
+        if snapshot is not None:
+            self.apply(snapshot['state'], snapshot['version'], snapshot['updated_at'])
+
+    def apply(self, state: Dict[str, Dict], version: Optional[int] = None,
+              updated_at: Optional[float] = None) -> Optional[Dict]:
+        """Replace the state; returns and fans out the delta, or None if no recommendation changed.
+
+        `version` and `updated_at` come with a followed snapshot; otherwise
+        a change takes the next shared version.
+        """
+        signatures = {service: decision_signature(entry) for service, entry in state.items()}
+        with self._lock:
+            changed = {service: state[service] for service, signature in signatures.items()
+                       if self._signatures.get(service) != signature}
+            removed = sorted(set(self._state) - set(state))
+        if version is None and (changed or removed):
+            version = self._next_version()
+
+        # Only the ticker thread calls apply, so the diff above is still current
+        with self._lock:
+            self._state = state
+            self._signatures = signatures
+            self.updated_at = time.time() if updated_at is None else updated_at
+            if version is not None:
+                self.version = version
+            if not changed and not removed:
+                return None
+
+            delta = {'version': self.version, 'changed': changed, 'removed': removed,
+                     'updated_at': self.updated_at}
+            for subscriber in self._subscribers:
+                subscriber.offer(delta)
+        return delta
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'version': self.version, 'updated_at': self.updated_at, 'state': dict(self._state)}
+
+    def get(self, service: str) -> Optional[Dict]:
+        with self._lock:
+            return self._state.get(service)
+
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
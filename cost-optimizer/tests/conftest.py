@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Service modules live next to app.py; the stub server stands in for Prometheus and the predictor
+sys.path[:0] = [os.path.join(ROOT, 'cost-optimizer'), os.path.join(ROOT, 'prometheus-stub')]
+
+from prometheus_stub import PrometheusStub  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    server = PrometheusStub().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def backup_stub():
+    server = PrometheusStub().start()
+    yield server
+    server.stop()
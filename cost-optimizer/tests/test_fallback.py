@@ -0,0 +1,99 @@
+import socket
+
+import pytest
+
+import fallback
+from fallback import FallbackProvider
+
+USAGE = {'cpu_usage_percent': 62.0, 'memory_usage_mb': 300.0, 'replica_count': 3}
+PREDICTION = {'service': 'user-service', 'predicted_cpu': 70.0, 'confidence': 0.8, 'recommended_replicas': 4}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(fallback.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture(autouse=True)
+def no_network(monkeypatch):
+    """The fallback path must work with every upstream down, so any connection attempt fails the test"""
+    def refuse(*args, **kwargs):
+        raise AssertionError('the fallback path opened a network connection')
+
+    monkeypatch.setattr(socket.socket, 'connect', refuse)
+    monkeypatch.setattr(socket, 'create_connection', refuse)
+
+
+@pytest.mark.parametrize('mode', ['last_known_good', 'synthetic'])
+def test_same_inputs_give_the_same_output(mode, clock):
+    provider = FallbackProvider(mode)
+    provider.remember('usage', 'user-service', USAGE)
+    first = [provider.usage('user-service'), provider.prediction('user-service', USAGE)]
+    again = FallbackProvider(mode)
+    again.remember('usage', 'user-service', USAGE)
+    assert [provider.usage('user-service'), provider.prediction('user-service', USAGE)] == first
+    assert [again.usage('user-service'), again.prediction('user-service', USAGE)] == first
+
+
+def test_last_known_good_values_fill_the_gaps(clock):
+    provider = FallbackProvider(max_age=900)
+    provider.remember('usage', 'user-service', USAGE)
+    provider.remember('prediction', 'user-service', PREDICTION)
+    clock[0] += 450
+
+    usage = provider.usage('user-service', {'cpu_usage_percent': 40.0, 'memory_usage_mb': None})
+    assert usage['cpu_usage_percent'] == 40.0
+    assert (usage['memory_usage_mb'], usage['replica_count']) == (300.0, 3)
+    assert (usage['source'], usage['age_seconds']) == ('partial:last_known_good', 450.0)
+
+    prediction = provider.prediction('user-service', usage)
+    assert prediction['predicted_cpu'] == 70.0
+    # Confidence fades with age: halfway to max_age keeps three quarters of it
+    assert prediction['confidence'] == pytest.approx(0.6)
+    assert prediction['source'] == 'last_known_good'
+
+
+def test_expired_values_fall_back_to_the_static_defaults(clock):
+    provider = FallbackProvider(max_age=900)
+    provider.remember('usage', 'user-service', USAGE)
+    provider.remember('prediction', 'user-service', PREDICTION)
+    clock[0] += 901
+
+    usage = provider.usage('user-service')
+    assert {field: usage[field] for field in USAGE} == provider.defaults
+    assert (usage['source'], usage['age_seconds']) == ('default', None)
+
+    prediction = provider.prediction('user-service', usage)
+    assert prediction['source'] == 'persistence'
+    assert prediction['predicted_cpu'] == usage['cpu_usage_percent']
+    assert prediction['recommended_replicas'] == usage['replica_count']
+
+
+def test_unknown_services_get_the_static_defaults(clock):
+    provider = FallbackProvider()
+    usage = provider.usage('never-seen')
+    assert usage['source'] == 'default' and usage['missing_fields'] == list(USAGE)
+    assert provider.prediction('never-seen', usage)['source'] == 'persistence'
+
+
+def test_complete_observations_pass_through(clock):
+    usage = FallbackProvider().usage('user-service', USAGE)
+    assert usage == dict(USAGE, source='prometheus', age_seconds=0.0)
+
+
+def test_snapshot_survives_a_restart(tmp_path, clock):
+    path = str(tmp_path / 'last-known-good.json')
+    provider = FallbackProvider(path=path)
+    provider.remember('usage', 'user-service', USAGE)
+
+    restarted = FallbackProvider(path=path)
+    assert restarted.usage('user-service')['source'] == 'last_known_good'
+    clock[0] += 901
+    assert restarted.usage('user-service')['source'] == 'default'
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FallbackProvider('random')
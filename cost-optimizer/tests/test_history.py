@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from history import CostHistory
+
+T0 = 1_700_000_000.0
+
+
+@pytest.fixture
+def histories(tmp_path):
+    """CostHistory instances on one directory, like the gunicorn workers of a pod"""
+    created = []
+
+    def make(**kwargs):
+        history = CostHistory(str(tmp_path), **{'flush_interval': 3600, **kwargs})
+        created.append(history)
+        return history
+
+    yield make
+    # Their atexit flush would otherwise run after tmp_path is gone
+    for history in created:
+        history.enabled = False
+
+
+def add(history, count, start=0, service='user-service'):
+    for i in range(start, start + count):
+        history.append(service, 'small', 'micro', 3, 2, cost=float(i), predicted_cost=float(i) / 2, ts=T0 + i)
+
+
+def test_ring_keeps_the_newest_records_after_wrapping(histories):
+    history = histories(capacity=5)
+    add(history, 12)
+    assert len(history) == 5
+    records = history.records(0)
+    assert records['ts'].tolist() == [T0 + i for i in range(7, 12)]
+    assert records['cost'].tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+
+
+def test_range_queries_across_the_wrap_point(histories):
+    history = histories(capacity=8)
+    add(history, 6, service='user-service')
+    add(history, 6, start=6, service='order-service')
+    # The ring now holds ts 4..11 with the write position in the middle
+    assert history._head == 4
+
+    records = history.records(T0 + 5, T0 + 9)
+    assert records['ts'].tolist() == [T0 + i for i in range(5, 10)]
+    assert history.records(T0 + 3, T0 + 7, service='user-service')['ts'].tolist() == [T0 + 4, T0 + 5]
+    assert history.records(T0 + 100).size == 0
+
+
+def test_restart_replays_the_append_log(histories):
+    history = histories()
+    add(history, 10)
+    history.flush()
+
+    restarted = histories()
+    assert len(restarted) == 10
+    np.testing.assert_array_equal(restarted.records(0), history.records(0))
+
+    # A smaller buffer keeps only the newest records of the log
+    small = histories(capacity=4)
+    assert small.records(0)['cost'].tolist() == [6.0, 7.0, 8.0, 9.0]
+
+
+def test_restart_reads_the_rotated_log_first(histories):
+    history = histories(max_file_records=5)
+    add(history, 6)
+    history.flush()
+    add(history, 3, start=6)
+    history.flush()
+
+    restarted = histories()
+    assert restarted.records(0)['cost'].tolist() == [float(i) for i in range(9)]
+
+
+def test_flush_picks_up_records_from_other_workers(histories):
+    first, second = histories(), histories()
+    add(first, 3, service='user-service')
+    add(second, 2, start=3, service='order-service')
+    first.flush()
+    second.flush()
+    first.flush()
+
+    for history in (first, second):
+        records = history.records(0)
+        assert records['ts'].tolist() == [T0 + i for i in range(5)]
+        assert len(history) == 5
+
+
+def test_unflushed_records_are_not_replayed(histories):
+    history = histories()
+    add(history, 3)
+    assert len(histories()) == 0
+
+
+def test_records_written_before_another_worker_rotated_are_not_lost(histories):
+    first, second = histories(max_file_records=4), histories(max_file_records=4)
+    add(first, 2)
+    first.flush()
+    second.flush()
+    # The second worker's flush pushes the log past its limit and rotates it
+    add(second, 3, start=2)
+    second.flush()
+    add(first, 1, start=5)
+    first.flush()
+
+    assert first.records(0)['cost'].tolist() == [float(i) for i in range(6)]
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+import requests
+
+from resilience import AdaptiveTimeout, CircuitBreaker, CircuitOpenError, Upstream
+
+QUERY = ('/api/v1/query', {'query': 'up'})
+
+
+def make_upstream(urls, reset_timeout=0.2, hedge=False, events=None, timeout=None):
+    events = [] if events is None else events
+    breaker = CircuitBreaker('prometheus', failure_threshold=3, reset_timeout=reset_timeout,
+                             on_change=lambda name, state: events.append(('state', state)))
+    return Upstream('prometheus', urls, breaker, timeout or AdaptiveTimeout(minimum=0.05, maximum=2.0),
+                    hedge=hedge, on_hedge=lambda name, winner: events.append(('hedge', winner)))
+
+
+def test_breaker_single_half_open_probe():
+    breaker = CircuitBreaker('predictor', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_adaptive_timeout_follows_p99():
+    timeout = AdaptiveTimeout(minimum=0.1, maximum=5.0, multiplier=3.0, window=100, warmup=20)
+    for _ in range(10):
+        timeout.observe(0.2)
+    assert timeout.current == 5.0 and timeout.quantile(0.99) is None
+
+    for _ in range(10):
+        timeout.observe(0.2)
+    assert timeout.current == pytest.approx(0.6)
+
+    for _ in range(100):
+        timeout.observe(0.001)
+    assert timeout.current == 0.1
+
+
+def test_breaker_opens_half_opens_and_closes_against_stub(stub):
+    events = []
+    upstream = make_upstream([stub.url], events=events)
+
+    stub.set_faults(error_rate=1.0)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            upstream.get(*QUERY)
+    assert upstream.breaker.state == CircuitBreaker.OPEN
+
+    # Open: calls fail fast without reaching the server
+    served = dict(stub.request_counts)
+    with pytest.raises(CircuitOpenError):
+        upstream.get(*QUERY)
+    assert stub.request_counts == served
+
+    # A failed probe re-opens the breaker
+    time.sleep(0.25)
+    with pytest.raises(requests.HTTPError):
+        upstream.get(*QUERY)
+    assert upstream.breaker.state == CircuitBreaker.OPEN
+
+    stub.set_faults(error_rate=0.0)
+    time.sleep(0.25)
+    assert upstream.get(*QUERY).status_code == 200
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+    assert [state for kind, state in events if kind == 'state'] == ['open', 'half_open', 'open', 'half_open', 'closed']
+
+
+def test_hedge_goes_to_backup_when_primary_is_slow(stub, backup_stub):
+    events = []
+    upstream = make_upstream([stub.url, backup_stub.url], hedge=True, events=events)
+    for _ in range(20):
+        upstream.get(*QUERY)
+    assert upstream.timeout.quantile(0.95) < 0.1
+    assert events == []
+
+    stub.set_faults(latency_ms=1000)
+    started = time.perf_counter()
+    assert upstream.get(*QUERY).status_code == 200
+    # The slow primary is abandoned, not waited for
+    assert time.perf_counter() - started < 0.5
+    assert events == [('hedge', 'backup')]
+    assert backup_stub.request_counts['/api/v1/query'] == 1
+
+
+def test_hedge_fails_when_both_copies_fail(stub, backup_stub):
+    events = []
+    upstream = make_upstream([stub.url, backup_stub.url], hedge=True, events=events)
+    for _ in range(20):
+        upstream.get(*QUERY)
+
+    stub.set_faults(latency_ms=300, error_rate=1.0)
+    backup_stub.set_faults(error_rate=1.0)
+    with pytest.raises(requests.HTTPError):
+        upstream.get(*QUERY)
+    assert events == [('hedge', 'none')]
+    assert upstream.breaker.failures == 1
+
+
+def test_timeout_counts_as_failure(stub):
+    upstream = make_upstream([stub.url], timeout=AdaptiveTimeout(minimum=0.05, maximum=0.1))
+    stub.set_faults(latency_ms=300)
+    with pytest.raises(requests.Timeout):
+        upstream.get(*QUERY)
+    assert upstream.breaker.failures == 1
@@ -0,0 +1,160 @@
+import atexit
+import importlib
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+from stream import DecisionStream
+
+grpc = pytest.importorskip('grpc')
+protoc = pytest.importorskip('grpc_tools.protoc')
+
+# The stubs are generated at image build time; generate them the same way for the tests
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS_DIR = tempfile.mkdtemp(prefix='externalscaler-stubs-')
+atexit.register(shutil.rmtree, STUBS_DIR, True)
+assert protoc.main(['grpc_tools.protoc', f'-I{SERVICE_DIR}', f'--python_out={STUBS_DIR}',
+                    f'--grpc_python_out={STUBS_DIR}', os.path.join(SERVICE_DIR, 'externalscaler.proto')]) == 0
+sys.path.insert(0, STUBS_DIR)
+
+import externalscaler_pb2 as pb2  # noqa: E402
+import externalscaler_pb2_grpc as pb2_grpc  # noqa: E402
+import scaler  # noqa: E402
+
+if not scaler.GRPC_AVAILABLE:
+    scaler = importlib.reload(scaler)
+
+
+def decision(recommended):
+    return {'scaling_decision': {'current_replicas': 2, 'recommended_replicas': recommended}}
+
+
+class Aborted(Exception):
+    pass
+
+
+class Context:
+    """What the servicer uses of grpc.ServicerContext"""
+
+    def abort(self, code, details):
+        self.code, self.details = code, details
+        raise Aborted(details)
+
+    def is_active(self):
+        return True
+
+
+@pytest.fixture
+def stream():
+    stream = DecisionStream(dict, interval=30)
+    stream.apply({'user-service': decision(3), 'order-service': decision(0)})
+    return stream
+
+
+@pytest.fixture
+def outcomes():
+    return []
+
+
+@pytest.fixture
+def servicer(stream, outcomes):
+    return scaler.DecisionScaler(stream, max_age=120, observer=lambda method, outcome: outcomes.append(
+        (method, outcome)))
+
+
+def ref(name, **metadata):
+    return pb2.ScaledObjectRef(name=name, namespace='default', scalerMetadata=metadata)
+
+
+def test_is_active_follows_the_recommendation(servicer, outcomes):
+    assert servicer.IsActive(ref('user-service'), Context()).result is True
+    assert servicer.IsActive(ref('order-service'), Context()).result is False
+    assert outcomes == [('IsActive', 'ok'), ('IsActive', 'ok')]
+
+
+def test_get_metrics_reports_the_recommended_replicas(servicer):
+    response = servicer.GetMetrics(pb2.GetMetricsRequest(scaledObjectRef=ref('user-service')), Context())
+    (value,) = response.metricValues
+    assert (value.metricName, value.metricValue, value.metricValueFloat) == \
+        ('user-service-recommended-replicas', 3, 3.0)
+
+    spec = servicer.GetMetricSpec(ref('user-service'), Context()).metricSpecs[0]
+    assert (spec.metricName, spec.targetSize) == ('user-service-recommended-replicas', 1)
+
+
+def test_metadata_names_the_service(servicer):
+    request = pb2.GetMetricsRequest(scaledObjectRef=ref('frontend-scaler', service='user-service'),
+                                    metricName='custom')
+    (value,) = servicer.GetMetrics(request, Context()).metricValues
+    assert (value.metricName, value.metricValue) == ('custom', 3)
+
+
+def test_unknown_services_and_stale_decisions_are_errors(servicer, stream, outcomes):
+    context = Context()
+    with pytest.raises(Aborted):
+        servicer.IsActive(ref('no-such-service'), context)
+    assert context.code == grpc.StatusCode.NOT_FOUND
+
+    stream.apply({'user-service': decision(3)}, version=stream.version, updated_at=time.time() - 300)
+    with pytest.raises(Aborted):
+        servicer.GetMetrics(pb2.GetMetricsRequest(scaledObjectRef=ref('user-service')), context)
+    assert context.code == grpc.StatusCode.UNAVAILABLE
+    assert outcomes == [('IsActive', 'not_found'), ('GetMetrics', 'stale')]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_served_over_grpc(servicer):
+    port = free_port()
+    server = scaler.serve(servicer, port, workers=2)
+    try:
+        with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+            stub = pb2_grpc.ExternalScalerStub(channel)
+            request = pb2.GetMetricsRequest(scaledObjectRef=ref('user-service'))
+            assert stub.GetMetrics(request, timeout=5).metricValues[0].metricValue == 3
+            with pytest.raises(grpc.RpcError) as error:
+                stub.IsActive(ref('no-such-service'), timeout=5)
+            assert error.value.code() == grpc.StatusCode.NOT_FOUND
+    finally:
+        server.stop(None)
+
+
+@pytest.fixture
+def held():
+    yield scaler._held
+    for lock_file, _ in scaler._held:
+        lock_file.close()
+    scaler._held.clear()
+
+
+def test_only_the_lock_holder_starts_the_server(tmp_path, held):
+    lock_path = str(tmp_path / 'external-scaler.lock')
+    started = []
+    second_started = threading.Event()
+
+    def start():
+        started.append(True)
+        if len(started) == 2:
+            second_started.set()
+        return object()
+
+    scaler.run_in_one_worker(start, lock_path, retry=0.05).join(5)
+    second = scaler.run_in_one_worker(start, lock_path, retry=0.05)
+    time.sleep(0.3)
+    assert len(started) == 1 and second.is_alive()
+
+    # The holder going away (a worker exiting) lets the waiting one take over
+    held[0][0].close()
+    assert second_started.wait(5)
+    second.join(5)
+    assert len(started) == 2 and len(held) == 2
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from simulate import pareto_frontier, replica_hourly_costs, simulate_grid
+
+COST_CONFIG = {
+    'cpu_cost_per_core_hour': 0.048,
+    'memory_cost_per_gb_hour': 0.0053,
+    'storage_cost_per_gb_hour': 0.0001,
+    'network_cost_per_gb': 0.09,
+}
+TIERS = {
+    'micro': {'cpu': 0.1, 'memory': 128, 'cost_multiplier': 1.0},
+    'medium': {'cpu': 0.5, 'memory': 512, 'cost_multiplier': 1.5},
+    'xlarge': {'cpu': 2.0, 'memory': 2048, 'cost_multiplier': 3.5},
+}
+
+
+def hourly_cost(replicas, tier):
+    """CostOptimizer._calculate_hourly_cost, one configuration at a time"""
+    config = TIERS[tier]
+    cpu_cost = replicas * config['cpu'] * COST_CONFIG['cpu_cost_per_core_hour']
+    memory_cost = replicas * (config['memory'] / 1024) * COST_CONFIG['memory_cost_per_gb_hour']
+    storage_cost = replicas * 0.5 * COST_CONFIG['storage_cost_per_gb_hour']
+    network_cost = replicas * 0.1 * COST_CONFIG['network_cost_per_gb']
+    return (cpu_cost + memory_cost) * config['cost_multiplier'] + storage_cost + network_cost
+
+
+def headroom(cpu_cores, memory_mb, scenarios, replicas, tier):
+    config = TIERS[tier]
+    cpu = 1 - max(cpu_cores * s for s in scenarios) / (replicas * config['cpu'])
+    memory = 1 - memory_mb / (replicas * config['memory'])
+    return min(cpu, memory)
+
+
+def test_grid_matches_the_scalar_formulas():
+    cpu, memory = np.array([0.3, 2.5]), np.array([200.0, 3000.0])
+    scenarios = np.array([0.8, 1.0, 1.5])
+    replicas = np.arange(1, 11)
+    grid = simulate_grid(cpu, memory, scenarios, replicas, TIERS, COST_CONFIG)
+    assert grid['cost'].shape == (10, 3) and grid['headroom'].shape == (2, 10, 3)
+
+    for r, t, tier in [(1, 0, 'micro'), (3, 1, 'medium'), (10, 2, 'xlarge'), (7, 0, 'micro')]:
+        assert grid['cost'][r - 1, t] == pytest.approx(hourly_cost(r, tier))
+        for s in range(2):
+            assert grid['headroom'][s, r - 1, t] == pytest.approx(
+                headroom(cpu[s], memory[s], scenarios, r, tier))
+    np.testing.assert_allclose(replica_hourly_costs(TIERS, COST_CONFIG),
+                               [hourly_cost(1, tier) for tier in TIERS])
+
+
+def dominated(cost, headroom, i):
+    better_or_equal = (cost <= cost[i]) & (headroom >= headroom[i])
+    strictly = (cost < cost[i]) | (headroom > headroom[i])
+    return bool((better_or_equal & strictly).any())
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_frontier_holds_exactly_the_undominated_points(seed):
+    rng = np.random.default_rng(seed)
+    # Few distinct values, so equal costs and equal headrooms are common
+    cost = rng.integers(1, 6, 40).astype(float)
+    headroom = rng.integers(-3, 6, (3, 40)) / 10
+
+    mask = pareto_frontier(cost, headroom, min_headroom=0.0)
+    for s in range(3):
+        for i in range(40):
+            undominated = headroom[s, i] >= 0 and not dominated(cost, headroom[s], i)
+            if mask[s, i]:
+                assert undominated
+            elif undominated:
+                # Left out only as the duplicate of an identical point already kept
+                twins = np.flatnonzero((cost == cost[i]) & (headroom[s] == headroom[s, i]) & mask[s])
+                assert len(twins) == 1
+
+
+def test_ties_keep_one_point_the_first_listed():
+    cost = np.array([2.0, 1.0, 1.0, 1.0, 3.0, 3.0])
+    headroom = np.array([[0.5, 0.2, 0.4, 0.4, 0.6, 0.6]])
+    mask = pareto_frontier(cost, headroom)
+    # Equal cost: the larger headroom wins; identical points: the first one listed
+    assert mask[0].tolist() == [True, False, True, False, True, False]
+
+    # Listing the same configurations in another order picks the same (cost, headroom) points
+    order = np.array([5, 3, 1, 0, 4, 2])
+    shuffled = pareto_frontier(cost[order], headroom[:, order])
+    kept = {(c, h) for c, h, m in zip(cost[order], headroom[0, order], shuffled[0]) if m}
+    assert kept == {(1.0, 0.4), (2.0, 0.5), (3.0, 0.6)}
+    assert shuffled[0].tolist() == [True, True, False, True, False, False]
+
+
+def test_min_headroom_excludes_overloaded_configurations():
+    cost = np.array([1.0, 2.0, 3.0])
+    headroom = np.array([[-0.2, 0.1, 0.3]])
+    assert pareto_frontier(cost, headroom, min_headroom=0.0)[0].tolist() == [False, True, True]
+    assert pareto_frontier(cost, headroom, min_headroom=0.2)[0].tolist() == [False, False, True]
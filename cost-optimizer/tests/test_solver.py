@@ -0,0 +1,131 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from simulate import simulate_grid
+from solver import solve_allocation
+
+COST_CONFIG = {
+    'cpu_cost_per_core_hour': 0.048,
+    'memory_cost_per_gb_hour': 0.0053,
+    'storage_cost_per_gb_hour': 0.0001,
+    'network_cost_per_gb': 0.09,
+}
+TIERS = {
+    'small': {'cpu': 0.25, 'memory': 256, 'cost_multiplier': 1.2},
+    'medium': {'cpu': 0.5, 'memory': 512, 'cost_multiplier': 1.5},
+    'large': {'cpu': 1.0, 'memory': 1024, 'cost_multiplier': 2.0},
+}
+
+
+def grid(seed, services=3, max_replicas=6):
+    """(cost, cores, headroom) of every (replicas, tier) configuration, laid out like app.simulation_grid"""
+    rng = np.random.default_rng(seed)
+    replicas = np.arange(1, max_replicas + 1)
+    result = simulate_grid(rng.uniform(0.2, 2.0, services), rng.uniform(100, 800, services),
+                           np.array([1.0, 1.25]), replicas, TIERS, COST_CONFIG)
+    cores = np.repeat(replicas, len(TIERS)) * np.tile([t['cpu'] for t in TIERS.values()], len(replicas))
+    return result['cost'].ravel(), cores, result['headroom'].reshape(services, -1)
+
+
+def brute_force(cost, cores, headroom, slo, cpu_capacity=np.inf):
+    """Cheapest SLO-feasible allocation within the core capacity, trying every combination"""
+    feasible = [np.flatnonzero(row >= slo) for row in headroom]
+    best = None
+    for combo in itertools.product(*feasible):
+        combo = list(combo)
+        if cores[combo].sum() <= cpu_capacity and (best is None or cost[combo].sum() < cost[best].sum()):
+            best = combo
+    return best
+
+
+def test_slo_infeasible_options_are_excluded():
+    cost = np.array([1.0, 2.0, 3.0])
+    cores = np.array([1.0, 2.0, 3.0])
+    headroom = np.array([[0.1, 0.3, 0.5],
+                         [-0.5, -0.2, 0.1]])
+    solution = solve_allocation(cost, cores, headroom, np.array([0.2, 0.2]))
+    # The cheapest option misses the first service's SLO; nothing meets the second's
+    assert solution['choice'].tolist() == [1, 2]
+    assert solution['slo_met'].tolist() == [True, False]
+    assert solution['status'] == 'optimal'
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_unconstrained_choice_is_the_cheapest_feasible(seed):
+    cost, cores, headroom = grid(seed)
+    solution = solve_allocation(cost, cores, headroom, np.full(3, 0.2))
+    assert solution['choice'].tolist() == brute_force(cost, cores, headroom, 0.2)
+    assert solution['lower_bound'] == solution['total_cost']
+
+
+def tradeoffs(seed, services=3, configs=8):
+    """Random instance where saving cores costs money, which the tier grid alone never asks for"""
+    rng = np.random.default_rng(seed)
+    cores = rng.integers(1, 9, configs).astype(float)
+    cost = 10 - cores + rng.uniform(0, 3, configs)
+    return cost, cores, rng.uniform(0, 1, (services, configs))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_core_capacity_holds_and_the_lower_bound_brackets_the_optimum(seed):
+    cost, cores, headroom = tradeoffs(seed)
+    cheapest = brute_force(cost, cores, headroom, 0.2)
+    # Tight enough that the cheapest allocation no longer fits
+    capacity = cores[cheapest].sum() * 0.7
+    optimum = brute_force(cost, cores, headroom, 0.2, capacity)
+
+    solution = solve_allocation(cost, cores, headroom, np.full(3, 0.2), cpu_capacity=capacity)
+    if optimum is None:
+        assert solution['status'] == 'capacity_exceeded'
+        return
+    assert solution['total_cores'] <= capacity + 1e-9
+    assert (headroom[np.arange(3), solution['choice']] >= 0.2).all()
+    assert solution['lower_bound'] <= cost[optimum].sum() + 1e-9 <= solution['total_cost'] + 1e-9
+    if solution['status'] == 'optimal':
+        assert solution['total_cost'] == pytest.approx(cost[optimum].sum())
+
+
+def test_an_exact_hull_step_is_reported_optimal():
+    cost = np.array([1.0, 1.5, 3.0])
+    cores = np.array([4.0, 2.0, 1.0])
+    headroom = np.array([[0.5, 0.5, 0.5],
+                         [0.5, 0.5, 0.5]])
+    # Dropping one service to 2 cores fits exactly, so the LP bound is met
+    solution = solve_allocation(cost, cores, headroom, np.full(2, 0.2), cpu_capacity=6.0)
+    assert sorted(solution['choice'].tolist()) == [0, 1]
+    assert (solution['status'], solution['total_cost'], solution['total_cores']) == ('optimal', 2.5, 6.0)
+    assert solution['lower_bound'] == 2.5
+
+
+def test_budget_degrades_the_service_losing_the_least_headroom_per_dollar():
+    cost = np.array([1.0, 2.0, 3.0, 4.0])
+    cores = np.array([1.0, 2.0, 3.0, 4.0])
+    headroom = np.array([[0.05, 0.25, 0.30, 0.35],
+                         [0.10, 0.20, 0.40, 0.45]])
+    slo = np.array([0.3, 0.3])
+    budget = 5.0
+
+    solution = solve_allocation(cost, cores, headroom, slo, budget=budget)
+    # Brute force: the most total headroom for the money, never overloaded or above the SLO choice's cores
+    start = [2, 2]
+    options = [[o for o in range(4) if cost[o] <= cost[s] and cores[o] <= cores[s]] for s in start]
+    best = max((combo for combo in itertools.product(*options) if cost[list(combo)].sum() <= budget),
+               key=lambda combo: headroom[[0, 1], list(combo)].sum())
+    assert solution['choice'].tolist() == list(best) == [1, 2]
+    assert solution['slo_met'].tolist() == [False, True]
+    assert solution['status'] == 'within_budget_degraded'
+    assert solution['total_cost'] == 5.0
+
+
+def test_budget_below_the_minimum_allocation_degrades_as_far_as_it_can():
+    cost, cores, headroom = grid(3)
+    solution = solve_allocation(cost, cores, headroom, np.full(3, 0.2), budget=0.01)
+    assert solution['status'] == 'over_budget'
+    assert solution['total_cost'] == pytest.approx(cost[solution['choice']].sum())
+    for i, option in enumerate(solution['choice']):
+        # Never overloaded, and nothing cheaper is left that is not
+        assert headroom[i, option] >= 0
+        assert not ((cost < cost[option]) & (headroom[i] >= 0) & (cores <= cores[option])).any()
+        assert solution['slo_met'][i] == (headroom[i, option] >= 0.2)
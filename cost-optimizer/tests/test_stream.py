@@ -0,0 +1,110 @@
+import fakeredis
+import pytest
+
+from stream import DecisionStream
+
+
+def decision(recommended, cost=0.1):
+    return {'scaling_decision': {'current_replicas': 2, 'recommended_replicas': recommended,
+                                 'performance_impact': 'neutral', 'reasoning': 'test',
+                                 'cost_impact_per_hour': cost}}
+
+
+class Evaluator:
+    def __init__(self, state):
+        self.state = state
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return dict(self.state)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_stream(server, evaluator, name):
+    stream = DecisionStream(evaluator, interval=10, redis_client=fakeredis.FakeRedis(server=server,
+                                                                                      decode_responses=True))
+    stream.identity = name
+    return stream
+
+
+def test_follower_serves_leader_snapshot(server):
+    leader_eval, follower_eval = Evaluator({'user-service': decision(3)}), Evaluator({})
+    leader, follower = make_stream(server, leader_eval, 'a'), make_stream(server, follower_eval, 'b')
+
+    leader.tick()
+    follower.tick()
+    assert leader.is_leader and not follower.is_leader
+    assert follower_eval.calls == 0
+    assert follower.get('user-service') == decision(3)
+    assert follower.version == leader.version
+    assert follower.updated_at == leader.updated_at
+
+
+def test_follower_waits_for_first_snapshot(server):
+    evaluator = Evaluator({'user-service': decision(3)})
+    follower = make_stream(server, evaluator, 'b')
+    follower.redis.set(follower.leader_key, 'a', ex=30)
+
+    follower.tick()
+    assert not follower.is_leader
+    assert evaluator.calls == 0
+    assert follower.snapshot()['state'] == {}
+
+
+def test_renewal_never_extends_another_owners_key(server):
+    leader = make_stream(server, Evaluator({'user-service': decision(3)}), 'a')
+    leader.tick()
+    assert leader.is_leader
+
+    # The key expired and another pod took it between two ticks
+    leader.redis.set(leader.leader_key, 'b', ex=5)
+    leader.tick()
+    assert not leader.is_leader
+    assert leader.redis.get(leader.leader_key) == 'b'
+    assert leader.redis.ttl(leader.leader_key) <= 5
+
+    leader.stop()
+    assert leader.redis.get(leader.leader_key) == 'b'
+
+
+def test_versions_keep_rising_across_leaders(server):
+    first = make_stream(server, Evaluator({'user-service': decision(3)}), 'a')
+    first.tick()
+    first.stop()
+    assert first.redis.get(first.leader_key) is None
+
+    second = make_stream(server, Evaluator({'user-service': decision(4)}), 'b')
+    second.tick()
+    assert second.is_leader
+    assert second.version > first.version
+
+
+def test_only_recommendation_changes_make_deltas(server):
+    evaluator = Evaluator({'user-service': decision(3, cost=0.1)})
+    stream = make_stream(server, evaluator, 'a')
+    subscriber = stream.subscribe()
+    stream.tick()
+    version = stream.version
+
+    evaluator.state = {'user-service': decision(3, cost=0.2)}
+    stream.tick()
+    assert stream.version == version
+    assert subscriber.queue.qsize() == 1
+
+    evaluator.state = {}
+    stream.tick()
+    delta = subscriber.queue.queue[-1]
+    assert delta['removed'] == ['user-service'] and delta['version'] == version + 1
+
+
+def test_evaluates_locally_without_redis():
+    evaluator = Evaluator({'user-service': decision(3)})
+    stream = DecisionStream(evaluator, interval=10)
+    stream.tick()
+    assert stream.is_leader and evaluator.calls == 1
+    assert stream.version == 1
@@ -0,0 +1,87 @@
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+def vector_by_label(result: List[Dict], label: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Instant-vector result as (label values, float values) arrays; unlabeled series are dropped"""
+    rows = [(series['metric'].get(label), series['value'][1]) for series in result]
+    rows = [row for row in rows if row[0] is not None]
+    if not rows:
+        return np.empty(0, dtype=object), np.empty(0)
+    keys, values = zip(*rows)
+    return np.array(keys, dtype=object), np.asarray(values, dtype=np.float64)
+
+
+class UsageTable:
+    """Per-service usage for every deployment, built from one batched query per metric.
+
+    Columns are aligned NumPy arrays indexed by service; per-pod figures are
+    totals divided by the replica count, so multi-pod services are no
+    longer reduced to whichever pod Prometheus returned first.
+    """
+
+    def __init__(self, services: np.ndarray, cpu_total: np.ndarray, memory_total: np.ndarray,
+                 replicas: np.ndarray, fetched_at: Optional[float] = None):
+        self.services = services
+        self.cpu_total = cpu_total
+        self.memory_total = memory_total
+        self.replicas = replicas
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self._index = {service: i for i, service in enumerate(services)}
+
+        # NaN replicas: pods seen by cAdvisor that belong to no deployment
+        pods = np.where(replicas > 0, replicas, 1)
+        self.cpu_per_pod = cpu_total / pods
+        self.memory_per_pod = memory_total / pods
+
+    @classmethod
+    def from_results(cls, cpu: List[Dict], memory: List[Dict], replicas: List[Dict],
+                     label: str = 'service', replica_label: str = 'deployment') -> 'UsageTable':
+        columns = [vector_by_label(cpu, label), vector_by_label(memory, label),
+                   vector_by_label(replicas, replica_label)]
+        services = np.array(sorted(set().union(*(keys for keys, _ in columns))), dtype=object)
+
+        aligned = []
+        for keys, values in columns:
+            column = np.full(len(services), np.nan)
+            if len(keys):
+                column[np.searchsorted(services, keys)] = values
+            aligned.append(column)
+
+        cpu_total, memory_total, replica_counts = aligned
+        return cls(services, cpu_total, memory_total, replica_counts, time.time())
+
+    @classmethod
+    def empty(cls) -> 'UsageTable':
+        return cls(np.empty(0, dtype=object), np.empty(0), np.empty(0), np.empty(0), 0.0)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def deployments(self) -> np.ndarray:
+        return self.services[~np.isnan(self.replicas)]
+
+    def __contains__(self, service: str) -> bool:
+        return service in self._index
+
+    def __len__(self) -> int:
+        return len(self.services)
+
+    def get(self, service: str) -> Optional[Dict]:
+        """Usage of one service; fields Prometheus had no data for are None"""
+        i = self._index.get(service)
+        if i is None:
+            return None
+
+        def value(column):
+            return None if np.isnan(column[i]) else float(column[i])
+
+        replicas = value(self.replicas)
+        return {
+            'cpu_usage_percent': value(self.cpu_per_pod),
+            'memory_usage_mb': value(self.memory_per_pod),
+            'cpu_total_percent': value(self.cpu_total),
+            'memory_total_mb': value(self.memory_total),
+            'replica_count': None if replicas is None else int(replicas)
+        }
@@ -149,6 +149,10 @@ fi
 
 # Step 5: Deploy predictor service
 print_status "Deploying predictor service..."
+# Key the predictor pods sign shared models with; created once so redeploys keep it
+kubectl get secret predictor-model-sync >/dev/null 2>&1 || \
+    kubectl create secret generic predictor-model-sync --from-literal=secret="$(head -c 32 /dev/urandom | base64)"
+kubectl apply -f predictor-service/k8s/rbac.yaml
 kubectl apply -f predictor-service/k8s/deployment.yaml
 kubectl apply -f predictor-service/k8s/service.yaml
 
@@ -180,6 +184,9 @@ spec:
         image: starlorddk7/cost-optimizer:latest
         ports:
         - containerPort: 5000
+          name: http
+        - containerPort: 6000
+          name: external-scaler
         env:
         - name: PROMETHEUS_URL
           value: "http://prometheus.monitoring:9090"
@@ -204,8 +211,13 @@ spec:
   selector:
     app: cost-optimizer
   ports:
-    - port: 80
+    - name: http
+      port: 80
       targetPort: 5000
+    # KEDA external scaler (gRPC), polled by the external triggers in keda-setup/
+    - name: external-scaler
+      port: 6000
+      targetPort: 6000
 EOF
 
 kubectl apply -f cost-optimizer-deployment.yaml
@@ -1,16 +1,28 @@
 import os
+import math
 import time
 import logging
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 from flask import Flask, jsonify, request
-import requests
 import json
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error
 import redis
-from prometheus_client import CollectorRegistry, Gauge, generate_latest
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from features import (FeatureStore, ServiceSeries, FEATURE_COLUMNS, ROLLING_WINDOW, SAMPLE_INTERVAL_SECONDS,
+                      DEFAULT_CAPACITY, build_time_series_frame, add_lag_features)
+from workload import PROFILES, synthetic_series
+from tscache import MetricSeriesCache
+from prom_http import PrometheusClient, merge_series, service_regex, split_by_service
+from online import RecursiveLeastSquares, PageHinkley
+from registry import ModelRegistry
+from model_sync import ModelSync
+from replicas import create_replica_source
+from coalesce import SingleFlight, TTLCache
+from capacity import MMcModel, USLModel, HysteresisController
+from profiler import sample_stacks, collapsed, top_functions
+from scheduler import PredictionScheduler, TrainingScheduler, parse_intervals
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -20,9 +32,58 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 PROMETHEUS_URL = os.getenv('PROMETHEUS_URL', 'http://prometheus.monitoring:9090')
+PROMETHEUS_TIMEOUT = float(os.getenv('PROMETHEUS_TIMEOUT', '10'))
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis.database')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
 REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
+DEFAULT_SERVICES = os.getenv('PREDICT_SERVICES', 'user-service,catalog-service,order-service').split(',')
+EXCLUDED_SERVICES = set(os.getenv('EXCLUDED_SERVICES', 'predictor-service,cost-optimizer,advanced-ml-service').split(','))
+DISCOVERY_QUERY = os.getenv('DISCOVERY_QUERY', 'kube_deployment_status_replicas{namespace="default"}')
+PREDICTION_SCHEDULER_ENABLED = os.getenv('PREDICTION_SCHEDULER_ENABLED', 'true').lower() == 'true'
+PREDICTION_INTERVAL_SECONDS = float(os.getenv('PREDICTION_INTERVAL_SECONDS', '30'))
+PREDICTION_INTERVALS = parse_intervals(os.getenv('PREDICTION_INTERVALS', ''))
+PREDICTION_WORKERS = int(os.getenv('PREDICTION_WORKERS', '4'))
+MODEL_RETRAIN_MINUTES = float(os.getenv('MODEL_RETRAIN_MINUTES', '30'))
+MODEL_RETRAIN_JITTER = float(os.getenv('MODEL_RETRAIN_JITTER', '0.2'))
+TRAINING_WORKERS = int(os.getenv('TRAINING_WORKERS', '2'))
+TRAINING_MAX_SERVICES = int(os.getenv('TRAINING_MAX_SERVICES', '200'))
+TRAINING_MAX_FAILURES = int(os.getenv('TRAINING_MAX_FAILURES', '3'))
+MODEL_MODE = os.getenv('MODEL_MODE', 'batch')  # 'batch' or 'online'
+ONLINE_FORGETTING_FACTOR = float(os.getenv('ONLINE_FORGETTING_FACTOR', '0.995'))
+ONLINE_REFIT_HOURS = float(os.getenv('ONLINE_REFIT_HOURS', '6'))
+DRIFT_THRESHOLD = float(os.getenv('DRIFT_THRESHOLD', '50'))
+FORECAST_MAX_MINUTES = int(os.getenv('FORECAST_MAX_MINUTES', '30'))
+FORECAST_INTERVAL_Z = 1.28  # 80% prediction interval
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', '/tmp/predictor-models')
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', '30'))
+MIN_PROMOTE_ACCURACY = float(os.getenv('MIN_PROMOTE_ACCURACY', '0.05'))
+MODEL_SYNC_ENABLED = os.getenv('MODEL_SYNC_ENABLED', 'true').lower() == 'true'
+MODEL_SYNC_SECRET = os.getenv('MODEL_SYNC_SECRET', '')  # HMAC key for model blobs, predictor pods only
+TRAINING_LEADER_TTL = int(os.getenv('TRAINING_LEADER_TTL', '30'))
+REPLICA_SOURCE = os.getenv('REPLICA_SOURCE', 'auto')  # 'kubernetes', 'fake' or 'auto'
+REPLICA_NAMESPACE = os.getenv('REPLICA_NAMESPACE', 'default')
+FAKE_REPLICAS = os.getenv('FAKE_REPLICAS', '')
+DEFAULT_REPLICAS = int(os.getenv('DEFAULT_REPLICAS', '2'))
+MIN_REPLICAS = int(os.getenv('MIN_REPLICAS', '1'))
+MAX_REPLICAS = int(os.getenv('MAX_REPLICAS', '10'))
+CAPACITY_MODEL = os.getenv('CAPACITY_MODEL', 'mmc')  # 'mmc' or 'usl'
+LATENCY_SLO_SECONDS = float(os.getenv('LATENCY_SLO_SECONDS', '0.2'))
+LATENCY_SLO_QUANTILE = float(os.getenv('LATENCY_SLO_QUANTILE', '0.95'))
+POD_CONCURRENCY = int(os.getenv('POD_CONCURRENCY', '1'))
+MAX_POD_UTILIZATION = float(os.getenv('MAX_POD_UTILIZATION', '0.8'))
+USL_SIGMA = float(os.getenv('USL_SIGMA', '0.05'))
+USL_KAPPA = float(os.getenv('USL_KAPPA', '0.001'))
+TARGET_CPU_UTILIZATION = float(os.getenv('TARGET_CPU_UTILIZATION', '50'))
+SCALE_DOWN_WINDOW_SECONDS = float(os.getenv('SCALE_DOWN_WINDOW_SECONDS', '300'))
+SCALE_DOWN_STEP = int(os.getenv('SCALE_DOWN_STEP', '1'))
+PREDICTION_L1_TTL_SECONDS = float(os.getenv('PREDICTION_L1_TTL_SECONDS', '15'))
+PREDICTION_L1_MAX_ENTRIES = int(os.getenv('PREDICTION_L1_MAX_ENTRIES', '1024'))
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '30'))
+METRIC_CACHE_DIR = os.getenv('METRIC_CACHE_DIR', '/tmp/predictor-metrics')
+METRIC_CACHE_RETENTION_HOURS = float(os.getenv('METRIC_CACHE_RETENTION_HOURS', '24'))
+METRIC_CACHE_DOWNSAMPLE_AFTER_HOURS = float(os.getenv('METRIC_CACHE_DOWNSAMPLE_AFTER_HOURS', '6'))
+METRIC_CACHE_DOWNSAMPLE_STEP = int(os.getenv('METRIC_CACHE_DOWNSAMPLE_STEP', '300'))
 
 # Redis connection with fallback
 try:
@@ -36,6 +97,13 @@ except Exception as e:
     logger.warning(f"Redis connection failed: {e}, using localhost fallback")
     redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
 
+CPU_QUERY_TEMPLATE = 'rate(container_cpu_usage_seconds_total{{pod=~"{pods}.*"}}[1m]) * 100'
+REQUEST_RATE_QUERY_TEMPLATE = 'sum(rate(flask_http_request_total{{service="{service}"}}[1m]))'
+SERVICE_TIME_QUERY_TEMPLATE = (
+    'sum(rate(flask_http_request_duration_seconds_sum{{service="{service}"}}[5m])) / '
+    'sum(rate(flask_http_request_duration_seconds_count{{service="{service}"}}[5m]))'
+)
+
 # Prometheus metrics for predictions
 registry = CollectorRegistry()
 prediction_gauge = Gauge('predicted_cpu_utilization', 'Predicted CPU utilization for next 5 minutes', 
@@ -45,87 +113,228 @@ confidence_gauge = Gauge('prediction_confidence', 'Confidence score of the predi
 scaling_recommendation = Gauge('scaling_recommendation', 'Recommended number of replicas',
                              ['service'], registry=registry)
 
+# Hot-path instrumentation so prediction latency can be attributed to a stage
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+prometheus_fetch_seconds = Histogram('predictor_prometheus_fetch_seconds', 'Prometheus HTTP API request latency',
+                                     ['endpoint', 'status'], registry=registry)
+feature_build_seconds = Histogram('predictor_feature_build_seconds', 'Time spent building model features',
+                                  ['stage'], buckets=FAST_BUCKETS, registry=registry)
+training_seconds = Histogram('predictor_training_seconds', 'Model fit time',
+                             buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60), registry=registry)
+inference_seconds = Histogram('predictor_inference_seconds', 'Model inference time',
+                              ['kind'], buckets=FAST_BUCKETS, registry=registry)
+cache_requests = Counter('predictor_cache_requests_total', 'Cache lookups by layer and result',
+                         ['layer', 'result'], registry=registry)
+fallback_predictions = Counter('predictor_fallback_predictions_total', 'Predictions served by the heuristic fallback',
+                               ['reason'], registry=registry)
+
+def observe_prometheus_request(endpoint, seconds, succeeded):
+    prometheus_fetch_seconds.labels(endpoint=endpoint, status='success' if succeeded else 'error').observe(seconds)
+
+# Pooled Prometheus client shared by all requests
+prometheus = PrometheusClient(PROMETHEUS_URL, timeout=PROMETHEUS_TIMEOUT, observer=observe_prometheus_request)
+
 class PredictiveScaler:
     def __init__(self):
         self.models = {}
+        self.known_services = set(DEFAULT_SERVICES)
         self.historical_data = {}
         self.prediction_cache = {}
+        self.feature_store = FeatureStore()
+        self.metric_cache = MetricSeriesCache(
+            METRIC_CACHE_DIR,
+            retention_hours=METRIC_CACHE_RETENTION_HOURS,
+            downsample_after_hours=METRIC_CACHE_DOWNSAMPLE_AFTER_HOURS,
+            downsample_step=METRIC_CACHE_DOWNSAMPLE_STEP,
+            step=SAMPLE_INTERVAL_SECONDS
+        )
+        self.drift_detectors = {}
+        self.registry = ModelRegistry(MODEL_REGISTRY_DIR)
+        self.model_sync = None
+        self.replica_source = create_replica_source(REPLICA_SOURCE, REPLICA_NAMESPACE, FAKE_REPLICAS)
+        if CAPACITY_MODEL == 'usl':
+            self.capacity_model = USLModel(USL_SIGMA, USL_KAPPA, POD_CONCURRENCY, MAX_POD_UTILIZATION)
+        else:
+            self.capacity_model = MMcModel(LATENCY_SLO_SECONDS, LATENCY_SLO_QUANTILE, POD_CONCURRENCY,
+                                           MAX_POD_UTILIZATION)
+        self.scaling_controller = HysteresisController(SCALE_DOWN_WINDOW_SECONDS, SCALE_DOWN_STEP)
+        self.load_profiles = {}
+        # In-process cache in front of Redis; misses for the same key are computed once
+        self.result_cache = TTLCache(PREDICTION_L1_TTL_SECONDS, PREDICTION_L1_MAX_ENTRIES)
+        self.single_flight = SingleFlight()
+        # Online models only need an occasional safety-net refit; drift triggers the rest
+        retrain_seconds = ONLINE_REFIT_HOURS * 3600 if MODEL_MODE == 'online' else MODEL_RETRAIN_MINUTES * 60
+        self.trainer = TrainingScheduler(
+            self.train_model,
+            interval=retrain_seconds,
+            jitter=MODEL_RETRAIN_JITTER,
+            max_workers=TRAINING_WORKERS,
+            should_train=lambda: self.model_sync is None or self.model_sync.is_leader(),
+            max_services=TRAINING_MAX_SERVICES,
+            max_failures=TRAINING_MAX_FAILURES
+        )
         
     def get_prometheus_metrics(self, query, start_time, end_time):
-        """Fetch historical metrics from Prometheus"""
+        """Fetch historical metrics from Prometheus as (timestamps, values) arrays"""
         try:
-            params = {
-                'query': query,
-                'start': start_time.isoformat() + 'Z',
-                'end': end_time.isoformat() + 'Z',
-                'step': '30s'
-            }
-            
-            response = requests.get(f"{PROMETHEUS_URL}/api/v1/query_range", params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data['status'] == 'success' and data['data']['result']:
-                    return data['data']['result'][0]['values']
-            return []
+            return merge_series(prometheus.query_range(query, start_time, end_time))
         except Exception as e:
             logger.error(f"Failed to fetch Prometheus metrics: {e}")
-            return []
+            return np.empty(0), np.empty(0)
+    
+    def get_cached_series(self, service_name, query, start_time, end_time):
+        """Fetch a series through the on-disk cache, only requesting the missing delta"""
+        fetched = []
+        
+        def fetch(*args):
+            fetched.append(True)
+            return self.get_prometheus_metrics(*args)
+        
+        result = self.metric_cache.get_range(service_name, query, start_time, end_time, fetch)
+        cache_requests.labels(layer='metric_cache', result='miss' if fetched else 'hit').inc()
+        return result
+    
+    def _cpu_query(self, service_name):
+        return CPU_QUERY_TEMPLATE.format(pods=service_name)
     
     def prepare_time_series_data(self, service_name, hours_back=2):
         """Prepare time series data for prediction"""
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=hours_back)
         
-        # Query for CPU utilization
-        cpu_query = f'rate(container_cpu_usage_seconds_total{{pod=~"{service_name}.*"}}[1m]) * 100'
-        cpu_data = self.get_prometheus_metrics(cpu_query, start_time, end_time)
-        
-        # Query for request rate
+        # Query CPU utilization and request rate concurrently
         request_query = f'rate(flask_http_request_total{{service="{service_name}"}}[1m])'
-        request_data = self.get_prometheus_metrics(request_query, start_time, end_time)
+        (timestamps, cpu), (request_timestamps, _) = prometheus.map(
+            lambda query: self.get_cached_series(service_name, query, start_time, end_time),
+            [self._cpu_query(service_name), request_query]
+        )
         
-        if not cpu_data and not request_data:
+        if not len(timestamps) and not len(request_timestamps):
             # Generate synthetic data for demo
             logger.info(f"No Prometheus data found for {service_name}, generating synthetic data")
             return self.generate_synthetic_data()
         
-        # Convert to DataFrame
-        df_data = []
-        for timestamp, value in cpu_data:
-            df_data.append({
-                'timestamp': datetime.fromtimestamp(timestamp),
-                'cpu_utilization': float(value),
-                'hour_of_day': datetime.fromtimestamp(timestamp).hour,
-                'minute_of_hour': datetime.fromtimestamp(timestamp).minute
-            })
+        # Also seeds the incremental feature store
+        self.feature_store.append(service_name, timestamps, cpu)
         
-        return pd.DataFrame(df_data)
+        return build_time_series_frame(timestamps, cpu)
     
-    def generate_synthetic_data(self):
-        """Generate synthetic time series data for demonstration"""
-        now = datetime.utcnow()
-        data = []
+    def refresh_series(self, service_name, hours_back=1):
+        """Fetch only samples newer than the buffered series and append them"""
+        series = self.feature_store.get(service_name)
+        if time.time() - series.refreshed_at < SAMPLE_INTERVAL_SECONDS:
+            return series
+        end_time = datetime.utcnow()
         
-        for i in range(240):  # 2 hours of data (30s intervals)
-            timestamp = now - timedelta(seconds=i*30)
-            hour = timestamp.hour
-            minute = timestamp.minute
-            
-            # Simulate realistic CPU patterns
-            base_cpu = 15 + 10 * np.sin(hour * np.pi / 12)  # Daily pattern
-            noise = np.random.normal(0, 5)  # Random variation
-            spike = 20 if (hour in [9, 12, 15, 18] and minute < 10) else 0  # Traffic spikes
+        if series.last_timestamp is None:
+            start_time = end_time - timedelta(hours=hours_back)
+        else:
+            start_time = datetime.utcfromtimestamp(series.last_timestamp + SAMPLE_INTERVAL_SECONDS)
+            if start_time > end_time:
+                return series
+            # Never backfill more than the buffer can hold
+            start_time = max(start_time, end_time - timedelta(seconds=series.capacity * SAMPLE_INTERVAL_SECONDS))
+        
+        # Served from the on-disk cache after a restart, so the buffer warm-starts
+        timestamps, cpu = self.get_cached_series(service_name, self._cpu_query(service_name),
+                                                 start_time, end_time)
+        self.ingest(service_name, timestamps, cpu)
+        series.refreshed_at = time.time()
+        return series
+    
+    def refresh_services(self, service_names, hours_back=1):
+        """Refresh several buffers with one multi-service query, split client-side by pod"""
+        end_time = datetime.utcnow()
+        earliest = end_time - timedelta(hours=hours_back)
+        
+        starts = {}
+        for service_name in service_names:
+            series = self.feature_store.get(service_name)
+            if time.time() - series.refreshed_at < SAMPLE_INTERVAL_SECONDS:
+                continue
+            if series.last_timestamp is None:
+                starts[service_name] = earliest
+            else:
+                starts[service_name] = max(earliest, datetime.utcfromtimestamp(
+                    series.last_timestamp + SAMPLE_INTERVAL_SECONDS))
+        
+        if not starts:
+            return
+        
+        try:
+            query = CPU_QUERY_TEMPLATE.format(pods=service_regex(starts))
+            result = prometheus.query_range(query, min(starts.values()), end_time)
+        except Exception as e:
+            logger.error(f"Failed to fetch batched Prometheus metrics: {e}")
+            return
+        
+        for service_name, service_result in split_by_service(result, starts).items():
+            batch_ts, batch_values = merge_series(service_result)
             
-            cpu_utilization = max(5, min(95, base_cpu + noise + spike))
+            def from_batch(query, start_time, _end_time, ts=batch_ts, values=batch_values):
+                mask = ts >= (start_time - datetime(1970, 1, 1)).total_seconds()
+                return ts[mask], values[mask]
             
-            data.append({
-                'timestamp': timestamp,
-                'cpu_utilization': cpu_utilization,
-                'hour_of_day': hour,
-                'minute_of_hour': minute
-            })
+            # Route through the disk cache so it stays the source of truth
+            timestamps, cpu = self.metric_cache.get_range(
+                service_name, self._cpu_query(service_name), starts[service_name], end_time, from_batch)
+            self.ingest(service_name, timestamps, cpu)
+            self.feature_store.get(service_name).refreshed_at = time.time()
+    
+    def ingest(self, service_name, timestamps, cpu):
+        """Append fresh samples; in online mode also fold them into the model"""
+        added = self.feature_store.append(service_name, timestamps, cpu)
+        if added and MODEL_MODE == 'online':
+            self.update_online_model(service_name, added)
+        return added
+    
+    def update_online_model(self, service_name, new_samples):
+        """O(new samples) model update with drift detection on the prequential error"""
+        model_info = self.models.get(service_name)
+        if model_info is None or not hasattr(model_info['model'], 'partial_fit'):
+            return
+        
+        series = self.feature_store.get(service_name)
+        with series.lock:
+            timestamps, values = series.tail(new_samples + ROLLING_WINDOW - 1)
+            buffered = len(series)
+        
+        df = add_lag_features(build_time_series_frame(timestamps, values))
+        if df.empty:
+            return
+        # Align time_index with the position of each sample in the buffer
+        df['time_index'] += buffered - len(timestamps)
+        
+        X = df[model_info['feature_cols']].to_numpy(dtype=np.float64)
+        y = df['cpu_utilization'].to_numpy(dtype=np.float64)
         
-        return pd.DataFrame(data).sort_values('timestamp')
+        # Score before learning so the error reflects genuine forecast skill
+        errors = np.abs(model_info['model'].predict(X) - y)
+        model_info['model'].partial_fit(X, y)
+        
+        detector = self.drift_detectors.setdefault(service_name, PageHinkley(threshold=DRIFT_THRESHOLD))
+        if any([detector.update(error) for error in errors]):
+            logger.info(f"Drift detected for {service_name}, scheduling full refit")
+            detector.reset()
+            model_info['drift_events'] = model_info.get('drift_events', 0) + 1
+            if self.model_sync and not self.model_sync.is_leader():
+                self.model_sync.request_refit(service_name)
+            else:
+                self.trainer.register(service_name, urgent=True)
+    
+    def _synthetic_series(self):
+        """Ring buffer filled with synthetic samples when Prometheus has no data"""
+        timestamps, cpu = synthetic_series(DEFAULT_CAPACITY * SAMPLE_INTERVAL_SECONDS / 3600, PROFILES['predictor'],
+                                           interval=SAMPLE_INTERVAL_SECONDS)
+        series = ServiceSeries()
+        series.append(timestamps, cpu)
+        return series
+    
+    def generate_synthetic_data(self):
+        """Generate synthetic time series data for demonstration"""
+        # 2 hours of 30s samples with a daily cycle and traffic spikes
+        timestamps, cpu = synthetic_series(2, PROFILES['predictor'], interval=SAMPLE_INTERVAL_SECONDS)
+        return build_time_series_frame(timestamps, cpu)
     
     def train_model(self, service_name):
         """Train ML model for CPU prediction"""
@@ -135,43 +344,54 @@ class PredictiveScaler:
                 logger.warning(f"No data available for {service_name}")
                 return None
             
-            # Feature engineering
-            df['time_index'] = range(len(df))
-            df['rolling_mean_5'] = df['cpu_utilization'].rolling(window=5).mean()
-            df['rolling_std_5'] = df['cpu_utilization'].rolling(window=5).std()
-            df['lag_1'] = df['cpu_utilization'].shift(1)
-            df['lag_2'] = df['cpu_utilization'].shift(2)
-            
-            # Remove NaN values
-            df = df.dropna()
+            # Feature engineering (vectorized, incomplete rows dropped)
+            with feature_build_seconds.labels(stage='train').time():
+                df = add_lag_features(df)
             
             if len(df) < 10:
                 logger.warning(f"Insufficient data points for {service_name}")
                 return None
             
             # Prepare features
-            feature_cols = ['time_index', 'hour_of_day', 'minute_of_hour', 
-                          'rolling_mean_5', 'rolling_std_5', 'lag_1', 'lag_2']
+            feature_cols = FEATURE_COLUMNS
             X = df[feature_cols]
             y = df['cpu_utilization']
             
             # Train model
-            model = LinearRegression()
-            model.fit(X, y)
+            if MODEL_MODE == 'online':
+                model = RecursiveLeastSquares(forgetting=ONLINE_FORGETTING_FACTOR)
+            else:
+                model = LinearRegression()
+            with training_seconds.time():
+                model.fit(X, y)
             
             # Calculate model accuracy
             predictions = model.predict(X)
             mse = mean_squared_error(y, predictions)
             accuracy = max(0, 1 - (mse / np.var(y)))
+            residual_std = float(np.std(y - predictions))
             
-            self.models[service_name] = {
-                'model': model,
+            metadata = {
                 'feature_cols': feature_cols,
                 'accuracy': accuracy,
-                'last_training': datetime.utcnow(),
-                'data_shape': df.shape
+                'residual_std': residual_std,
+                'last_training': datetime.utcnow().isoformat(),
+                'data_shape': list(df.shape),
+                'model_mode': MODEL_MODE
             }
             
+            # Persist so restarts can warm-start from this fit
+            version = self.registry.save(service_name, {'model': model}, metadata,
+                                         promote=accuracy >= MIN_PROMOTE_ACCURACY)
+            version = version or datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+            
+            # Swap in one assignment; predictions keep using the old model until now
+            self._install_model(service_name, model, metadata, version)
+            
+            # Followers load this model instead of training their own copy
+            if self.model_sync and accuracy >= MIN_PROMOTE_ACCURACY:
+                self.model_sync.publish(service_name, version, model, metadata)
+            
             logger.info(f"Trained model for {service_name} - Accuracy: {accuracy:.3f}, Data points: {len(df)}")
             return model
             
@@ -179,67 +399,131 @@ class PredictiveScaler:
             logger.error(f"Failed to train model for {service_name}: {e}")
             return None
     
-    def predict_cpu_utilization(self, service_name, minutes_ahead=5):
+    def _install_model(self, service_name, model, metadata, version):
+        self.models[service_name] = {
+            'model': model,
+            'feature_cols': metadata['feature_cols'],
+            'accuracy': metadata['accuracy'],
+            'residual_std': metadata.get('residual_std', 5.0),
+            'last_training': datetime.fromisoformat(metadata['last_training']),
+            'data_shape': tuple(metadata['data_shape']),
+            'version': version
+        }
+        self.drift_detectors.pop(service_name, None)
+    
+    def _is_newer(self, service_name, version):
+        current = self.models.get(service_name, {}).get('version')
+        return not current or not version or version > current
+    
+    def load_model(self, service_name, version=None):
+        """Swap in a model version from the registry if it is newer than the one serving"""
+        if not self._is_newer(service_name, version):
+            return False
+        
+        loaded = self.registry.load(service_name, version)
+        if loaded is None:
+            return False
+        version, artifacts, metadata, _ = loaded
+        if not self._is_newer(service_name, version):
+            return False
+        
+        self._install_model(service_name, artifacts['model'], metadata, version)
+        logger.info(f"Loaded model for {service_name} version {version}")
+        return True
+    
+    def load_shared_model(self, service_name, version=None):
+        """Swap in the model the training leader published to Redis"""
+        if self.model_sync is None or not self._is_newer(service_name, version):
+            return False
+        
+        try:
+            shared = self.model_sync.fetch(service_name)
+        except Exception as e:
+            logger.warning(f"Failed to fetch shared model for {service_name}: {e}")
+            return False
+        if shared is None:
+            return False
+        model, metadata, version = shared
+        if not self._is_newer(service_name, version):
+            return False
+        
+        self._install_model(service_name, model, metadata, version)
+        logger.info(f"Loaded shared model for {service_name} version {version}")
+        return True
+    
+    def load_models(self):
+        """Warm start from the local registry and from models shared by the training leader"""
+        shared = self.model_sync.published_services() if self.model_sync else []
+        for service_name in set(self.registry.names()) | set(shared):
+            self.load_model(service_name)
+            self.load_shared_model(service_name)
+            if service_name in self.models:
+                trained_at = (self.models[service_name]['last_training'] - datetime(1970, 1, 1)).total_seconds()
+                self.trainer.register(service_name, trained_at=trained_at)
+    
+    def predict_cpu_utilization(self, service_name, minutes_ahead=5, use_cache=True):
         """Predict CPU utilization for the next N minutes"""
+        cache_key = f"prediction:{service_name}:{minutes_ahead}"
+        if use_cache:
+            cached = self.result_cache.get(cache_key)
+            cache_requests.labels(layer='l1', result='miss' if cached is None else 'hit').inc()
+            if cached is not None:
+                return dict(cached)
+        
+        # N simultaneous callers trigger exactly one computation
+        return dict(self.single_flight.do(
+            cache_key, lambda: self._predict(service_name, minutes_ahead, cache_key, use_cache)))
+    
+    def _predict(self, service_name, minutes_ahead, cache_key, use_cache):
         try:
             # Check cache first
-            cache_key = f"prediction:{service_name}:{minutes_ahead}"
-            cached = redis_client.get(cache_key)
+            cached = redis_client.get(cache_key) if use_cache else None
+            if use_cache:
+                cache_requests.labels(layer='redis', result='hit' if cached else 'miss').inc()
             if cached:
                 logger.info(f"Using cached prediction for {service_name}")
-                return json.loads(cached)
+                result = json.loads(cached)
+                self.result_cache.set(cache_key, result)
+                return result
             
-            # Train or retrain model if needed
-            if (service_name not in self.models or 
-                datetime.utcnow() - self.models[service_name]['last_training'] > timedelta(minutes=30)):
-                self.train_model(service_name)
+            # Training happens in the background; never block the request on it
+            if self.is_known_service(service_name):
+                self.trainer.register(service_name)
             
-            if service_name not in self.models:
-                logger.warning(f"No model available for {service_name}")
-                return self.fallback_prediction(service_name)
+            model_info = self.models.get(service_name)
+            if model_info is None:
+                logger.warning(f"No model available yet for {service_name}")
+                return self.fallback_prediction(service_name, reason='no_model')
             
-            model_info = self.models[service_name]
             model = model_info['model']
             feature_cols = model_info['feature_cols']
             
-            # Get recent data for prediction
-            df = self.prepare_time_series_data(service_name, hours_back=1)
-            if df.empty:
-                return self.fallback_prediction(service_name)
+            # Append only new samples to the buffered series
+            series = self.refresh_series(service_name)
+            if len(series) < ROLLING_WINDOW:
+                series = self._synthetic_series()
             
-            # Prepare features for prediction
-            df['time_index'] = range(len(df))
-            df['rolling_mean_5'] = df['cpu_utilization'].rolling(window=5).mean()
-            df['rolling_std_5'] = df['cpu_utilization'].rolling(window=5).std()
-            df['lag_1'] = df['cpu_utilization'].shift(1)
-            df['lag_2'] = df['cpu_utilization'].shift(2)
-            df = df.dropna()
-            
-            if df.empty:
-                return self.fallback_prediction(service_name)
-            
-            # Predict future values
+            # Prepare features for prediction from the rolling state
             future_time = datetime.utcnow() + timedelta(minutes=minutes_ahead)
-            future_features = {
-                'time_index': len(df) + minutes_ahead * 2,  # Assuming 30s intervals
-                'hour_of_day': future_time.hour,
-                'minute_of_hour': future_time.minute,
-                'rolling_mean_5': df['cpu_utilization'].tail(5).mean(),
-                'rolling_std_5': df['cpu_utilization'].tail(5).std(),
-                'lag_1': df['cpu_utilization'].iloc[-1],
-                'lag_2': df['cpu_utilization'].iloc[-2] if len(df) > 1 else df['cpu_utilization'].iloc[-1]
-            }
+            with feature_build_seconds.labels(stage='predict').time():
+                with series.lock:
+                    future_features = series.latest_features(future_time, minutes_ahead)
+                    recent = series.recent(10)
+            
+            if future_features is None:
+                return self.fallback_prediction(service_name, reason='insufficient_data')
             
             # Create prediction input
             X_pred = np.array([[future_features[col] for col in feature_cols]])
-            predicted_cpu = model.predict(X_pred)[0]
+            with inference_seconds.labels(kind='point').time():
+                predicted_cpu = model.predict(X_pred)[0]
             
             # Ensure prediction is within realistic bounds
             predicted_cpu = max(0, min(100, predicted_cpu))
             
             # Calculate confidence based on model accuracy and recent variance
             confidence = model_info['accuracy'] * 0.8  # Base confidence on model accuracy
-            recent_variance = df['cpu_utilization'].tail(10).std()
+            recent_variance = np.std(recent, ddof=1)
             if recent_variance > 20:
                 confidence *= 0.7  # Lower confidence for high variance periods
             
@@ -248,12 +532,13 @@ class PredictiveScaler:
                 'predicted_cpu': round(predicted_cpu, 2),
                 'confidence': round(confidence, 3),
                 'prediction_time': future_time.isoformat(),
-                'current_cpu': round(df['cpu_utilization'].iloc[-1], 2),
+                'current_cpu': round(float(recent[-1]), 2),
                 'model_accuracy': round(model_info['accuracy'], 3),
                 'recommended_replicas': self.calculate_recommended_replicas(predicted_cpu, service_name)
             }
             
             # Cache the prediction for 1 minute
+            self.result_cache.set(cache_key, result)
             redis_client.setex(cache_key, 60, json.dumps(result))
             
             # Update Prometheus metrics
@@ -265,58 +550,251 @@ class PredictiveScaler:
             
         except Exception as e:
             logger.error(f"Prediction failed for {service_name}: {e}")
-            return self.fallback_prediction(service_name)
+            return self.fallback_prediction(service_name, reason='error')
     
-    def fallback_prediction(self, service_name):
-        """Fallback prediction when ML model is not available"""
-        current_time = datetime.utcnow()
-        hour = current_time.hour
+    def forecast_cpu_utilization(self, service_name, horizons=None):
+        """Forecast every minute up to FORECAST_MAX_MINUTES from one feature snapshot"""
+        cache_key = f"forecast:{service_name}"
+        forecast = self.result_cache.get(cache_key)
+        cache_requests.labels(layer='l1', result='miss' if forecast is None else 'hit').inc()
+        if forecast is None:
+            forecast = self.single_flight.do(cache_key, lambda: self._cached_forecast(service_name, cache_key))
+        forecast = dict(forecast)
         
-        # Simple heuristic based on time of day
-        if 8 <= hour <= 18:  # Business hours
-            predicted_cpu = 35 + np.random.normal(0, 5)
-        else:  # Off hours
-            predicted_cpu = 15 + np.random.normal(0, 3)
+        if horizons:
+            # One cached vector serves any subset of horizons
+            keep = [i for i, minutes in enumerate(forecast['horizons_minutes']) if minutes in set(horizons)]
+            for field in ('horizons_minutes', 'predicted_cpu', 'lower_bound', 'upper_bound',
+                          'prediction_times', 'recommended_replicas'):
+                forecast[field] = [forecast[field][i] for i in keep]
+        return forecast
+    
+    def _cached_forecast(self, service_name, cache_key):
+        try:
+            cached = redis_client.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Forecast cache unavailable: {e}")
+            cached = None
+        cache_requests.labels(layer='redis', result='hit' if cached else 'miss').inc()
+        
+        if cached:
+            forecast = json.loads(cached)
+        else:
+            forecast = self._compute_forecast(service_name)
+            if forecast.get('fallback'):
+                return forecast
+            try:
+                redis_client.setex(cache_key, 60, json.dumps(forecast))
+            except Exception as e:
+                logger.warning(f"Failed to cache forecast: {e}")
+        
+        self.result_cache.set(cache_key, forecast)
+        return forecast
+    
+    def _compute_forecast(self, service_name):
+        known = self.is_known_service(service_name)
+        if known:
+            self.trainer.register(service_name)
+        minutes = np.arange(1, FORECAST_MAX_MINUTES + 1)
+        now = datetime.utcnow()
         
-        predicted_cpu = max(5, min(95, predicted_cpu))
+        model_info = self.models.get(service_name)
+        series = self.refresh_series(service_name) if known else None
+        if series is None or len(series) < ROLLING_WINDOW:
+            series = self._synthetic_series()
+        
+        with feature_build_seconds.labels(stage='forecast').time():
+            with series.lock:
+                X = series.horizon_features(now, minutes)
+                current_cpu = float(series.recent(1)[0]) if len(series) else None
+        
+        if model_info is None or X is None:
+            fallback = self.fallback_prediction(service_name,
+                                                reason='no_model' if model_info is None else 'insufficient_data')
+            predicted = np.full(len(minutes), fallback['predicted_cpu'])
+            residual_std = 5.0
+            accuracy = fallback['model_accuracy']
+            replicas = [fallback['recommended_replicas']] * len(minutes)
+        else:
+            # Direct multi-horizon: one model.predict call over all horizon rows
+            with inference_seconds.labels(kind='forecast').time():
+                predicted = np.clip(model_info['model'].predict(X), 0, 100)
+            residual_std = model_info.get('residual_std', 5.0)
+            accuracy = model_info['accuracy']
+            replicas = [self.calculate_recommended_replicas(p, service_name, stabilize=False) for p in predicted]
+        
+        # Uncertainty grows with the number of 30s steps ahead
+        margin = FORECAST_INTERVAL_Z * residual_std * np.sqrt(minutes * 2)
+        
+        forecast = {
+            'service': service_name,
+            'horizons_minutes': minutes.tolist(),
+            'predicted_cpu': np.round(predicted, 2).tolist(),
+            'lower_bound': np.round(np.clip(predicted - margin, 0, 100), 2).tolist(),
+            'upper_bound': np.round(np.clip(predicted + margin, 0, 100), 2).tolist(),
+            'interval_width': 0.8,
+            'prediction_times': [(now + timedelta(minutes=int(m))).isoformat() for m in minutes],
+            'recommended_replicas': replicas,
+            'current_cpu': round(current_cpu, 2) if current_cpu is not None else None,
+            'model_accuracy': round(accuracy, 3),
+            'generated_at': now.isoformat()
+        }
+        if model_info is None or X is None:
+            forecast['fallback'] = True
+        return forecast
+    
+    def fallback_prediction(self, service_name, reason='unknown'):
+        """Deterministic prediction when no model can run; never queries Prometheus.
+        
+        Expects the mean of the last five minutes in the feature store to
+        persist (a time-of-day default before any sample) and holds the
+        current replica count, so an outage does not move the deployment.
+        """
+        fallback_predictions.labels(reason=reason).inc()
+        current_time = datetime.utcnow()
+        recent = np.empty(0)
+        series = self.feature_store.peek(service_name)
+        if series is not None:
+            with series.lock:
+                recent = series.recent(max(1, int(300 // SAMPLE_INTERVAL_SECONDS)))
+        
+        if len(recent):
+            predicted_cpu = float(recent.mean())
+            current_cpu = float(recent[-1])
+        else:
+            predicted_cpu = current_cpu = 35.0 if 8 <= current_time.hour <= 18 else 15.0
         
         return {
             'service': service_name,
-            'predicted_cpu': round(predicted_cpu, 2),
+            'predicted_cpu': round(max(5, min(95, predicted_cpu)), 2),
             'confidence': 0.5,  # Low confidence for fallback
             'prediction_time': (current_time + timedelta(minutes=5)).isoformat(),
-            'current_cpu': round(predicted_cpu * 0.9, 2),
+            'current_cpu': round(current_cpu, 2),
             'model_accuracy': 0.5,
-            'recommended_replicas': self.calculate_recommended_replicas(predicted_cpu, service_name),
+            'recommended_replicas': int(max(MIN_REPLICAS, min(MAX_REPLICAS, self.get_current_replicas(service_name)))),
             'fallback': True
         }
     
-    def calculate_recommended_replicas(self, predicted_cpu, service_name):
-        """Calculate recommended number of replicas based on predicted CPU"""
-        target_cpu = 50  # Target 50% CPU utilization
+    def get_load_profile(self, service_name):
+        """Current request rate and mean service time, cached for one sample interval"""
+        cached = self.load_profiles.get(service_name)
+        if cached and time.time() - cached[1] < SAMPLE_INTERVAL_SECONDS:
+            return cached[0]
+        
+        def instant(query):
+            try:
+                result = prometheus.query(query)
+                return float(result[0]['value'][1]) if result else None
+            except Exception as e:
+                logger.warning(f"Load profile query failed for {service_name}: {e}")
+                return None
+        
+        request_rate, service_time = prometheus.map(instant, [
+            REQUEST_RATE_QUERY_TEMPLATE.format(service=service_name),
+            SERVICE_TIME_QUERY_TEMPLATE.format(service=service_name)
+        ])
+        series = self.feature_store.get(service_name)
+        with series.lock:
+            current_cpu = float(series.recent(1)[0]) if len(series) else None
+        
+        profile = {'request_rate': request_rate, 'service_time': service_time, 'cpu': current_cpu}
+        self.load_profiles[service_name] = (profile, time.time())
+        return profile
+    
+    def plan_capacity(self, predicted_cpu, service_name):
+        """Minimum replicas for the predicted load, before hysteresis"""
         current_replicas = self.get_current_replicas(service_name)
+        profile = self.get_load_profile(service_name)
+        request_rate, service_time = profile['request_rate'], profile['service_time']
         
-        if predicted_cpu > 70:
-            return min(10, current_replicas + 2)  # Scale up aggressively
-        elif predicted_cpu > target_cpu:
-            return min(10, current_replicas + 1)  # Scale up moderately
-        elif predicted_cpu < 20 and current_replicas > 1:
-            return max(1, current_replicas - 1)  # Scale down
+        if request_rate is not None and service_time and math.isfinite(service_time):
+            # Request rate is assumed to scale with CPU between now and the prediction
+            if profile['cpu']:
+                request_rate *= predicted_cpu / profile['cpu']
+            replicas = self.capacity_model.replicas_for(request_rate, service_time, MAX_REPLICAS)
+            plan = {
+                'model': self.capacity_model.name,
+                'predicted_request_rate': round(request_rate, 3),
+                'service_time_seconds': round(service_time, 4)
+            }
         else:
-            return current_replicas  # No change needed
+            # No throughput metrics: size for the target CPU utilization instead
+            replicas = math.ceil(current_replicas * predicted_cpu / TARGET_CPU_UTILIZATION)
+            plan = {'model': 'cpu'}
+        
+        plan['current_replicas'] = current_replicas
+        plan['replicas'] = int(max(MIN_REPLICAS, min(MAX_REPLICAS, replicas)))
+        return plan
+    
+    def calculate_recommended_replicas(self, predicted_cpu, service_name, stabilize=True):
+        """Calculate recommended number of replicas from the capacity model"""
+        plan = self.plan_capacity(predicted_cpu, service_name)
+        if not stabilize:
+            return plan['replicas']
+        return self.scaling_controller.stabilize(service_name, plan['replicas'], plan['current_replicas'])
+    
+    def discover_services(self):
+        """Discover scalable deployments from kube-state-metrics, excluding platform services"""
+        result = prometheus.query(DISCOVERY_QUERY)
+        services = {series['metric'].get('deployment') for series in result}
+        services = sorted(services - EXCLUDED_SERVICES - {None}) or DEFAULT_SERVICES
+        self.known_services = set(services)
+        return services
+    
+    def is_known_service(self, service_name):
+        """Whether a name from a request is worth training: discovered, modelled or with buffered samples.
+        
+        URLs can name anything; made-up names must not become training jobs.
+        """
+        series = self.feature_store.peek(service_name)
+        return (service_name in self.models or service_name in self.known_services or
+                (series is not None and len(series) > 0))
     
     def get_current_replicas(self, service_name):
-        """Get current number of replicas (fallback to 2 if unable to determine)"""
+        """Get current number of replicas from the watched deployment state"""
         try:
-            # This would typically query Kubernetes API
-            # For now, return a default value
-            return 2
-        except:
-            return 2
+            replicas = self.replica_source.get(service_name)
+            return replicas if replicas is not None else DEFAULT_REPLICAS
+        except Exception as e:
+            logger.warning(f"Cannot read replicas for {service_name}: {e}")
+            return DEFAULT_REPLICAS
 
 # Initialize the scaler
 scaler = PredictiveScaler()
 
+# Background predictions served by /predict/all
+prediction_scheduler = PredictionScheduler(
+    predict=lambda service: scaler.predict_cpu_utilization(service, use_cache=False),
+    discover=scaler.discover_services,
+    refresh=scaler.refresh_services,
+    default_interval=PREDICTION_INTERVAL_SECONDS,
+    intervals=PREDICTION_INTERVALS,
+    max_workers=PREDICTION_WORKERS,
+    services=DEFAULT_SERVICES
+)
+# Leader-elected training; followers load the models the leader publishes
+if MODEL_SYNC_ENABLED and not MODEL_SYNC_SECRET:
+    logger.warning("MODEL_SYNC_SECRET is not set, models are not shared through Redis; every replica trains")
+elif MODEL_SYNC_ENABLED:
+    model_redis_client = redis.Redis(connection_pool=redis.ConnectionPool(
+        **{**redis_client.connection_pool.connection_kwargs, 'decode_responses': False}
+    ))
+    model_sync = ModelSync(model_redis_client, MODEL_SYNC_SECRET.encode(), lock_ttl=TRAINING_LEADER_TTL)
+    scaler.model_sync = model_sync.start(
+        on_model=scaler.load_shared_model,
+        on_refit=lambda service: scaler.trainer.register(service, urgent=True)
+    )
+
+# Warm start from persisted models, then follow versions published by other pods
+scaler.load_models()
+scaler.registry.start_watcher(scaler.load_model, interval=MODEL_REGISTRY_POLL_SECONDS)
+
+# The schedulers run in every process that imports this module; the image runs a single
+# gunicorn worker (with threads) so each pod does the prediction and refresh work once
+if PREDICTION_SCHEDULER_ENABLED:
+    prediction_scheduler.start()
+scaler.trainer.start()
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -329,17 +807,36 @@ def predict_service(service_name):
     prediction = scaler.predict_cpu_utilization(service_name, minutes_ahead)
     return jsonify(prediction)
 
+@app.route('/forecast/<service_name>')
+def forecast_service(service_name):
+    """Get a multi-horizon forecast with prediction intervals"""
+    horizons = request.args.get('horizons', '')
+    try:
+        horizons = [int(h) for h in horizons.split(',') if h.strip()]
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'horizons must be comma separated minutes'}), 400
+    
+    if any(h < 1 or h > FORECAST_MAX_MINUTES for h in horizons):
+        return jsonify({
+            'status': 'error',
+            'message': f'horizons must be between 1 and {FORECAST_MAX_MINUTES} minutes'
+        }), 400
+    
+    return jsonify(scaler.forecast_cpu_utilization(service_name, horizons))
+
 @app.route('/predict/all')
 def predict_all_services():
     """Get predictions for all services"""
-    services = ['user-service', 'catalog-service', 'order-service']
-    predictions = {}
+    predictions = prediction_scheduler.snapshot()
     
-    for service in services:
-        predictions[service] = scaler.predict_cpu_utilization(service)
+    # Cold start: services the scheduler has not reached yet are computed inline
+    for service in prediction_scheduler.services:
+        if service not in predictions:
+            predictions[service] = scaler.predict_cpu_utilization(service)
     
     return jsonify({
         'predictions': predictions,
+        'services': prediction_scheduler.services,
         'timestamp': datetime.utcnow().isoformat()
     })
 
@@ -373,14 +870,50 @@ def models_status():
         status[service] = {
             'accuracy': model_info['accuracy'],
             'last_training': model_info['last_training'].isoformat(),
-            'data_points': model_info['data_shape'][0] if 'data_shape' in model_info else 0
+            'version': model_info.get('version'),
+            'data_points': model_info['data_shape'][0] if 'data_shape' in model_info else 0,
+            'online_updates': getattr(model_info['model'], 'updates', 0),
+            'drift_events': model_info.get('drift_events', 0)
         }
     
     return jsonify({
         'models': status,
+        'training_schedule': scaler.trainer.status(),
+        'training_leader': scaler.model_sync.is_leader() if scaler.model_sync else True,
+        'model_mode': MODEL_MODE,
         'total_models': len(scaler.models)
     })
 
+@app.route('/replicas')
+def replicas_status():
+    """Get the cached replica counts of watched deployments"""
+    return jsonify({
+        'source': type(scaler.replica_source).__name__,
+        'deployments': scaler.replica_source.snapshot(),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@app.route('/debug/profile')
+def debug_profile():
+    """Sample all thread stacks for a few seconds (PROFILER_ENABLED only)"""
+    if not PROFILER_ENABLED:
+        return jsonify({'status': 'error', 'message': 'profiler disabled, set PROFILER_ENABLED=true'}), 404
+    
+    seconds = min(request.args.get('seconds', 10, type=float), PROFILER_MAX_SECONDS)
+    interval = request.args.get('interval_ms', 5, type=float) / 1000
+    try:
+        stacks = sample_stacks(seconds, interval, include_idle=request.args.get('idle') == 'true')
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    
+    if request.args.get('format') == 'collapsed':
+        return collapsed(stacks), 200, {'Content-Type': 'text/plain'}
+    return jsonify({
+        'duration_seconds': seconds,
+        'samples': sum(stacks.values()),
+        'top_functions': top_functions(stacks, request.args.get('limit', 25, type=int))
+    })
+
 @app.route('/metrics')
 def metrics():
     """Prometheus metrics endpoint"""
@@ -0,0 +1,135 @@
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def erlang_c(servers: int, offered_load: float) -> float:
+    """Probability that an arriving request has to queue in an M/M/c system"""
+    if offered_load <= 0:
+        return 0.0
+    if offered_load >= servers:
+        return 1.0
+    # Erlang B by recursion avoids the factorials of the closed form
+    blocking = 1.0
+    for k in range(1, servers + 1):
+        blocking = offered_load * blocking / (k + offered_load * blocking)
+    rho = offered_load / servers
+    return blocking / (1 - rho + rho * blocking)
+
+
+class MMcModel:
+    """Sizes replicas so an M/M/c queue meets a latency SLO at a given quantile.
+
+    Every replica contributes `concurrency` servers. The response-time quantile
+    is approximated as mean service time plus the exact waiting-time quantile.
+    No replica count brings that below the mean service time, so when the
+    service time alone reaches the SLO the model sizes for
+    `max_utilization` instead of scaling to the maximum.
+    """
+
+    name = 'mmc'
+
+    def __init__(self, slo_seconds: float = 0.2, quantile: float = 0.95, concurrency: int = 1,
+                 max_utilization: float = 0.8):
+        self.slo_seconds = slo_seconds
+        self.quantile = quantile
+        self.concurrency = concurrency
+        self.max_utilization = max_utilization
+        self._slo_warned = False
+
+    def latency(self, arrival_rate: float, service_time: float, replicas: int) -> float:
+        servers = replicas * self.concurrency
+        offered_load = arrival_rate * service_time
+        if offered_load >= servers:
+            return math.inf
+
+        wait_probability = erlang_c(servers, offered_load)
+        tail = 1 - self.quantile
+        if wait_probability <= tail:
+            return service_time
+        # P(Wq > t) = C(c, a) * exp(-(c*mu - lambda) * t)
+        drain_rate = servers / service_time - arrival_rate
+        return service_time + math.log(wait_probability / tail) / drain_rate
+
+    def replicas_for(self, arrival_rate: float, service_time: float, max_replicas: int) -> int:
+        offered_load = arrival_rate * service_time
+        replicas = max(1, math.ceil(offered_load / (self.concurrency * self.max_utilization)))
+        if service_time >= self.slo_seconds:
+            if not self._slo_warned:
+                logger.warning(f"Mean service time {service_time:.3f}s leaves no room for the "
+                               f"{self.slo_seconds:.3f}s latency SLO, sizing for utilization instead")
+                self._slo_warned = True
+            return min(replicas, max_replicas)
+        self._slo_warned = False
+        while replicas < max_replicas and \
+                self.latency(arrival_rate, service_time, replicas) > self.slo_seconds:
+            replicas += 1
+        return min(replicas, max_replicas)
+
+
+class USLModel:
+    """Universal Scalability Law: contention (sigma) and coherency (kappa) costs"""
+
+    name = 'usl'
+
+    def __init__(self, sigma: float = 0.05, kappa: float = 0.001, concurrency: int = 1,
+                 max_utilization: float = 0.8):
+        self.sigma = sigma
+        self.kappa = kappa
+        self.concurrency = concurrency
+        self.max_utilization = max_utilization
+
+    def throughput(self, service_time: float, replicas: int) -> float:
+        single = self.concurrency / service_time
+        n = replicas
+        return n * single / (1 + self.sigma * (n - 1) + self.kappa * n * (n - 1))
+
+    def replicas_for(self, arrival_rate: float, service_time: float, max_replicas: int) -> int:
+        best, best_throughput = 1, 0.0
+        for replicas in range(1, max_replicas + 1):
+            throughput = self.throughput(service_time, replicas)
+            if throughput * self.max_utilization >= arrival_rate:
+                return replicas
+            if throughput <= best_throughput:
+                # Past the USL peak extra replicas only reduce throughput
+                break
+            best, best_throughput = replicas, throughput
+        return best
+
+
+class HysteresisController:
+    """Scales up immediately, scales down only after demand stays low.
+
+    Scale-down targets the highest recommendation seen within the window and
+    moves at most `scale_down_step` replicas per decision, so brief dips or
+    noisy forecasts do not cause flapping.
+    """
+
+    def __init__(self, scale_down_window: float = 300, scale_down_step: int = 1):
+        self.scale_down_window = scale_down_window
+        self.scale_down_step = scale_down_step
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def stabilize(self, service: str, desired: int, current: int, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            if service not in self._history:
+                # Treat the current size as recently recommended so a restart cannot scale down
+                self._history[service] = deque([(now, current)])
+            history = self._history[service]
+            history.append((now, desired))
+            while history and history[0][0] < now - self.scale_down_window:
+                history.popleft()
+            target = max(value for _, value in history)
+
+        if desired >= current:
+            return desired
+        if target >= current:
+            return current
+        return max(target, current - self.scale_down_step)
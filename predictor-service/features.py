@@ -0,0 +1,185 @@
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+# Feature configuration shared by training and prediction
+ROLLING_WINDOW = 5
+FEATURE_COLUMNS = ['time_index', 'hour_of_day', 'minute_of_hour',
+                   'rolling_mean_5', 'rolling_std_5', 'lag_1', 'lag_2']
+SAMPLE_INTERVAL_SECONDS = 30
+DEFAULT_CAPACITY = 240  # 2 hours of 30s samples
+
+
+def build_time_series_frame(timestamps: np.ndarray, cpu: np.ndarray) -> pd.DataFrame:
+    """Build the base time series DataFrame without per-row datetime conversion"""
+    index = pd.to_datetime(timestamps, unit='s')
+    return pd.DataFrame({
+        'timestamp': index,
+        'cpu_utilization': cpu,
+        'hour_of_day': index.hour,
+        'minute_of_hour': index.minute
+    })
+
+
+def add_lag_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add time index, rolling and lag features and drop incomplete rows"""
+    cpu = df['cpu_utilization'].to_numpy(dtype=np.float64)
+    n = len(cpu)
+
+    rolling_mean = np.full(n, np.nan)
+    rolling_std = np.full(n, np.nan)
+    if n >= ROLLING_WINDOW:
+        windows = np.lib.stride_tricks.sliding_window_view(cpu, ROLLING_WINDOW)
+        rolling_mean[ROLLING_WINDOW - 1:] = windows.mean(axis=1)
+        rolling_std[ROLLING_WINDOW - 1:] = windows.std(axis=1, ddof=1)
+
+    lag_1 = np.full(n, np.nan)
+    lag_2 = np.full(n, np.nan)
+    lag_1[1:] = cpu[:-1]
+    lag_2[2:] = cpu[:-2]
+
+    df = df.assign(
+        time_index=np.arange(n),
+        rolling_mean_5=rolling_mean,
+        rolling_std_5=rolling_std,
+        lag_1=lag_1,
+        lag_2=lag_2
+    )
+    return df.dropna()
+
+
+class ServiceSeries:
+    """Fixed-size ring buffer of CPU samples with O(1) rolling statistics"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity)
+        self._values = np.zeros(capacity)
+        self._head = 0
+        self._count = 0
+        self._window_sum = 0.0
+        self._window_sum_sq = 0.0
+        self.last_timestamp = None
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _at(self, offset: int) -> float:
+        """Value `offset` samples back from the newest one (0 = newest)"""
+        return self._values[(self._head - 1 - offset) % self.capacity]
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """Append samples newer than the last stored timestamp, returns number added"""
+        if self.last_timestamp is not None:
+            mask = timestamps > self.last_timestamp
+            timestamps, values = timestamps[mask], values[mask]
+
+        for ts, value in zip(timestamps.tolist(), values.tolist()):
+            if self._count >= ROLLING_WINDOW:
+                evicted = self._at(ROLLING_WINDOW - 1)
+                self._window_sum -= evicted
+                self._window_sum_sq -= evicted * evicted
+
+            self._timestamps[self._head] = ts
+            self._values[self._head] = value
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            self._window_sum += value
+            self._window_sum_sq += value * value
+            self.last_timestamp = ts
+
+        return len(timestamps)
+
+    def window_stats(self) -> Tuple[float, float]:
+        """Mean and sample standard deviation of the last ROLLING_WINDOW samples"""
+        n = min(self._count, ROLLING_WINDOW)
+        if n == 0:
+            return 0.0, 0.0
+        mean = self._window_sum / n
+        if n < 2:
+            return mean, 0.0
+        variance = max(0.0, (self._window_sum_sq - n * mean * mean) / (n - 1))
+        return mean, float(np.sqrt(variance))
+
+    def latest_features(self, future_time, minutes_ahead: int) -> Optional[Dict]:
+        """Feature row for a prediction `minutes_ahead` into the future"""
+        if self._count < ROLLING_WINDOW:
+            return None
+
+        rolling_mean, rolling_std = self.window_stats()
+        return {
+            'time_index': self._count + minutes_ahead * 2,  # Assuming 30s intervals
+            'hour_of_day': future_time.hour,
+            'minute_of_hour': future_time.minute,
+            'rolling_mean_5': rolling_mean,
+            'rolling_std_5': rolling_std,
+            'lag_1': self._at(0),
+            'lag_2': self._at(1)
+        }
+
+    def horizon_features(self, now, minutes: np.ndarray) -> Optional[np.ndarray]:
+        """Feature matrix (FEATURE_COLUMNS order) for several horizons from one snapshot"""
+        if self._count < ROLLING_WINDOW:
+            return None
+
+        rolling_mean, rolling_std = self.window_stats()
+        future = pd.Timestamp(now) + pd.to_timedelta(minutes, unit='m')
+        columns = {
+            'time_index': self._count + minutes * 2,  # Assuming 30s intervals
+            'hour_of_day': future.hour,
+            'minute_of_hour': future.minute,
+            'rolling_mean_5': np.full(len(minutes), rolling_mean),
+            'rolling_std_5': np.full(len(minutes), rolling_std),
+            'lag_1': np.full(len(minutes), self._at(0)),
+            'lag_2': np.full(len(minutes), self._at(1))
+        }
+        return np.column_stack([columns[col] for col in FEATURE_COLUMNS])
+
+    def recent(self, n: int) -> np.ndarray:
+        """Last n samples in chronological order"""
+        n = min(n, self._count)
+        idx = (self._head - n + np.arange(n)) % self.capacity
+        return self._values[idx]
+
+    def tail(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and values of the last n samples in chronological order"""
+        n = min(n, self._count)
+        idx = (self._head - n + np.arange(n)) % self.capacity
+        return self._timestamps[idx], self._values[idx]
+
+    def series(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All buffered samples in chronological order"""
+        idx = (self._head - self._count + np.arange(self._count)) % self.capacity
+        return self._timestamps[idx], self._values[idx]
+
+
+class FeatureStore:
+    """Per-service incremental feature buffers"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def get(self, service_name: str) -> ServiceSeries:
+        with self._lock:
+            if service_name not in self._series:
+                self._series[service_name] = ServiceSeries(self.capacity)
+            return self._series[service_name]
+
+    def peek(self, service_name: str) -> Optional[ServiceSeries]:
+        """The buffer of a service, without creating one for an unknown name"""
+        with self._lock:
+            return self._series.get(service_name)
+
+    def append(self, service_name: str, timestamps: np.ndarray, values: np.ndarray) -> int:
+        series = self.get(service_name)
+        with series.lock:
+            return series.append(timestamps, values)
+
+    def services(self) -> List[str]:
+        with self._lock:
+            return list(self._series.keys())
@@ -0,0 +1,171 @@
+import io
+import os
+import hmac
+import json
+import time
+import hashlib
+import socket
+import logging
+import threading
+import joblib
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+MODEL_KEY_PREFIX = 'predictor:model:'
+MODEL_CHANNEL = 'predictor:models'
+REFIT_CHANNEL = 'predictor:refit'
+LEADER_KEY = 'predictor:training-leader'
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+# Only renew or release the lock if we still own it
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class ModelSync:
+    """Leader-elected training with models shared between replicas through Redis.
+
+    One replica holds a Redis lock and trains; it publishes serialized models
+    that every other replica loads instead of training its own copy. When
+    Redis is unreachable nobody can tell who leads, so followers stay
+    followers and the leader steps down once its lock may have expired;
+    no two replicas train at once. Without Redis at all, disable model
+    sync and every replica trains for itself.
+
+    Model blobs are pickles, and unpickling runs whatever code the blob
+    names, so every blob carries an HMAC-SHA256 under `secret` and a blob
+    whose signature does not match is rejected before it is loaded. Write
+    access to Redis alone is then not enough to run code in the
+    predictor; the secret must only be given to the predictor pods.
+    """
+
+    def __init__(self, client, secret: bytes, lock_ttl: int = 30):
+        if not secret:
+            raise ValueError("ModelSync needs a secret to sign model blobs")
+        # Binary-safe client: model blobs are not valid UTF-8
+        self.client = client
+        self.secret = secret
+        self.lock_ttl = lock_ttl
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+        self._leader = False
+        self._lease_until = 0.0
+        self._renew = client.register_script(RENEW_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def is_leader(self) -> bool:
+        # Lapses with the lock even if an election tick is late
+        return self._leader and time.monotonic() < self._lease_until
+
+    def _elect(self):
+        # The lock is ours for at least lock_ttl from before the command was sent
+        started = time.monotonic()
+        try:
+            if self._leader:
+                self._leader = bool(self._renew(keys=[LEADER_KEY], args=[self.identity, self.lock_ttl]))
+            if not self._leader:
+                self._leader = bool(self.client.set(LEADER_KEY, self.identity, nx=True, ex=self.lock_ttl))
+                if self._leader:
+                    logger.info(f"{self.identity} acquired the training leadership")
+            if self._leader:
+                self._lease_until = started + self.lock_ttl
+        except Exception as e:
+            # Another replica may take over once our lock expires; never assume the role
+            if self._leader and started >= self._lease_until:
+                logger.warning(f"Cannot renew the training leadership, stepping down: {e}")
+                self._leader = False
+            elif not self._leader:
+                logger.warning(f"Leader election unavailable, staying a follower: {e}")
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()
+
+    def publish(self, service: str, version: str, model, metadata: Dict):
+        """Store a serialized model in Redis and notify the followers"""
+        buffer = io.BytesIO()
+        joblib.dump({'model': model, 'metadata': metadata, 'version': version}, buffer)
+        payload = buffer.getvalue()
+        try:
+            self.client.set(f"{MODEL_KEY_PREFIX}{service}", self._sign(payload) + payload)
+            self.client.publish(MODEL_CHANNEL, json.dumps({'service': service, 'version': version,
+                                                           'publisher': self.identity}))
+        except Exception as e:
+            logger.warning(f"Failed to publish model for {service}: {e}")
+
+    def fetch(self, service: str):
+        """Load the published (model, metadata, version) for a service, if any"""
+        blob = self.client.get(f"{MODEL_KEY_PREFIX}{service}")
+        if blob is None:
+            return None
+        signature, payload = blob[:SIGNATURE_SIZE], blob[SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise ValueError(f"Rejected model for {service}: signature does not match")
+        payload = joblib.load(io.BytesIO(payload))
+        return payload['model'], payload['metadata'], payload['version']
+
+    def published_services(self):
+        try:
+            return [key.decode()[len(MODEL_KEY_PREFIX):] for key in self.client.scan_iter(f"{MODEL_KEY_PREFIX}*")]
+        except Exception as e:
+            logger.warning(f"Cannot list published models: {e}")
+            return []
+
+    def request_refit(self, service: str):
+        """Ask the leader for an out-of-cycle refit (e.g. drift seen on a follower)"""
+        try:
+            self.client.publish(REFIT_CHANNEL, service)
+        except Exception as e:
+            logger.warning(f"Failed to request refit for {service}: {e}")
+
+    def _election_loop(self):
+        while not self._stop.is_set():
+            self._elect()
+            self._stop.wait(self.lock_ttl / 3)
+
+    def _subscribe_loop(self, on_model: Callable[[str, str], None], on_refit: Callable[[str], None]):
+        while not self._stop.is_set():
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(MODEL_CHANNEL, REFIT_CHANNEL)
+                for message in pubsub.listen():
+                    if self._stop.is_set():
+                        break
+                    channel = message['channel'].decode()
+                    if channel == MODEL_CHANNEL:
+                        event = json.loads(message['data'])
+                        if event.get('publisher') != self.identity:
+                            on_model(event['service'], event['version'])
+                    elif channel == REFIT_CHANNEL and self.is_leader():
+                        on_refit(message['data'].decode())
+            except Exception as e:
+                logger.warning(f"Model subscription interrupted: {e}")
+                self._stop.wait(5)
+
+    def start(self, on_model: Callable[[str, str], None], on_refit: Callable[[str], None]):
+        self._elect()
+        for target, args in ((self._election_loop, ()), (self._subscribe_loop, (on_model, on_refit))):
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._leader:
+            try:
+                self._release(keys=[LEADER_KEY], args=[self.identity])
+            except Exception as e:
+                logger.warning(f"Failed to release training leadership: {e}")
+            self._leader = False
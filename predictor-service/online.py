@@ -0,0 +1,86 @@
+import threading
+import numpy as np
+
+
+class RecursiveLeastSquares:
+    """Linear regression updated sample by sample with exponential forgetting.
+
+    Exposes the same fit/predict interface as sklearn's LinearRegression so it
+    can be stored in PredictiveScaler.models; partial_fit costs O(d^2) per sample.
+    """
+
+    def __init__(self, forgetting: float = 0.995, regularization: float = 1e-3):
+        self.forgetting = forgetting
+        self.regularization = regularization
+        self.weights = None
+        self.P = None
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _design(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        return np.column_stack([X, np.ones(len(X))])
+
+    def fit(self, X, y):
+        """Closed-form initial fit on a full window"""
+        A = self._design(X)
+        y = np.asarray(y, dtype=np.float64)
+        P = np.linalg.inv(A.T @ A + self.regularization * np.eye(A.shape[1]))
+        with self._lock:
+            self.P = P
+            self.weights = P @ A.T @ y
+        return self
+
+    def partial_fit(self, X, y):
+        """Fold new samples into the model without revisiting old ones"""
+        A = self._design(X)
+        y = np.asarray(y, dtype=np.float64)
+        with self._lock:
+            if self.weights is None:
+                self.P = np.eye(A.shape[1]) / self.regularization
+                self.weights = np.zeros(A.shape[1])
+            for a, target in zip(A, y):
+                Pa = self.P @ a
+                gain = Pa / (self.forgetting + a @ Pa)
+                self.weights = self.weights + gain * (target - a @ self.weights)
+                self.P = (self.P - np.outer(gain, Pa)) / self.forgetting
+                self.updates += 1
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        with self._lock:
+            weights = self.weights
+        return self._design(X) @ weights
+
+
+class PageHinkley:
+    """Page-Hinkley test on a stream of absolute prediction errors"""
+
+    def __init__(self, delta: float = 1.0, threshold: float = 50.0, min_samples: int = 30):
+        self.delta = delta
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.cumulative = 0.0
+        self.minimum = 0.0
+
+    def update(self, error: float) -> bool:
+        """Add one observation, returns True when an upward shift is detected"""
+        self.count += 1
+        self.mean += (error - self.mean) / self.count
+        self.cumulative += error - self.mean - self.delta
+        self.minimum = min(self.minimum, self.cumulative)
+        return self.count >= self.min_samples and self.cumulative - self.minimum > self.threshold
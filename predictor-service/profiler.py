@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Dict, List
+
+_profile_lock = threading.Lock()
+
+# Leaf frames of threads parked on a lock, queue or socket
+IDLE_LEAVES = ('threading.py:wait', 'thread.py:_worker', 'selectors.py:select', 'socket.py:accept',
+               'socket.py:readinto', 'socketserver.py:serve_forever', 'connection.py:can_read')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+def sample_stacks(duration: float = 10, interval: float = 0.005, include_idle: bool = False) -> Counter:
+    """Sample every thread's stack for `duration` seconds; returns collapsed stack counts.
+
+    Pure-Python sampling via sys._current_frames, so it needs no extra
+    dependency and adds no overhead while it is not running. Only one
+    profile runs at a time.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+
+    try:
+        own_thread = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                if not include_idle and labels and labels[0].rsplit(':', 1)[0].endswith(IDLE_LEAVES):
+                    continue
+                stacks[';'.join(reversed(labels))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _profile_lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    """Brendan Gregg's collapsed format, ready for flamegraph.pl or speedscope"""
+    return '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+
+def top_functions(stacks: Counter, limit: int = 25) -> List[Dict]:
+    """Functions ranked by inclusive samples, with their self (leaf) samples"""
+    total = sum(stacks.values()) or 1
+    inclusive, own = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = [frame.rsplit(':', 1)[0] for frame in stack.split(';')]
+        for function in set(frames):
+            inclusive[function] += count
+        own[frames[-1]] += count
+
+    return [
+        {
+            'function': function,
+            'inclusive_pct': round(100 * count / total, 2),
+            'self_pct': round(100 * own[function] / total, 2)
+        }
+        for function, count in inclusive.most_common(limit)
+    ]
@@ -0,0 +1,110 @@
+import re
+import time
+import logging
+import numpy as np
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+def merge_series(result: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Average every series of a range query result onto a single timeline"""
+    arrays = [np.asarray(series['values']) for series in result if series.get('values')]
+    if not arrays:
+        return np.empty(0), np.empty(0)
+
+    raw = np.concatenate(arrays)
+    timestamps = raw[:, 0].astype(np.float64)
+    values = raw[:, 1].astype(np.float64)
+    unique_ts, inverse = np.unique(timestamps, return_inverse=True)
+    sums = np.bincount(inverse, weights=values)
+    counts = np.bincount(inverse)
+    return unique_ts, sums / counts
+
+
+def service_regex(services: Iterable[str]) -> str:
+    """Regex alternation matching pods of any of the given services"""
+    return '(' + '|'.join(re.escape(service) for service in services) + ')'
+
+
+def split_by_service(result: List[Dict], services: Iterable[str], label: str = 'pod') -> Dict[str, List[Dict]]:
+    """Group the series of a multi-service query by owning service (longest prefix wins)"""
+    ordered = sorted(services, key=len, reverse=True)
+    grouped = {service: [] for service in services}
+    for series in result:
+        value = series.get('metric', {}).get(label, '')
+        for service in ordered:
+            if value.startswith(service):
+                grouped[service].append(series)
+                break
+    return grouped
+
+
+class PrometheusClient:
+    """Shared Prometheus HTTP API client with connection pooling and concurrent fan-out"""
+
+    def __init__(self, base_url: str, timeout: float = 10, pool_size: int = 16, max_workers: int = 8,
+                 observer: Optional[Callable[[str, float, bool], None]] = None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        # Called with (endpoint, seconds, succeeded) after every HTTP request
+        self.observer = observer
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prometheus')
+
+    def _get(self, path: str, params: Dict) -> List[Dict]:
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            if response.status_code == 200:
+                data = response.json()
+                if data['status'] == 'success':
+                    succeeded = True
+                    return data['data']['result']
+            return []
+        finally:
+            if self.observer:
+                self.observer(path.rsplit('/', 1)[-1], time.perf_counter() - started, succeeded)
+
+    def query(self, query: str) -> List[Dict]:
+        """Instant vector query, returns the raw result list"""
+        return self._get('/api/v1/query', {'query': query})
+
+    def query_range(self, query: str, start_time: datetime, end_time: datetime, step: str = '30s') -> List[Dict]:
+        """Range query, returns the raw result list (one entry per series)"""
+        return self._get('/api/v1/query_range', {
+            'query': query,
+            'start': start_time.isoformat() + 'Z',
+            'end': end_time.isoformat() + 'Z',
+            'step': step
+        })
+
+    def map(self, fn: Callable, items: Iterable) -> List:
+        """Run fn over items concurrently on the shared pool, preserving order"""
+        return list(self.executor.map(fn, items))
+
+    def query_range_many(self, queries: Dict[str, str], start_time: datetime,
+                         end_time: datetime, step: str = '30s') -> Dict[str, List[Dict]]:
+        """Issue several range queries concurrently; failed queries yield an empty result"""
+        def run(item):
+            name, query = item
+            try:
+                return name, self.query_range(query, start_time, end_time, step)
+            except Exception as e:
+                logger.warning(f"Failed to fetch {name}: {e}")
+                return name, []
+
+        return dict(self.map(run, queries.items()))
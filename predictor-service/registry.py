@@ -0,0 +1,138 @@
+# Identical copy in predictor-service/ and advanced-ml-service/ (checked by predictor-service/tests)
+import os
+import json
+import shutil
+import logging
+import threading
+import joblib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Versioned on-disk model store.
+
+    Layout: <directory>/<name>/<version>/{artifacts.joblib, metadata.json, ...}
+    plus <directory>/<name>/LATEST pointing at the newest promoted version.
+    The directory can be a shared volume so other pods pick up new versions.
+    """
+
+    def __init__(self, directory: str, keep_versions: int = 5):
+        self.directory = directory
+        self.keep_versions = keep_versions
+        self.enabled = True
+        self._watcher = None
+        self._stop = threading.Event()
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Model registry disabled, cannot create {directory}: {e}")
+            self.enabled = False
+
+    def _name_dir(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def save(self, name: str, artifacts: Dict, metadata: Dict, files: Optional[Dict[str, Callable]] = None,
+             promote: bool = True) -> Optional[str]:
+        """Persist a new version; `files` maps file names to writers for non-picklable models"""
+        if not self.enabled:
+            return None
+
+        version = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        version_dir = os.path.join(self._name_dir(name), version)
+        staging_dir = f"{version_dir}.tmp"
+        try:
+            os.makedirs(staging_dir)
+            joblib.dump(artifacts, os.path.join(staging_dir, 'artifacts.joblib'))
+            for filename, writer in (files or {}).items():
+                writer(os.path.join(staging_dir, filename))
+            with open(os.path.join(staging_dir, 'metadata.json'), 'w') as f:
+                json.dump({**metadata, 'version': version}, f, default=str)
+            # Readers never see a half-written version
+            os.replace(staging_dir, version_dir)
+
+            if promote:
+                latest_tmp = os.path.join(self._name_dir(name), 'LATEST.tmp')
+                with open(latest_tmp, 'w') as f:
+                    f.write(version)
+                os.replace(latest_tmp, os.path.join(self._name_dir(name), 'LATEST'))
+
+            self._prune(name)
+            logger.info(f"Saved model {name} version {version}")
+            return version
+        except Exception as e:
+            logger.error(f"Failed to save model {name}: {e}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return None
+
+    def _prune(self, name: str):
+        latest = self.latest_version(name)
+        versions = self.versions(name)
+        for version in versions[:-self.keep_versions]:
+            if version != latest:
+                shutil.rmtree(os.path.join(self._name_dir(name), version), ignore_errors=True)
+
+    def versions(self, name: str) -> List[str]:
+        try:
+            return sorted(v for v in os.listdir(self._name_dir(name))
+                          if not v.endswith('.tmp') and v != 'LATEST')
+        except OSError:
+            return []
+
+    def names(self) -> List[str]:
+        if not self.enabled:
+            return []
+        try:
+            return sorted(n for n in os.listdir(self.directory)
+                          if os.path.exists(os.path.join(self._name_dir(n), 'LATEST')))
+        except OSError:
+            return []
+
+    def latest_version(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self._name_dir(name), 'LATEST')) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def load(self, name: str, version: Optional[str] = None) -> Optional[Tuple[str, Dict, Dict, str]]:
+        """Load (version, artifacts, metadata, version_dir) for a version, default latest"""
+        version = version or self.latest_version(name)
+        if version is None:
+            return None
+
+        version_dir = os.path.join(self._name_dir(name), version)
+        try:
+            artifacts = joblib.load(os.path.join(version_dir, 'artifacts.joblib'))
+            with open(os.path.join(version_dir, 'metadata.json')) as f:
+                metadata = json.load(f)
+            return version, artifacts, metadata, version_dir
+        except Exception as e:
+            logger.error(f"Failed to load model {name} version {version}: {e}")
+            return None
+
+    def start_watcher(self, on_new_version: Callable[[str, str], None], interval: float = 30):
+        """Poll LATEST pointers and call on_new_version(name, version) when one changes"""
+        if not self.enabled or self._watcher is not None:
+            return
+
+        def watch():
+            seen = {name: self.latest_version(name) for name in self.names()}
+            while not self._stop.wait(interval):
+                for name in self.names():
+                    version = self.latest_version(name)
+                    if version and version != seen.get(name):
+                        seen[name] = version
+                        try:
+                            on_new_version(name, version)
+                        except Exception as e:
+                            logger.error(f"Failed to hot-swap model {name}: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
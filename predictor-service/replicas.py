@@ -0,0 +1,158 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Kubernetes client is optional; without it only the fake source is available
+try:
+    from kubernetes import client as k8s_client, config as k8s_config, watch as k8s_watch
+    from kubernetes.client.rest import ApiException
+    KUBERNETES_AVAILABLE = True
+except ImportError:
+    KUBERNETES_AVAILABLE = False
+
+
+def parse_replicas(spec: str) -> Dict[str, int]:
+    """Parse "user-service=3,order-service=2" into a replica map"""
+    replicas = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        service, _, count = item.partition('=')
+        try:
+            replicas[service.strip()] = int(count)
+        except ValueError:
+            logger.warning(f"Ignoring invalid replica entry '{item}'")
+    return replicas
+
+
+class FakeReplicaSource:
+    """In-memory replica counts for offline tests and local demos"""
+
+    def __init__(self, replicas: Optional[Dict[str, int]] = None):
+        self._replicas = dict(replicas or {})
+        self._lock = threading.Lock()
+
+    def start(self):
+        return self
+
+    def set(self, service: str, replicas: int):
+        with self._lock:
+            self._replicas[service] = replicas
+
+    def remove(self, service: str):
+        with self._lock:
+            self._replicas.pop(service, None)
+
+    def get(self, service: str) -> Optional[int]:
+        with self._lock:
+            return self._replicas.get(service)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {service: {'replicas': count, 'ready_replicas': count}
+                    for service, count in self._replicas.items()}
+
+
+class KubernetesReplicaSource:
+    """Watches Deployments and keeps their replica counts in an in-memory cache.
+
+    A full list seeds the cache and provides the resourceVersion the watch
+    resumes from, so requests never hit the API server.
+    """
+
+    def __init__(self, namespace: str = 'default', watch_timeout: int = 300):
+        if not KUBERNETES_AVAILABLE:
+            raise ImportError("kubernetes client not installed")
+
+        try:
+            k8s_config.load_incluster_config()
+        except k8s_config.ConfigException:
+            k8s_config.load_kube_config()
+
+        self.namespace = namespace
+        self.watch_timeout = watch_timeout
+        self.apps = k8s_client.AppsV1Api()
+        self._deployments = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _record(self, deployment):
+        with self._lock:
+            self._deployments[deployment.metadata.name] = {
+                'replicas': deployment.spec.replicas or 0,
+                'ready_replicas': deployment.status.ready_replicas or 0
+            }
+
+    def _sync(self) -> str:
+        deployments = self.apps.list_namespaced_deployment(self.namespace)
+        with self._lock:
+            self._deployments = {}
+        for deployment in deployments.items:
+            self._record(deployment)
+        return deployments.metadata.resource_version
+
+    def _run(self):
+        resource_version = None
+        while not self._stop.is_set():
+            try:
+                if resource_version is None:
+                    resource_version = self._sync()
+
+                stream = k8s_watch.Watch().stream(
+                    self.apps.list_namespaced_deployment, self.namespace,
+                    resource_version=resource_version, timeout_seconds=self.watch_timeout
+                )
+                for event in stream:
+                    deployment = event['object']
+                    resource_version = deployment.metadata.resource_version
+                    if event['type'] == 'DELETED':
+                        with self._lock:
+                            self._deployments.pop(deployment.metadata.name, None)
+                    else:
+                        self._record(deployment)
+            except ApiException as e:
+                if e.status == 410:
+                    # History expired; relist and resume from the fresh version
+                    resource_version = None
+                else:
+                    logger.warning(f"Deployment watch failed: {e}")
+                    self._stop.wait(5)
+            except Exception as e:
+                logger.warning(f"Deployment watch interrupted: {e}")
+                resource_version = None
+                self._stop.wait(5)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='deployment-watch', daemon=True)
+            self._thread.start()
+            logger.info(f"Watching deployments in namespace {self.namespace}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, service: str) -> Optional[int]:
+        with self._lock:
+            deployment = self._deployments.get(service)
+        return deployment['replicas'] if deployment else None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(info) for name, info in self._deployments.items()}
+
+
+def create_replica_source(kind: str, namespace: str = 'default', fake_replicas: str = ''):
+    """Build the configured replica source, falling back to the fake one"""
+    if kind == 'auto':
+        kind = 'kubernetes' if KUBERNETES_AVAILABLE and os.getenv('KUBERNETES_SERVICE_HOST') else 'fake'
+
+    if kind == 'kubernetes':
+        try:
+            return KubernetesReplicaSource(namespace).start()
+        except Exception as e:
+            logger.warning(f"Kubernetes replica source unavailable, using fake source: {e}")
+
+    return FakeReplicaSource(parse_replicas(fake_replicas)).start()
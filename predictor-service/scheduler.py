@@ -0,0 +1,250 @@
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_intervals(spec: str) -> Dict[str, float]:
+    """Parse per-service overrides like "user-service=15,order-service=60" """
+    intervals = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        service, _, seconds = item.partition('=')
+        try:
+            intervals[service.strip()] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid prediction interval '{item}'")
+    return intervals
+
+
+class PredictionScheduler:
+    """Keeps per-service predictions fresh in the background on a worker pool"""
+
+    def __init__(self, predict: Callable[[str], Dict], discover: Callable[[], List[str]],
+                 refresh: Optional[Callable[[List[str]], None]] = None, default_interval: float = 30,
+                 intervals: Optional[Dict[str, float]] = None, max_workers: int = 4,
+                 discovery_interval: float = 60, tick: float = 1.0, services: Optional[List[str]] = None,
+                 fallback_retry: float = 5, clock: Callable[[], float] = time.time):
+        self.predict = predict
+        self.discover = discover
+        self.refresh = refresh
+        self.default_interval = default_interval
+        self.intervals = intervals or {}
+        self.discovery_interval = discovery_interval
+        self.tick = tick
+        self.fallback_retry = fallback_retry
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prediction')
+        self.services = list(services or [])
+        self._results = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._last_discovery = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def interval_for(self, service: str) -> float:
+        interval = self.intervals.get(service, self.default_interval)
+        result = self._results.get(service, (None, 0.0))[0]
+        # Fallback results (e.g. model still training) are retried sooner
+        if result and result.get('fallback'):
+            return min(interval, self.fallback_retry)
+        return interval
+
+    def _discover(self):
+        try:
+            services = self.discover()
+            if services:
+                self.services = services
+        except Exception as e:
+            logger.warning(f"Service discovery failed, keeping {self.services}: {e}")
+        self._last_discovery = self.clock()
+
+    def _run_prediction(self, service: str):
+        try:
+            result = self.predict(service)
+            with self._lock:
+                self._results[service] = (result, self.clock())
+        except Exception as e:
+            logger.error(f"Scheduled prediction failed for {service}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(service)
+
+    def due_services(self) -> List[str]:
+        now = self.clock()
+        with self._lock:
+            return [
+                service for service in self.services
+                if service not in self._in_flight and
+                now - self._results.get(service, (None, 0.0))[1] >= self.interval_for(service)
+            ]
+
+    def run_once(self):
+        """Refresh and schedule every service whose prediction is due"""
+        if self.clock() - self._last_discovery >= self.discovery_interval:
+            self._discover()
+
+        due = self.due_services()
+        if not due:
+            return
+
+        if self.refresh:
+            try:
+                self.refresh(due)
+            except Exception as e:
+                logger.warning(f"Batched refresh failed: {e}")
+
+        with self._lock:
+            self._in_flight.update(due)
+        for service in due:
+            self.executor.submit(self._run_prediction, service)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Prediction scheduler tick failed: {e}")
+            self._stop.wait(self.tick)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='prediction-scheduler', daemon=True)
+            self._thread.start()
+            logger.info("Prediction scheduler started")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Latest prediction per service with its age in seconds"""
+        now = self.clock()
+        with self._lock:
+            return {
+                service: {**result, 'age_seconds': round(now - computed_at, 1)}
+                for service, (result, computed_at) in self._results.items()
+                if service in self.services
+            }
+
+
+class TrainingScheduler:
+    """Retrains models in the background with jittered per-service deadlines.
+
+    Requests only register a service; training never runs on the caller's
+    thread, and the previous model keeps serving until the new one is swapped in.
+    """
+
+    def __init__(self, train: Callable[[str], object], interval: float = 1800, jitter: float = 0.2,
+                 retry_interval: float = 60, max_workers: int = 2, tick: float = 1.0,
+                 should_train: Optional[Callable[[], bool]] = None, clock: Callable[[], float] = time.time,
+                 max_services: int = 200, max_failures: int = 3):
+        self.train = train
+        self.should_train = should_train
+        self.clock = clock
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_interval = retry_interval
+        self.max_services = max_services
+        self.max_failures = max_failures
+        self.tick = tick
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='training')
+        self._next_due = {}
+        self._in_flight = set()
+        self._last_duration = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _next_deadline(self, now: float) -> float:
+        # Spread retrains so services trained together do not stay in lockstep
+        return now + self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def register(self, service: str, urgent: bool = False, trained_at: Optional[float] = None) -> bool:
+        """Track a service; unknown or urgent services are trained on the next tick.
+
+        `trained_at` schedules a model loaded from elsewhere relative to its own age.
+        Returns False when `max_services` are already tracked and this is a new one.
+        """
+        with self._lock:
+            if service not in self._next_due and len(self._next_due) >= self.max_services:
+                logger.warning(f"Not training {service}: already tracking {self.max_services} services")
+                return False
+            if urgent:
+                self._next_due[service] = self.clock()
+            elif trained_at is not None:
+                self._next_due[service] = self._next_deadline(trained_at)
+            elif service not in self._next_due:
+                self._next_due[service] = self.clock()
+            return True
+
+    def _run_training(self, service: str):
+        started = self.clock()
+        try:
+            trained = self.train(service) is not None
+        except Exception as e:
+            logger.error(f"Background training failed for {service}: {e}")
+            trained = False
+
+        finished = self.clock()
+        with self._lock:
+            self._in_flight.discard(service)
+            self._last_duration[service] = finished - started
+            failures = 0 if trained else self._failures.get(service, 0) + 1
+            if failures >= self.max_failures:
+                # No data after several tries: stop tracking until the service is registered again
+                logger.warning(f"Dropping {service} from training after {failures} attempts without a model")
+                for tracked in (self._next_due, self._last_duration, self._failures):
+                    tracked.pop(service, None)
+                return
+            self._failures[service] = failures
+            self._next_due[service] = self._next_deadline(finished) if trained else finished + self.retry_interval
+
+    def run_once(self):
+        # Followers keep their deadlines but leave the fitting to the leader
+        if self.should_train and not self.should_train():
+            return
+        now = self.clock()
+        with self._lock:
+            due = [
+                service for service, deadline in self._next_due.items()
+                if deadline <= now and service not in self._in_flight
+            ]
+            self._in_flight.update(due)
+        for service in due:
+            self.executor.submit(self._run_training, service)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Training scheduler tick failed: {e}")
+            self._stop.wait(self.tick)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='training-scheduler', daemon=True)
+            self._thread.start()
+            logger.info("Training scheduler started")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict[str, Dict]:
+        now = self.clock()
+        with self._lock:
+            return {
+                service: {
+                    'next_training_in_seconds': round(max(0.0, deadline - now), 1),
+                    'training_in_progress': service in self._in_flight,
+                    'last_training_duration_seconds': round(self._last_duration.get(service, 0.0), 3)
+                }
+                for service, deadline in self._next_due.items()
+            }
@@ -0,0 +1,34 @@
+from capacity import HysteresisController, MMcModel, USLModel, erlang_c
+
+
+def test_erlang_c_bounds():
+    assert erlang_c(4, 0.0) == 0.0
+    assert erlang_c(4, 4.0) == 1.0
+    assert 0.0 < erlang_c(4, 2.0) < 1.0
+
+
+def test_mmc_meets_slo():
+    model = MMcModel(slo_seconds=0.2, quantile=0.95)
+    replicas = model.replicas_for(50.0, 0.05, 20)
+    assert model.latency(50.0, 0.05, replicas) <= 0.2
+    assert model.latency(50.0, 0.05, replicas - 1) > 0.2
+
+
+def test_mmc_unattainable_slo_sizes_for_utilization(caplog):
+    model = MMcModel(slo_seconds=0.2, quantile=0.95, max_utilization=0.8)
+    assert model.replicas_for(0.0, 0.25, 10) == 1
+    # 8 requests/s at 0.25 s keep 2 servers busy: 3 replicas stay under 80% utilization
+    assert model.replicas_for(8.0, 0.25, 10) == 3
+    assert sum('latency SLO' in record.message for record in caplog.records) == 1
+
+
+def test_usl_stops_at_peak_throughput():
+    model = USLModel(sigma=0.2, kappa=0.05)
+    assert model.replicas_for(1000.0, 0.1, 50) < 50
+
+
+def test_hysteresis_scales_down_gradually():
+    controller = HysteresisController(scale_down_window=60, scale_down_step=1)
+    assert controller.stabilize('svc', 5, 3, now=0) == 5
+    assert controller.stabilize('svc', 2, 5, now=10) == 5
+    assert controller.stabilize('svc', 2, 5, now=100) == 4
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import coalesce
+from coalesce import SingleFlight, TTLCache
+
+CALLERS = 8
+
+
+def call_concurrently(flight, fn):
+    """Start one caller, let the rest pile up behind it, then let the first one finish"""
+    release = threading.Event()
+
+    def blocking():
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            return flight.do('prediction:user-service:5', blocking)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        first = pool.submit(call)
+        while not flight.in_flight():
+            time.sleep(0.001)
+        rest = [pool.submit(call) for _ in range(CALLERS - 1)]
+        # Give the waiting callers time to join the call in flight
+        time.sleep(0.2)
+        release.set()
+        return [first.result()] + [future.result() for future in rest]
+
+
+def test_concurrent_callers_share_one_execution():
+    calls = []
+
+    def predict():
+        calls.append(1)
+        return {'predicted_cpu': 42.0}
+
+    flight = SingleFlight()
+    results = call_concurrently(flight, predict)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_concurrent_callers_share_the_exception():
+    calls = []
+
+    def predict():
+        calls.append(1)
+        raise TimeoutError('prometheus timed out')
+
+    results = call_concurrently(SingleFlight(), predict)
+    assert len(calls) == 1
+    assert all(isinstance(result, TimeoutError) and result is results[0] for result in results)
+
+
+def test_later_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == 1
+    assert flight.do('key', lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do('key', lambda: int('x'))
+    assert flight.in_flight() == 0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(coalesce.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entries_expire(clock):
+    cache = TTLCache(ttl=15)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=60)
+    clock[0] += 14.9
+    assert cache.get('a') == 1
+    clock[0] += 0.1
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = TTLCache(ttl=15, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
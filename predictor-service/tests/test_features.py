@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import (FEATURE_COLUMNS, ROLLING_WINDOW, ServiceSeries, add_lag_features,
+                      build_time_series_frame)
+
+START = 1_700_000_000
+
+
+def samples(n):
+    rng = np.random.default_rng(7)
+    return START + 30.0 * np.arange(n), rng.uniform(5, 95, n)
+
+
+def filled(n, capacity, batch=7):
+    timestamps, values = samples(n)
+    series = ServiceSeries(capacity)
+    for start in range(0, n, batch):
+        series.append(timestamps[start:start + batch], values[start:start + batch])
+    return series, timestamps, values
+
+
+@pytest.mark.parametrize('n', [3, ROLLING_WINDOW, 12, 50])
+def test_window_stats_match_pandas_rolling(n):
+    series, _, values = filled(n, capacity=16)
+    window = pd.Series(values[-ROLLING_WINDOW:])
+    mean, std = series.window_stats()
+    assert mean == pytest.approx(window.mean())
+    assert std == pytest.approx(window.std() if len(window) > 1 else 0.0)
+
+
+def test_buffer_keeps_the_newest_samples_after_wrapping():
+    series, timestamps, values = filled(50, capacity=16)
+    assert len(series) == 16
+    stored_ts, stored_values = series.series()
+    np.testing.assert_array_equal(stored_ts, timestamps[-16:])
+    np.testing.assert_array_equal(stored_values, values[-16:])
+    np.testing.assert_array_equal(series.recent(3), values[-3:])
+    np.testing.assert_array_equal(series.tail(4)[0], timestamps[-4:])
+
+
+def test_old_and_duplicate_samples_are_ignored():
+    series, timestamps, values = filled(20, capacity=16)
+    before = series.window_stats()
+    assert series.append(timestamps[-5:], values[-5:] + 50) == 0
+    assert series.window_stats() == before
+
+
+@pytest.mark.parametrize('n', [12, 50])
+def test_latest_features_match_the_batch_pipeline(n):
+    series, timestamps, values = filled(n, capacity=16)
+    # The batch pipeline over the same window the buffer holds
+    last = add_lag_features(build_time_series_frame(*series.series())).iloc[-1]
+    future_time = datetime(2024, 1, 1, 13, 45)
+
+    features = series.latest_features(future_time, 5)
+    assert features['rolling_mean_5'] == pytest.approx(last['rolling_mean_5'])
+    assert features['rolling_std_5'] == pytest.approx(last['rolling_std_5'])
+    # The row being predicted sits one step after the newest sample
+    assert features['lag_1'] == last['cpu_utilization']
+    assert features['lag_2'] == last['lag_1']
+    assert features['time_index'] == len(series) + 10
+    assert (features['hour_of_day'], features['minute_of_hour']) == (13, 45)
+
+
+def test_latest_features_need_a_full_window():
+    series, _, _ = filled(ROLLING_WINDOW - 1, capacity=16)
+    assert series.latest_features(datetime(2024, 1, 1), 5) is None
+    assert series.horizon_features(datetime(2024, 1, 1), np.arange(1, 4)) is None
+
+
+def test_horizon_features_stack_latest_features():
+    series, _, _ = filled(50, capacity=16)
+    now = datetime(2024, 1, 1, 23, 50)
+    minutes = np.arange(1, 16)
+
+    X = series.horizon_features(now, minutes)
+    assert X.shape == (len(minutes), len(FEATURE_COLUMNS))
+    for row, m in zip(X, minutes):
+        expected = series.latest_features(now + timedelta(minutes=int(m)), int(m))
+        assert row == pytest.approx([expected[col] for col in FEATURE_COLUMNS])
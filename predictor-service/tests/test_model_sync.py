@@ -0,0 +1,97 @@
+import fakeredis
+import pytest
+
+import model_sync
+from model_sync import LEADER_KEY, ModelSync
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def replica(server, name):
+    sync = ModelSync(fakeredis.FakeRedis(server=server), b'secret', lock_ttl=30)
+    sync.identity = name
+    return sync
+
+
+def test_only_one_replica_leads(server):
+    first, second = replica(server, 'pod-a'), replica(server, 'pod-b')
+    first._elect()
+    second._elect()
+    assert first.is_leader() and not second.is_leader()
+
+    # Renewing keeps the lock with its owner
+    first._elect()
+    second._elect()
+    assert first.is_leader() and not second.is_leader()
+
+
+def test_leadership_moves_when_the_lock_expires(server):
+    first, second = replica(server, 'pod-a'), replica(server, 'pod-b')
+    first._elect()
+    first.client.delete(LEADER_KEY)
+    second._elect()
+    assert second.is_leader()
+
+    # The old leader's renewal must not extend a lock it no longer owns
+    first._elect()
+    assert not first.is_leader()
+    assert second.client.get(LEADER_KEY) == b'pod-b'
+
+
+def test_stop_releases_only_own_lock(server):
+    first, second = replica(server, 'pod-a'), replica(server, 'pod-b')
+    first._elect()
+    first.stop()
+    assert first.client.get(LEADER_KEY) is None
+
+    second._elect()
+    first._leader = True
+    first.stop()
+    assert second.client.get(LEADER_KEY) == b'pod-b'
+
+
+def test_followers_stay_followers_while_redis_is_down(server):
+    first, second = replica(server, 'pod-a'), replica(server, 'pod-b')
+    server.connected = False
+    first._elect()
+    second._elect()
+    assert not first.is_leader() and not second.is_leader()
+
+    server.connected = True
+    second._elect()
+    assert second.is_leader()
+
+
+def test_leader_steps_down_when_its_lock_may_have_expired(server, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(model_sync.time, 'monotonic', lambda: now[0])
+    leader, follower = replica(server, 'pod-a'), replica(server, 'pod-b')
+    leader._elect()
+    follower._elect()
+
+    # Within the lease nobody else can hold the lock, so the leader keeps training
+    server.connected = False
+    now[0] += 20
+    leader._elect()
+    follower._elect()
+    assert leader.is_leader() and not follower.is_leader()
+
+    now[0] += 10
+    assert not leader.is_leader()
+    leader._elect()
+    assert not leader._leader and not follower.is_leader()
+
+
+def test_published_models_are_verified(server):
+    leader, follower = replica(server, 'pod-a'), replica(server, 'pod-b')
+    leader.publish('user-service', 'v1', {'weights': [1, 2]}, {'accuracy': 0.9})
+    assert follower.fetch('user-service') == ({'weights': [1, 2]}, {'accuracy': 0.9}, 'v1')
+    assert follower.published_services() == ['user-service']
+
+    intruder = ModelSync(fakeredis.FakeRedis(server=server), b'other-secret')
+    intruder.publish('user-service', 'v2', {'weights': []}, {})
+    with pytest.raises(ValueError):
+        follower.fetch('user-service')
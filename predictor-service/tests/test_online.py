@@ -0,0 +1,82 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from online import PageHinkley, RecursiveLeastSquares
+
+COEFFICIENTS = np.array([2.0, -1.0, 0.5])
+INTERCEPT = 10.0
+
+
+def linear_data(n, coefficients=COEFFICIENTS, intercept=INTERCEPT, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(coefficients)))
+    return X, X @ coefficients + intercept + noise * rng.normal(size=n)
+
+
+def test_partial_fit_converges_to_the_true_coefficients():
+    X, y = linear_data(400, noise=0.1)
+    model = RecursiveLeastSquares(forgetting=1.0).partial_fit(X, y)
+    np.testing.assert_allclose(model.weights, [*COEFFICIENTS, INTERCEPT], atol=0.05)
+    assert model.updates == 400
+
+
+def test_fit_matches_sample_by_sample_updates():
+    X, y = linear_data(200)
+    batch = RecursiveLeastSquares(forgetting=1.0).fit(X, y)
+    streamed = RecursiveLeastSquares(forgetting=1.0)
+    for row, target in zip(X, y):
+        streamed.partial_fit(row[None, :], [target])
+    np.testing.assert_allclose(batch.predict(X), y, atol=1e-3)
+    np.testing.assert_allclose(streamed.predict(X), batch.predict(X), atol=1e-3)
+
+
+def test_forgetting_tracks_a_coefficient_shift():
+    shifted = np.array([-3.0, -1.0, 0.5])
+    X_before, y_before = linear_data(300, seed=1)
+    X_after, y_after = linear_data(300, coefficients=shifted, seed=2)
+
+    forgetful = RecursiveLeastSquares(forgetting=0.95).fit(X_before, y_before).partial_fit(X_after, y_after)
+    stubborn = RecursiveLeastSquares(forgetting=1.0).fit(X_before, y_before).partial_fit(X_after, y_after)
+    assert forgetful.weights[0] == pytest.approx(-3.0, abs=0.05)
+    # Without forgetting the old regime keeps half the weight
+    assert abs(stubborn.weights[0] + 3.0) > 0.5
+
+
+def test_survives_pickling():
+    X, y = linear_data(50)
+    model = pickle.loads(pickle.dumps(RecursiveLeastSquares().fit(X, y)))
+    model.partial_fit(X[:5], y[:5])
+    np.testing.assert_allclose(model.predict(X), y, atol=1e-3)
+
+
+def test_page_hinkley_fires_on_a_mean_shift():
+    rng = np.random.default_rng(3)
+    detector = PageHinkley(delta=1.0, threshold=50.0)
+    assert not any(detector.update(error) for error in rng.normal(5, 1, 200))
+
+    fired_after = next(i for i, error in enumerate(rng.normal(20, 1, 50)) if detector.update(error))
+    assert fired_after < 10
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_page_hinkley_stays_quiet_on_stationary_noise(seed):
+    rng = np.random.default_rng(seed)
+    detector = PageHinkley(delta=1.0, threshold=50.0)
+    assert not any(detector.update(error) for error in np.abs(rng.normal(5, 3, 5000)))
+
+
+def test_page_hinkley_waits_for_min_samples():
+    detector = PageHinkley(delta=0.0, threshold=1.0, min_samples=30)
+    assert not any(detector.update(error) for error in [0.0] * 10 + [100.0] * 19)
+    assert detector.update(100.0)
+
+
+def test_page_hinkley_reset_clears_the_state():
+    detector = PageHinkley()
+    for error in range(100):
+        detector.update(float(error))
+    detector.reset()
+    assert (detector.count, detector.mean, detector.cumulative, detector.minimum) == (0, 0.0, 0.0, 0.0)
+    assert not detector.update(1000.0)
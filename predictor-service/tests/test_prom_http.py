@@ -0,0 +1,41 @@
+import numpy as np
+
+from prom_http import merge_series, service_regex, split_by_service
+
+
+def series(pod, values):
+    return {'metric': {'pod': pod}, 'values': [[ts, str(value)] for ts, value in values]}
+
+
+def test_merge_series_averages_pods_on_one_timeline():
+    timestamps, values = merge_series([
+        series('user-service-a-1', [(10, 20), (20, 40)]),
+        series('user-service-a-2', [(10, 40), (30, 10)]),
+        {'metric': {'pod': 'user-service-a-3'}, 'values': []},
+    ])
+    np.testing.assert_array_equal(timestamps, [10, 20, 30])
+    np.testing.assert_allclose(values, [30, 40, 10])
+
+
+def test_merge_series_of_empty_result():
+    timestamps, values = merge_series([])
+    assert len(timestamps) == 0 and len(values) == 0
+
+
+def test_split_by_service_prefers_longest_prefix():
+    result = [
+        series('user-service-7d9f-abcde', [(10, 1)]),
+        series('user-service-v2-5c8b-fghij', [(10, 2)]),
+        series('order-service-6b7c-klmno', [(10, 3)]),
+        series('unrelated-pod', [(10, 4)]),
+    ]
+    grouped = split_by_service(result, ['user-service', 'user-service-v2', 'order-service', 'catalog-service'])
+
+    assert [s['metric']['pod'] for s in grouped['user-service']] == ['user-service-7d9f-abcde']
+    assert [s['metric']['pod'] for s in grouped['user-service-v2']] == ['user-service-v2-5c8b-fghij']
+    assert len(grouped['order-service']) == 1
+    assert grouped['catalog-service'] == []
+
+
+def test_service_regex_escapes_names():
+    assert service_regex(['user.service', 'order-service']) == r'(user\.service|order\-service)'
@@ -0,0 +1,23 @@
+from replicas import FakeReplicaSource, create_replica_source, parse_replicas
+
+
+def test_parse_replicas_skips_invalid_entries():
+    assert parse_replicas("user-service=3, order-service=2,,bad=x") == {'user-service': 3, 'order-service': 2}
+
+
+def test_fake_source_tracks_changes():
+    source = FakeReplicaSource({'user-service': 2}).start()
+    assert source.get('user-service') == 2
+    assert source.get('order-service') is None
+
+    source.set('order-service', 4)
+    source.remove('user-service')
+    assert source.get('user-service') is None
+    assert source.snapshot() == {'order-service': {'replicas': 4, 'ready_replicas': 4}}
+
+
+def test_create_replica_source_falls_back_to_fake(monkeypatch):
+    monkeypatch.delenv('KUBERNETES_SERVICE_HOST', raising=False)
+    source = create_replica_source('auto', fake_replicas='catalog-service=3')
+    assert isinstance(source, FakeReplicaSource)
+    assert source.get('catalog-service') == 3
@@ -0,0 +1,163 @@
+import pytest
+
+from scheduler import PredictionScheduler, TrainingScheduler, parse_intervals
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class InlineExecutor:
+    """Runs submitted work on the caller's thread so a tick's effects are visible right away"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def trainer(clock, train=lambda service: object(), **kwargs):
+    scheduler = TrainingScheduler(train, interval=100, jitter=0.2, retry_interval=10, clock=clock, **kwargs)
+    scheduler.executor = InlineExecutor()
+    return scheduler
+
+
+def test_parse_intervals():
+    assert parse_intervals('') == {}
+    assert parse_intervals(' user-service=15, order-service=60.5 ,') == {'user-service': 15.0,
+                                                                          'order-service': 60.5}
+    assert parse_intervals('user-service=soon,order-service=60') == {'order-service': 60.0}
+
+
+def test_prediction_intervals_and_fallback_retry(clock):
+    results = {}
+    scheduler = PredictionScheduler(predict=lambda service: results[service], discover=lambda: [],
+                                    default_interval=30, intervals={'order-service': 60}, fallback_retry=5,
+                                    services=['user-service', 'order-service'], clock=clock)
+    scheduler.executor = InlineExecutor()
+    results.update({'user-service': {'fallback': True}, 'order-service': {'predicted_cpu': 40}})
+    scheduler.run_once()
+    assert scheduler.due_services() == []
+
+    clock.now += 5
+    assert scheduler.due_services() == ['user-service']
+    clock.now += 25
+    assert scheduler.due_services() == ['user-service']
+    clock.now += 30
+    assert scheduler.due_services() == ['user-service', 'order-service']
+    assert scheduler.snapshot()['order-service']['age_seconds'] == 60
+
+
+def test_failed_discovery_keeps_the_known_services(clock):
+    def discover():
+        raise ConnectionError('prometheus down')
+
+    scheduler = PredictionScheduler(predict=dict, discover=discover, services=['user-service'], clock=clock)
+    scheduler._discover()
+    assert scheduler.services == ['user-service']
+
+
+def test_retrains_on_jittered_deadlines(clock):
+    scheduler = trainer(clock)
+    services = [f"service-{i}" for i in range(20)]
+    for service in services:
+        scheduler.register(service)
+    scheduler.run_once()
+
+    deadlines = [scheduler._next_due[service] - clock.now for service in services]
+    assert all(80 <= deadline <= 120 for deadline in deadlines)
+    # Services trained in the same tick do not stay in lockstep
+    assert len(set(deadlines)) == len(deadlines)
+
+
+def test_new_services_train_on_the_next_tick_and_failures_retry_sooner(clock):
+    trained = []
+
+    def train(service):
+        trained.append(service)
+        return object() if service == 'user-service' else None
+
+    scheduler = trainer(clock, train=train)
+    scheduler.register('user-service')
+    scheduler.register('order-service')
+    scheduler.run_once()
+    assert trained == ['user-service', 'order-service']
+    assert scheduler.status()['order-service']['next_training_in_seconds'] == 10
+
+    # Registering again does not move a deadline forward
+    scheduler.register('user-service')
+    clock.now += 10
+    scheduler.run_once()
+    assert trained == ['user-service', 'order-service', 'order-service']
+
+
+def test_urgent_registration_overrides_the_schedule(clock):
+    trained = []
+    scheduler = trainer(clock, train=trained.append)
+    scheduler.register('user-service', trained_at=clock.now)
+    scheduler.run_once()
+    assert trained == []
+    assert scheduler.status()['user-service']['next_training_in_seconds'] >= 80
+
+    scheduler.register('user-service', urgent=True)
+    scheduler.run_once()
+    assert trained == ['user-service']
+
+
+def test_loaded_models_are_scheduled_from_their_age(clock):
+    scheduler = trainer(clock)
+    scheduler.register('user-service', trained_at=clock.now - 500)
+    assert scheduler.status()['user-service']['next_training_in_seconds'] == 0
+    scheduler.register('order-service', trained_at=clock.now - 50)
+    assert 30 <= scheduler.status()['order-service']['next_training_in_seconds'] <= 70
+
+
+def test_followers_do_not_train(clock):
+    trained = []
+    scheduler = trainer(clock, train=trained.append, should_train=lambda: False)
+    scheduler.register('user-service', urgent=True)
+    scheduler.run_once()
+    assert trained == []
+    assert scheduler.status()['user-service']['next_training_in_seconds'] == 0
+
+
+def test_services_without_data_are_dropped(clock):
+    attempts = []
+
+    def train(service):
+        attempts.append(service)
+        return None  # e.g. a made-up name from a URL: never any data
+
+    scheduler = trainer(clock, train=train, max_failures=3)
+    scheduler.register('no-such-service')
+    for _ in range(5):
+        scheduler.run_once()
+        clock.now += 10
+    assert attempts == ['no-such-service'] * 3
+    assert 'no-such-service' not in scheduler.status()
+
+
+def test_a_success_resets_the_failure_count(clock):
+    outcomes = iter([None, None, object(), None, None])
+    scheduler = trainer(clock, train=lambda service: next(outcomes), max_failures=3)
+    scheduler.register('user-service')
+    for _ in range(5):
+        scheduler.register('user-service', urgent=True)
+        scheduler.run_once()
+    assert 'user-service' in scheduler.status()
+
+
+def test_tracked_services_are_capped(clock):
+    scheduler = trainer(clock, max_services=2)
+    assert scheduler.register('user-service') and scheduler.register('order-service')
+    assert not scheduler.register('made-up-service')
+    assert sorted(scheduler.status()) == ['order-service', 'user-service']
+    # Known services can still be rescheduled at the cap
+    assert scheduler.register('user-service', urgent=True)
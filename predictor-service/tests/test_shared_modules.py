@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from registry import ModelRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.mark.parametrize('module', ['workload.py', 'registry.py'])
+def test_service_copies_do_not_drift(module):
+    # Each service directory is its own Docker build context, so these modules are copied, not shared
+    with open(os.path.join(ROOT, 'predictor-service', module), 'rb') as f:
+        predictor = f.read()
+    with open(os.path.join(ROOT, 'advanced-ml-service', module), 'rb') as f:
+        advanced = f.read()
+    assert predictor == advanced, f"predictor-service/{module} and advanced-ml-service/{module} differ"
+
+
+def test_registry_promotes_and_prunes(tmp_path):
+    registry = ModelRegistry(str(tmp_path), keep_versions=2)
+    versions = [registry.save('user-service', {'weights': [i]}, {'accuracy': i}) for i in range(3)]
+    assert registry.names() == ['user-service']
+    assert registry.latest_version('user-service') == versions[-1]
+    assert registry.versions('user-service') == versions[1:]
+
+    version, artifacts, metadata, _ = registry.load('user-service')
+    assert (version, artifacts, metadata['accuracy']) == (versions[-1], {'weights': [2]}, 2)
+
+    unpromoted = registry.save('user-service', {'weights': [3]}, {}, promote=False)
+    assert registry.latest_version('user-service') == versions[-1]
+    assert registry.load('user-service', unpromoted)[1] == {'weights': [3]}
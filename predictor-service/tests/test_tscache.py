@@ -0,0 +1,148 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import tscache
+from tscache import RECORD_DTYPE, MetricSeriesCache
+
+NOW = 1_700_006_400  # a multiple of the 300s downsample step
+HOUR = 3600
+QUERY = 'rate(container_cpu_usage_seconds_total{pod=~"user-service.*"}[1m]) * 100'
+
+
+def at(ts):
+    return datetime.utcfromtimestamp(ts)
+
+
+def value(ts):
+    return (ts % 997) / 10.0
+
+
+class Prometheus:
+    """Range query fake with a 30s resolution that records every requested range"""
+
+    def __init__(self):
+        self.calls = []
+        self.empty = False
+
+    def __call__(self, query, start_time, end_time):
+        start = (start_time - datetime(1970, 1, 1)).total_seconds()
+        end = (end_time - datetime(1970, 1, 1)).total_seconds()
+        self.calls.append((start, end))
+        if self.empty:
+            return np.empty(0), np.empty(0)
+        timestamps = np.arange(np.ceil(start / 30) * 30, end + 1, 30.0)
+        return timestamps, value(timestamps)
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(tscache.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def prometheus():
+    return Prometheus()
+
+
+def cache(directory, **kwargs):
+    return MetricSeriesCache(str(directory), **kwargs)
+
+
+def sidecar(directory):
+    (path,) = directory.glob('*.json')
+    return json.loads(path.read_text())
+
+
+def test_overlapping_range_fetches_only_the_delta(tmp_path, prometheus, clock):
+    store = cache(tmp_path)
+    store.get_range('user-service', QUERY, at(NOW - HOUR), at(NOW), prometheus)
+
+    clock[0] = NOW + 300
+    timestamps, values = store.get_range('user-service', QUERY, at(NOW - 50 * 60), at(NOW + 300), prometheus)
+    assert prometheus.calls == [(NOW - HOUR, NOW), (NOW + 30, NOW + 300)]
+    np.testing.assert_array_equal(timestamps, np.arange(NOW - 50 * 60, NOW + 301, 30.0))
+    np.testing.assert_array_equal(values, value(timestamps))
+    assert sidecar(tmp_path)['covered_from'] == NOW - HOUR
+    assert sidecar(tmp_path)['covered_to'] == NOW + 300
+
+
+def test_a_gap_restarts_the_covered_range(tmp_path, prometheus):
+    store = cache(tmp_path)
+    store.get_range('user-service', QUERY, at(NOW - 2 * HOUR), at(NOW - 90 * 60), prometheus)
+    store.get_range('user-service', QUERY, at(NOW - 30 * 60), at(NOW), prometheus)
+    # Nothing between the two windows was fetched, so only the newer one counts as covered
+    assert prometheus.calls[-1] == (NOW - 30 * 60, NOW)
+    assert (sidecar(tmp_path)['covered_from'], sidecar(tmp_path)['covered_to']) == (NOW - 30 * 60, NOW)
+
+    # A window reaching back across the gap is fetched in full and merges the coverage
+    timestamps, _ = store.get_range('user-service', QUERY, at(NOW - 2 * HOUR), at(NOW), prometheus)
+    assert prometheus.calls[-1] == (NOW - 2 * HOUR, NOW)
+    assert (sidecar(tmp_path)['covered_from'], sidecar(tmp_path)['covered_to']) == (NOW - 2 * HOUR, NOW)
+    np.testing.assert_array_equal(timestamps, np.arange(NOW - 2 * HOUR, NOW + 1, 30.0))
+
+
+def test_an_empty_fetch_does_not_advance_the_covered_range(tmp_path, prometheus, clock):
+    store = cache(tmp_path)
+    store.get_range('user-service', QUERY, at(NOW - HOUR), at(NOW), prometheus)
+    prometheus.empty = True
+    clock[0] = NOW + 300
+    store.get_range('user-service', QUERY, at(NOW - HOUR), at(NOW + 300), prometheus)
+    assert sidecar(tmp_path)['covered_to'] == NOW
+
+    # The missing samples are asked for again once Prometheus has them
+    prometheus.empty = False
+    store.get_range('user-service', QUERY, at(NOW - HOUR), at(NOW + 300), prometheus)
+    assert prometheus.calls[-1] == (NOW + 30, NOW + 300)
+
+
+def test_a_fresh_instance_warm_starts_from_disk(tmp_path, prometheus):
+    expected = cache(tmp_path).get_range('user-service', QUERY, at(NOW - HOUR), at(NOW), prometheus)
+
+    restarted = cache(tmp_path)
+    timestamps, values = restarted.get_range('user-service', QUERY, at(NOW - HOUR), at(NOW), prometheus)
+    assert len(prometheus.calls) == 1
+    np.testing.assert_array_equal(timestamps, expected[0])
+    np.testing.assert_array_equal(values, expected[1])
+
+
+def test_compaction_drops_and_downsamples_old_points(tmp_path, prometheus):
+    store = cache(tmp_path, retention_hours=2, downsample_after_hours=1, downsample_step=300)
+    store.get_range('user-service', QUERY, at(NOW - 3 * HOUR), at(NOW), prometheus)
+
+    (data_path,) = tmp_path.glob('*.bin')
+    records = np.fromfile(data_path, dtype=RECORD_DTYPE)
+    raw = np.arange(NOW - 3 * HOUR, NOW + 1, 30.0)
+
+    # Older than the retention: gone; older than an hour: one mean per 5 minute bucket
+    buckets = np.arange(NOW - 2 * HOUR, NOW - HOUR, 300.0)
+    means = [value(raw[(raw >= b) & (raw < b + 300)]).mean() for b in buckets]
+    recent = raw[raw >= NOW - HOUR]
+    np.testing.assert_array_equal(records['ts'], np.concatenate([buckets, recent]))
+    np.testing.assert_allclose(records['value'], np.concatenate([means, value(recent)]))
+
+    meta = sidecar(tmp_path)
+    assert (meta['service'], meta['query']) == ('user-service', QUERY)
+    assert (meta['covered_from'], meta['covered_to']) == (NOW - 2 * HOUR, NOW)
+    assert records['ts'].min() >= meta['covered_from'] and records['ts'].max() <= meta['covered_to']
+
+    # Compacting again leaves the downsampled buckets as they are
+    store._compact(store._key('user-service', QUERY), str(data_path), NOW)
+    np.testing.assert_array_equal(np.fromfile(data_path, dtype=RECORD_DTYPE), records)
+
+
+def test_coverage_is_cleared_once_everything_expired(tmp_path, prometheus, clock):
+    store = cache(tmp_path, retention_hours=2, compact_interval=0)
+    store.get_range('user-service', QUERY, at(NOW - HOUR), at(NOW), prometheus)
+
+    clock[0] = NOW + 3 * HOUR
+    prometheus.empty = True
+    timestamps, _ = store.get_range('user-service', QUERY, at(NOW + 2 * HOUR), at(NOW + 3 * HOUR), prometheus)
+    assert len(timestamps) == 0
+    (data_path,) = tmp_path.glob('*.bin')
+    assert data_path.stat().st_size == 0
+    assert sidecar(tmp_path)['covered_from'] is None and sidecar(tmp_path)['covered_to'] is None
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from workload import PROFILES, WorkloadProfile, metric_frame, pod_signals, synthetic_series, time_grid
+
+DAY = 86400.0
+
+
+def test_time_grid_is_aligned_and_ascending():
+    grid = time_grid(1, interval=30, end=10 * DAY)
+    assert len(grid) == 120
+    assert grid[-1] == 10 * DAY
+    assert np.all(np.diff(grid) == 30)
+
+
+def test_same_seed_same_series():
+    _, first = synthetic_series(24, PROFILES['realistic'], seed=7, end=10 * DAY)
+    _, second = synthetic_series(24, PROFILES['realistic'], seed=7, end=10 * DAY)
+    _, other = synthetic_series(24, PROFILES['realistic'], seed=8, end=10 * DAY)
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, other)
+
+
+@pytest.mark.parametrize('name', sorted(PROFILES))
+def test_profiles_stay_within_bounds(name):
+    _, cpu = synthetic_series(24 * 7, PROFILES[name], seed=1, end=10 * DAY)
+    assert cpu.min() >= PROFILES[name].floor
+    assert cpu.max() <= PROFILES[name].ceiling
+
+
+def test_scheduled_spikes_and_daily_peak():
+    # 1970-01-11 is a Sunday; with weekend_factor 1 that does not matter
+    timestamps, cpu = synthetic_series(24, WorkloadProfile(noise_std=0.0, spike_hours=(9,), spike_height=20.0),
+                                       seed=0, end=11 * DAY)
+    hour = np.mod(timestamps, DAY) / 3600
+    spike = (hour >= 9) & (hour < 9 + 10 / 60)
+    before = (hour >= 8.75) & (hour < 9)
+    assert cpu[spike].mean() - cpu[before].mean() > 15
+    assert abs(hour[np.argmax(np.where(spike, 0, cpu))] - 6.0) < 0.1
+
+
+def test_weekend_factor_lowers_weekend_load():
+    profile = WorkloadProfile(noise_std=0.0, weekend_factor=0.5, daily_amplitude=0.0)
+    # 1970-01-05 was a Monday
+    timestamps, cpu = synthetic_series(24 * 7, profile, seed=0, end=12 * DAY)
+    weekday = (np.floor_divide(timestamps, DAY).astype(int) + 3) % 7 < 5
+    assert cpu[weekday].mean() == pytest.approx(2 * cpu[~weekday].mean())
+
+
+def test_pod_signals_share_correlated_noise():
+    timestamps = time_grid(24, end=10 * DAY)
+    pods = pod_signals(timestamps, WorkloadProfile(daily_amplitude=0.0, noise_std=5.0), pods=3,
+                       correlation=0.8, seed=3)
+    assert pods.shape == (3, len(timestamps))
+    correlation = np.corrcoef(pods)[np.triu_indices(3, 1)]
+    assert np.all(np.abs(correlation - 0.8) < 0.1)
+
+
+def test_metric_frame_columns():
+    frame = metric_frame(time_grid(1, end=10 * DAY), PROFILES['advanced'], seed=2)
+    assert list(frame.columns) == ['timestamp', 'cpu', 'memory', 'requests', 'response_time']
+    assert (frame['requests'] >= 0).all() and (frame['response_time'] >= 50).all()
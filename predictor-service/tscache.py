@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import logging
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (timestamp, value) pairs stored back to back as little-endian float64
+RECORD_DTYPE = np.dtype([('ts', '<f8'), ('value', '<f8')])
+
+
+class MetricSeriesCache:
+    """Append-only, memory-mapped on-disk cache of Prometheus range query results.
+
+    One data file per (service, query) plus a small JSON sidecar recording
+    which time range has already been fetched, so only the delta since the
+    last fetch is requested from Prometheus. Files survive restarts and are
+    shared between gunicorn workers through advisory file locks.
+    """
+
+    def __init__(self, directory: str, retention_hours: float = 24, downsample_after_hours: float = 6,
+                 downsample_step: int = 300, step: int = 30, compact_interval: int = 600):
+        self.directory = directory
+        self.retention = retention_hours * 3600
+        self.downsample_after = downsample_after_hours * 3600
+        self.downsample_step = downsample_step
+        self.step = step
+        self.compact_interval = compact_interval
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._last_compaction = {}
+        self.enabled = True
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Metric cache disabled, cannot create {directory}: {e}")
+            self.enabled = False
+
+    def _key(self, service: str, query: str) -> str:
+        digest = hashlib.sha1(query.encode()).hexdigest()[:16]
+        return f"{service}-{digest}"
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key)
+        return f"{base}.bin", f"{base}.json"
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _read_meta(self, meta_path: str) -> Dict:
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, meta_path: str, meta: Dict):
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    @staticmethod
+    def _meta(service: str, query: str, covered_from, covered_to) -> Dict:
+        return {'service': service, 'query': query, 'covered_from': covered_from, 'covered_to': covered_to}
+
+    def _read_records(self, data_path: str) -> np.ndarray:
+        """Memory-map the data file, ignoring a partially written trailing record"""
+        try:
+            count = os.path.getsize(data_path) // RECORD_DTYPE.itemsize
+        except OSError:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        records = np.memmap(data_path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+        # Concurrent writers may interleave; sort and drop duplicate timestamps
+        _, idx = np.unique(records['ts'], return_index=True)
+        return np.array(records[idx])
+
+    def _append_records(self, data_path: str, timestamps: np.ndarray, values: np.ndarray):
+        records = np.empty(len(timestamps), dtype=RECORD_DTYPE)
+        records['ts'] = timestamps
+        records['value'] = values
+        with open(data_path, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(records.tobytes())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _compact(self, key: str, data_path: str, now: float):
+        """Apply retention and downsample old samples, rewriting the file atomically"""
+        with open(data_path, 'ab') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                records = self._read_records(data_path)
+                records = records[records['ts'] >= now - self.retention]
+
+                # Whole buckets only, so a bucket is never averaged again with late raw samples
+                cutoff = np.floor((now - self.downsample_after) / self.downsample_step) * self.downsample_step
+                old = records['ts'] < cutoff
+                if old.any():
+                    buckets = np.floor(records['ts'][old] / self.downsample_step) * self.downsample_step
+                    bucket_ts, inverse = np.unique(buckets, return_inverse=True)
+                    sums = np.bincount(inverse, weights=records['value'][old])
+                    counts = np.bincount(inverse)
+
+                    downsampled = np.empty(len(bucket_ts), dtype=RECORD_DTYPE)
+                    downsampled['ts'] = bucket_ts
+                    downsampled['value'] = sums / counts
+                    records = np.concatenate([downsampled, records[~old]])
+
+                tmp_path = f"{data_path}.tmp"
+                records.tofile(tmp_path)
+                os.replace(tmp_path, data_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        self._last_compaction[key] = now
+
+    def get_range(self, service: str, query: str, start_time: datetime, end_time: datetime,
+                  fetch: Callable[[str, datetime, datetime], Tuple[np.ndarray, np.ndarray]]
+                  ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return cached samples in [start_time, end_time], fetching only what is missing.
+
+        `fetch` takes (query, start_time, end_time) and returns (timestamps, values)
+        arrays; an empty result never advances the covered range.
+        """
+        if not self.enabled:
+            return fetch(query, start_time, end_time)
+
+        key = self._key(service, query)
+        data_path, meta_path = self._paths(key)
+        start_ts = (start_time - datetime(1970, 1, 1)).total_seconds()
+        end_ts = (end_time - datetime(1970, 1, 1)).total_seconds()
+
+        try:
+            with self._lock(key):
+                meta = self._read_meta(meta_path)
+                covered_from = meta.get('covered_from')
+                covered_to = meta.get('covered_to')
+
+                usable = covered_from is not None and covered_to is not None and \
+                    covered_from <= start_ts + self.step and covered_to >= start_ts
+                # Only the delta since the last fetch when the window is already on disk
+                fetch_from = covered_to + self.step if usable else start_ts
+
+                if fetch_from <= end_ts:
+                    timestamps, samples = fetch(query, datetime.utcfromtimestamp(fetch_from), end_time)
+                    if len(timestamps):
+                        self._append_records(data_path, timestamps, samples)
+                        if usable or (covered_to is not None and covered_to >= start_ts - self.step):
+                            covered_from = min(covered_from, start_ts)
+                            covered_to = max(covered_to, end_ts)
+                        else:
+                            covered_from, covered_to = start_ts, end_ts
+                        self._write_meta(meta_path, self._meta(service, query, covered_from, covered_to))
+
+                now = time.time()
+                if now - self._last_compaction.get(key, 0) > self.compact_interval and os.path.exists(data_path):
+                    self._compact(key, data_path, now)
+                    expired = now - self.retention
+                    if covered_from is not None and covered_from < expired:
+                        # Retention dropped the start of the covered range, or all of it
+                        if covered_to < expired:
+                            covered_from = covered_to = None
+                        else:
+                            covered_from = expired
+                        self._write_meta(meta_path, self._meta(service, query, covered_from, covered_to))
+
+                records = self._read_records(data_path)
+        except OSError as e:
+            logger.warning(f"Metric cache unavailable for {service}, fetching directly: {e}")
+            return fetch(query, start_time, end_time)
+
+        window = (records['ts'] >= start_ts) & (records['ts'] <= end_ts)
+        return records['ts'][window], records['value'][window]
@@ -0,0 +1,129 @@
+# Identical copy in predictor-service/ and advanced-ml-service/ (checked by predictor-service/tests)
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+SECONDS_PER_DAY = 86400
+
+
+@dataclass(frozen=True)
+class WorkloadProfile:
+    """Shape of a synthetic CPU workload; all components are optional"""
+    base: float = 20.0
+    daily_amplitude: float = 15.0          # peak-to-mean of the daily cycle
+    peak_hour: float = 6.0                 # hour of day where the daily cycle peaks (UTC)
+    weekend_factor: float = 1.0            # weekly seasonality: multiplier on Sat/Sun
+    trend_per_day: float = 0.0             # linear growth in CPU points per day
+    noise_std: float = 5.0
+    spike_hours: Tuple[int, ...] = ()      # scheduled spikes in the first 10 minutes of these hours
+    spike_height: float = 20.0
+    burst_probability: float = 0.0         # chance a burst starts at a given sample
+    burst_length: int = 1                  # samples per burst
+    burst_height: float = 30.0
+    burst_business_hours_only: bool = True
+    regime_changes_per_day: float = 0.0    # rate of sudden level shifts
+    regime_scale: float = 0.3              # log-normal sigma of each level shift
+    floor: float = 5.0
+    ceiling: float = 95.0
+
+
+# Profiles matching the historical fallbacks of each service
+PROFILES: Dict[str, WorkloadProfile] = {
+    'predictor': WorkloadProfile(base=15.0, daily_amplitude=10.0, spike_hours=(9, 12, 15, 18)),
+    'advanced': WorkloadProfile(base=20.0, daily_amplitude=15.0, weekend_factor=0.7,
+                                burst_probability=0.1, burst_height=30.0),
+    'realistic': WorkloadProfile(base=25.0, daily_amplitude=15.0, weekend_factor=0.6, trend_per_day=0.5,
+                                 noise_std=4.0, burst_probability=0.002, burst_length=20, burst_height=25.0,
+                                 regime_changes_per_day=0.5)
+}
+
+
+def time_grid(hours: float, interval: int = 30, end: Optional[float] = None) -> np.ndarray:
+    """Ascending unix timestamps covering `hours`, ending at `end` (default now, grid aligned)"""
+    if end is None:
+        end = time.time() // interval * interval
+    n = int(hours * 3600 // interval)
+    return end - interval * np.arange(n - 1, -1, -1, dtype=np.float64)
+
+
+def _bursts(rng: np.random.Generator, allowed: np.ndarray, probability: float, length: int) -> np.ndarray:
+    starts = (rng.random(len(allowed)) < probability) & allowed
+    if length <= 1:
+        return starts.astype(np.float64)
+    # Every start switches the burst on for `length` samples
+    return np.minimum(np.convolve(starts, np.ones(length), mode='full')[:len(starts)], 1.0)
+
+
+def cpu_signal(timestamps: np.ndarray, profile: WorkloadProfile, rng: np.random.Generator,
+               noise: Optional[np.ndarray] = None) -> np.ndarray:
+    """CPU utilization (%) for each timestamp; `noise` overrides the white noise term"""
+    n = len(timestamps)
+    seconds_of_day = np.mod(timestamps, SECONDS_PER_DAY)
+    hour = seconds_of_day / 3600
+    day_of_week = (np.floor_divide(timestamps, SECONDS_PER_DAY).astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    weekday = day_of_week < 5
+    business_hours = (hour >= 9) & (hour < 18) & weekday
+
+    daily = profile.daily_amplitude * np.sin((hour - profile.peak_hour + 6) * np.pi / 12)
+    weekly = np.where(weekday, 1.0, profile.weekend_factor)
+    trend = profile.trend_per_day * (timestamps - timestamps[0]) / SECONDS_PER_DAY if n else 0.0
+
+    level = np.ones(n)
+    if profile.regime_changes_per_day > 0 and n > 1:
+        interval = (timestamps[-1] - timestamps[0]) / (n - 1)
+        changes = rng.random(n) < profile.regime_changes_per_day * interval / SECONDS_PER_DAY
+        level = np.cumprod(np.where(changes, rng.lognormal(0.0, profile.regime_scale, n), 1.0))
+
+    cpu = (profile.base + daily) * weekly * level + trend
+    cpu += rng.normal(0, profile.noise_std, n) if noise is None else noise * profile.noise_std
+
+    if profile.spike_hours:
+        minute = np.floor_divide(seconds_of_day, 60) % 60
+        spikes = np.isin(np.floor(hour).astype(np.int64), profile.spike_hours) & (minute < 10)
+        cpu += profile.spike_height * spikes
+
+    if profile.burst_probability > 0:
+        allowed = business_hours if profile.burst_business_hours_only else np.ones(n, dtype=bool)
+        cpu += profile.burst_height * _bursts(rng, allowed, profile.burst_probability, profile.burst_length)
+
+    return np.clip(cpu, profile.floor, profile.ceiling)
+
+
+def pod_signals(timestamps: np.ndarray, profile: WorkloadProfile, pods: int, correlation: float = 0.8,
+                seed: Optional[int] = None) -> np.ndarray:
+    """(pods, samples) CPU matrix whose noise has the given pairwise correlation"""
+    rng = np.random.default_rng(seed)
+    common = rng.standard_normal(len(timestamps))
+    own = rng.standard_normal((pods, len(timestamps)))
+    noise = np.sqrt(correlation) * common + np.sqrt(1 - correlation) * own
+    # Pods share seasonality, bursts and regimes through a common generator state
+    shared_seed = rng.integers(2 ** 32)
+    return np.stack([
+        cpu_signal(timestamps, profile, np.random.default_rng(shared_seed), noise=noise[pod])
+        for pod in range(pods)
+    ])
+
+
+def metric_frame(timestamps: np.ndarray, profile: WorkloadProfile, seed: Optional[int] = None) -> pd.DataFrame:
+    """CPU plus correlated memory, request rate and response time, one row per timestamp"""
+    rng = np.random.default_rng(seed)
+    n = len(timestamps)
+    cpu = cpu_signal(timestamps, profile, rng)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(timestamps, unit='s'),
+        'cpu': cpu,
+        'memory': cpu * 1.2 + rng.normal(0, 3, n),
+        'requests': np.maximum(0, cpu / 2 + rng.normal(0, 2, n)),
+        'response_time': np.maximum(50, 200 - cpu + rng.normal(0, 10, n))
+    })
+
+
+def synthetic_series(hours: float, profile: WorkloadProfile = PROFILES['predictor'], seed: Optional[int] = None,
+                     interval: int = 30, end: Optional[float] = None, **overrides) -> Tuple[np.ndarray, np.ndarray]:
+    """(timestamps, cpu) arrays; keyword overrides tweak single profile fields"""
+    if overrides:
+        profile = replace(profile, **overrides)
+    timestamps = time_grid(hours, interval, end)
+    return timestamps, cpu_signal(timestamps, profile, np.random.default_rng(seed))
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Prometheus API Stub for local tests and benchmarks
+Serves deterministic synthetic series for /api/v1/query and /api/v1/query_range,
+a predictor-compatible /predict/<service> and runtime fault injection
+"""
+
+import re
+import json
+import math
+import time
+import zlib
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_SERVICES = ['user-service', 'catalog-service', 'order-service']
+
+MATCHER_PATTERN = re.compile(r'(\w+)\s*(=~|!=|=)\s*"([^"]*)"')
+AGGREGATION_PATTERN = re.compile(r'\b(sum|avg|max|min)\s+by\s*\(\s*(\w+)\s*\)')
+
+
+def parse_time(value):
+    """Accept both unix timestamps and RFC3339 strings as Prometheus does"""
+    try:
+        return float(value)
+    except ValueError:
+        value = value.rstrip('Z')
+        return (datetime.fromisoformat(value) - datetime(1970, 1, 1)).total_seconds()
+
+
+def parse_step(value):
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+class StubMetrics:
+    """Deterministic per-pod signals derived from a daily cycle plus seeded noise"""
+
+    def __init__(self, services, pods_per_service=2):
+        self.services = services
+        self.pods_per_service = pods_per_service
+        self.pods = {
+            service: [f"{service}-{i}-stub" for i in range(pods_per_service)]
+            for service in services
+        }
+
+    def _noise(self, pod, ts):
+        seed = zlib.crc32(f"{pod}:{int(ts)}".encode())
+        return (seed % 1000) / 1000.0 - 0.5
+
+    def cpu(self, pod, ts):
+        phase = (zlib.crc32(pod.encode()) % 360) * math.pi / 180
+        base = 30 + 20 * math.sin(2 * math.pi * ts / 86400 + phase)
+        return max(1.0, min(99.0, base + 10 * self._noise(pod, ts)))
+
+    def value(self, metric, pod, service, ts):
+        if 'cpu' in metric:
+            return self.cpu(pod, ts)
+        if 'memory' in metric:
+            return 120 + 2.5 * self.cpu(pod, ts)
+        if 'duration' in metric:
+            return 0.05 + self.cpu(pod, ts) / 1000
+        if 'request' in metric:
+            return self.cpu(pod, ts) / 2
+        if 'replicas' in metric:
+            return float(len(self.pods[service]))
+        return 0.0
+
+    def prediction(self, service, ts):
+        """Predictor-shaped response: the mean pod CPU 5 minutes ahead"""
+        pods = self.pods[service]
+        current = sum(self.cpu(pod, ts) for pod in pods) / len(pods)
+        predicted = sum(self.cpu(pod, ts + 300) for pod in pods) / len(pods)
+        return {
+            'service': service,
+            'predicted_cpu': predicted,
+            'current_cpu': current,
+            'confidence': 0.85,
+            'recommended_replicas': max(1, min(10, math.ceil(len(pods) * predicted / 50))),
+            'current_replicas': len(pods),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+    def series_for(self, query):
+        """Resolve a query to a list of (labels, value_fn) pairs"""
+        metric_match = re.search(r'([a-zA-Z_:][a-zA-Z0-9_:]*)\s*\{', query)
+        metric = metric_match.group(1) if metric_match else query
+
+        matchers = MATCHER_PATTERN.findall(query)
+
+        def matches(labels):
+            for name, op, pattern in matchers:
+                value = labels.get(name)
+                if value is None:
+                    continue
+                if op == '=' and value != pattern:
+                    return False
+                if op == '!=' and value == pattern:
+                    return False
+                if op == '=~' and not re.fullmatch(pattern, value):
+                    return False
+            return True
+
+        series = []
+        for service, pods in self.pods.items():
+            if 'kube_deployment' in metric:
+                labels = {'deployment': service, 'service': service}
+                if matches(labels):
+                    series.append((labels, lambda ts, s=service: self.value(metric, None, s, ts)))
+                continue
+            for pod in pods:
+                labels = {'pod': pod, 'service': service, 'deployment': service}
+                if matches(labels):
+                    series.append((labels, lambda ts, p=pod, s=service: self.value(metric, p, s, ts)))
+
+        aggregation = AGGREGATION_PATTERN.search(query)
+        if aggregation:
+            series = self._aggregate(series, aggregation.group(1), aggregation.group(2))
+        return series
+
+    def _aggregate(self, series, op, label):
+        reducers = {'sum': sum, 'max': max, 'min': min, 'avg': lambda v: sum(v) / len(v)}
+        groups = {}
+        for labels, fn in series:
+            groups.setdefault(labels.get(label, ''), []).append(fn)
+        return [
+            ({label: key}, lambda ts, fns=fns: reducers[op]([fn(ts) for fn in fns]))
+            for key, fns in groups.items()
+        ]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = 'PrometheusStub/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        stub = self.server.stub
+
+        with stub.lock:
+            stub.request_counts[url.path] = stub.request_counts.get(url.path, 0) + 1
+
+        if url.path == '/stub/stats':
+            return self._send(200, {'requests': stub.request_counts})
+
+        if url.path == '/stub/faults':
+            stub.set_faults(latency_ms=float(params['latency_ms']) if 'latency_ms' in params else None,
+                            error_rate=float(params['error_rate']) if 'error_rate' in params else None)
+            return self._send(200, {'latency_ms': stub.latency * 1000, 'error_rate': stub.error_rate})
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if stub.should_fail():
+            return self._send(503, {'status': 'error', 'error': 'injected fault'})
+
+        if url.path.startswith('/predict/'):
+            service = url.path[len('/predict/'):]
+            if service not in stub.metrics.pods:
+                return self._send(404, {'status': 'error', 'message': f'unknown service {service}'})
+            return self._send(200, stub.metrics.prediction(service, time.time()))
+
+        if url.path == '/api/v1/query':
+            ts = parse_time(params['time']) if 'time' in params else time.time()
+            result = [
+                {'metric': labels, 'value': [ts, str(fn(ts))]}
+                for labels, fn in stub.metrics.series_for(params.get('query', ''))
+            ]
+            return self._send(200, {'status': 'success', 'data': {'resultType': 'vector', 'result': result}})
+
+        if url.path == '/api/v1/query_range':
+            start = parse_time(params['start'])
+            end = parse_time(params['end'])
+            step = parse_step(params.get('step', '30s'))
+            first = math.ceil(start / step) * step
+            count = max(0, int((end - first) // step) + 1)
+            timestamps = [first + i * step for i in range(count)]
+            result = [
+                {'metric': labels, 'values': [[ts, str(fn(ts))] for ts in timestamps]}
+                for labels, fn in stub.metrics.series_for(params.get('query', ''))
+            ]
+            return self._send(200, {'status': 'success', 'data': {'resultType': 'matrix', 'result': result}})
+
+        self._send(404, {'status': 'error', 'error': f'unknown path {url.path}'})
+
+
+class PrometheusStub:
+    """Threaded stub server; use start()/stop() from tests or run as a script"""
+
+    def __init__(self, host='127.0.0.1', port=0, services=None, pods_per_service=2, latency_ms=0, error_rate=0.0):
+        self.metrics = StubMetrics(services or DEFAULT_SERVICES, pods_per_service)
+        self.latency = latency_ms / 1000.0
+        self.error_rate = error_rate
+        self._served = 0
+        self.request_counts = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.stub = self
+        self.thread = None
+
+    def set_faults(self, latency_ms=None, error_rate=None):
+        """Change injected latency and the fraction of requests answered with 503 while running"""
+        with self.lock:
+            if latency_ms is not None:
+                self.latency = latency_ms / 1000.0
+            if error_rate is not None:
+                self.error_rate = error_rate
+
+    def should_fail(self):
+        # Deterministic: exactly error_rate of consecutive requests fail, evenly spread
+        with self.lock:
+            self._served += 1
+            return int(self._served * self.error_rate) > int((self._served - 1) * self.error_rate)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prometheus API stub for local tests and benchmarks')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=9090, help='Listen port')
+    parser.add_argument('--services', default=','.join(DEFAULT_SERVICES), help='Comma separated service names')
+    parser.add_argument('--pods', type=int, default=2, help='Pods per service')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Artificial latency per query')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with 503')
+
+    args = parser.parse_args()
+
+    stub = PrometheusStub(args.host, args.port, args.services.split(','), args.pods, args.latency_ms, args.error_rate)
+    print(f"Prometheus stub listening on {stub.url} for {args.services}")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()